@@ -0,0 +1,17 @@
+"""
+URL configuration used for requests served through ASGI (see AsyncViewsMiddleware in posts/middleware.py).
+
+The same URLs as urls.py, but the read views are the async versions from posts/async_views.py so they don't
+hold a thread while waiting on the database. Patterns are matched in order, so these win over urls.py.
+"""
+from django.urls import path
+from posts import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('', async_views.home, name='home'),
+    path('feed/', async_views.feed, name='feed'),
+    path('feed/events/', async_views.feed_events, name='feed_events'),
+    path('profile/<str:username>', async_views.profile, name='profile'),
+    path('search/', async_views.search, name='search'),
+] + sync_urlpatterns
@@ -45,6 +45,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'posts.middleware.QueryInspectorMiddleware', # Near the top so it also counts the session and user queries
+    'posts.middleware.AsyncViewsMiddleware', # Before anything resolves URLs
+    'posts.middleware.ReplicaStickinessMiddleware', # Before the session middleware, so session writes count too
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,6 +57,7 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'chatter.urls'
+ASGI_URLCONF = 'chatter.asgi_urls' # Used instead for requests served through ASGI, with async versions of the read views
 
 TEMPLATES = [
     {
@@ -81,9 +85,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
 }
 
+# Read replicas are added here, each kept in step with 'default' by the database server (e.g. Postgres streaming
+# replication), and listed in DATABASE_REPLICAS below. chatter/test_settings.py adds one for the tests.
+
+# Read-heavy views (marked @read_from_replica) read from one of these aliases, see posts/routers.py.
+# Browsers that wrote to 'default' read from it for REPLICA_STICKY_SECONDS afterwards, to see their own changes.
+
+DATABASE_ROUTERS = ['posts.routers.ReadReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -142,3 +156,128 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 LOGIN_URL = 'log_in'
 
+
+# Number of posts shown per page of the feed, pages are fetched with a cursor so this is the cost of every page
+
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 100
+
+# Home timelines (see posts/timeline.py), posts are copied into the timeline of each follower when created
+
+TIMELINE_MAX_ENTRIES = 800 # Oldest entries past this are trimmed
+TIMELINE_BACKFILL = 50 # Posts copied into a timeline when a user is followed
+TIMELINE_TRIM_EVERY = 10 # Timelines are trimmed on every n-th post rather than every post
+TIMELINE_FANOUT_BATCH = 1000
+TIMELINE_FANOUT_MAX_FOLLOWERS = 10000 # Posts by users with more followers are pulled when a timeline is read
+
+# Number of posts and of users shown per page of search results. Pages are read with an OFFSET, so pages past
+# SEARCH_MAX_PAGE are not served (each reads every match before it), later page numbers show the last one
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE = 50
+
+# JSON API (see posts/api.py), clients choose a page size up to API_MAX_PAGE_SIZE with '?limit='.
+# Pages larger than API_STREAM_AFTER posts are streamed as they are read instead of being built in memory first
+
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 1000
+API_STREAM_AFTER = 100
+
+# Admin changelists for large tables (see posts/admin_scaling.py): estimated counts, cursor paging and indexed search.
+# Counts of filtered changelists stop at ADMIN_COUNT_LIMIT, searches show at most ADMIN_SEARCH_LIMIT best matches
+
+ADMIN_SCALING = True
+ADMIN_COUNT_LIMIT = 10000
+ADMIN_SEARCH_LIMIT = 1000
+
+# Exports of a user's data (see posts/export.py) are read from the database this many rows at a time
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Streamed responses served through ASGI (see posts/streaming.py) are generated this many bytes at a time
+
+STREAM_BATCH_BYTES = 64 * 1024
+
+# "Who to follow" suggestions (see posts/recommendations.py), recomputed by the recommend_follows command.
+# Follows mark the users whose suggestions change as stale in between, except the followers of users with more
+# than RECOMMENDATIONS_FANOUT_MAX_FOLLOWERS followers, who are left for the next full run
+
+RECOMMENDATIONS_PER_USER = 20
+RECOMMENDATIONS_BATCH = 1000 # Users computed and stored per transaction
+RECOMMENDATIONS_FANOUT_MAX_FOLLOWERS = 10000
+
+# Trending posts (see posts/trending.py), the rank_trending command stores the best TRENDING_SIZE posts of the last
+# TRENDING_WINDOW_HOURS. Scores halve every TRENDING_HALF_LIFE_HOURS and grow with the log of the author's followers.
+# Each process rereads the snapshot at most every TRENDING_REFRESH_SECONDS, 'rank_trending --loop' reranks as often
+
+TRENDING_SIZE = 50
+TRENDING_WINDOW_HOURS = 48
+TRENDING_HALF_LIFE_HOURS = 6
+TRENDING_FOLLOWER_WEIGHT = 1.0
+TRENDING_REFRESH_SECONDS = 300
+
+# Resized copies of post images (see posts/images.py), made by a pool of worker threads after a post is saved
+
+IMAGE_VARIANT_WIDTHS = [300, 600, 1200] # In pixels, 300 is the width of a post card and 600 for high density screens
+IMAGE_WORKERS = 2
+IMAGE_VARIANTS_ASYNC = True # False generates them straight away in the saving thread
+
+# Query inspection (see posts/middleware.py), counts the queries of each request and warns about N+1 patterns
+
+QUERY_INSPECTOR = DEBUG
+QUERY_N_PLUS_ONE_THRESHOLD = 3 # Queries of the same shape run this many times in a request are reported
+QUERY_BUDGET_STRICT = False # Raise an error instead of only logging when a view goes over its @query_budget
+
+# Site-wide totals on the home page (see posts/stats.py), each process rereads them at most this often, in seconds
+
+SITE_STATS_MAX_AGE = 60
+
+# Caches, 'fragments' holds rendered posts (see partials/post_as_table_row.html). Entries are never out of date as
+# the key holds the post and author versions, so they only need to expire to free memory. Use a shared backend
+# such as Redis in production so every process reuses the same rendered posts.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'TIMEOUT': 24 * 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# Sessions and logged in users are read from the 'sessions' cache rather than the database on each request
+# (see posts/sessions.py and posts/backends.py). This cache must be shared by every process serving requests, or
+# logging out or changing the password in one process is not seen by the others. The in-memory cache above is
+# only right for a single process (runserver, or one worker), set the REDIS_URL environment variable
+# (e.g. redis://localhost:6379/1, needs 'pip install redis') to keep it in Redis when running several.
+
+if os.environ.get('REDIS_URL'):
+    CACHES['sessions'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+SESSION_ENGINE = 'posts.sessions'
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_WRITE_BEHIND = 60 # Seconds session changes may stay in the cache only before being written to the database
+AUTHENTICATION_BACKENDS = ['posts.backends.CachedModelBackend']
+USER_CACHE_TIMEOUT = 300
+
+# Live feed updates (see posts/live.py and posts/broker.py), new posts are pushed to open feeds with Server-Sent Events.
+# Streams are only served under ASGI. LocalBroker only reaches listeners in the same process, use
+# 'posts.broker.RedisBroker' with BROKER_OPTIONS = {'url': 'redis://localhost:6379/0'} for several processes.
+
+BROKER_BACKEND = 'posts.broker.LocalBroker'
+BROKER_OPTIONS = {}
+LIVE_HEARTBEAT = 15 # Seconds between keepalive comments on idle streams
+LIVE_MAX_DURATION = 300 # Streams are closed after this many seconds and the browser reconnects
+LIVE_RETRY_MS = 3000
+LIVE_REPLAY_LIMIT = 20 # Most missed posts sent to a browser that reconnects
@@ -0,0 +1,28 @@
+"""
+Settings for the tests, the project settings with what the tests need on top.
+
+manage.py uses them for 'manage.py test'. Other test runners need DJANGO_SETTINGS_MODULE=chatter.test_settings.
+"""
+from .settings import * # noqa: F401,F403
+
+# A separate read replica, so the router tests can tell which database a row was read from. Only ever created
+# as an in-memory test database
+
+DATABASES = {
+    **DATABASES,
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+    },
+}
+
+# The sessions cache stays in the test process even when REDIS_URL is set, so the tests never share it
+
+CACHES = {
+    **CACHES,
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
@@ -16,7 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from posts import views
+from posts import views, api
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -27,12 +27,23 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('sign_up/', views.sign_up, name='sign_up'),
     path('feed/', views.feed, name='feed'),
+    path('feed/following/', views.following_feed, name='following_feed'),
+    path('feed/trending/', views.trending_feed, name='trending_feed'),
+    path('feed/events/', views.feed_events, name='feed_events'),
     path('log_in/', views.log_in, name='log_in'),
     path('log_out/', views.log_out, name='log_out'),
     path('new_post/', views.new_post, name='new_post'),
     path('profile/<str:username>', views.profile, name='profile'),
+    path('profile/<str:username>/followers', views.followers, name='followers'),
+    path('profile/<str:username>/following', views.following, name='following'),
     path('edit_profile/', views.edit_profile, name='edit_profile'),
     path('change_password/', views.change_password, name='change_password'),
     path('follow_toggle/<str:username>', views.follow_toggle, name='follow_toggle'),
-    path('search/', views.search, name='search')
+    path('search/', views.search, name='search'),
+    path('suggestions/', views.suggestions, name='suggestions'),
+    path('export/', views.export, name='export'),
+    # JSON API, see posts/api.py
+    path('api/feed', api.feed, name='api_feed'),
+    path('api/users/<str:username>/posts', api.user_posts, name='api_user_posts'),
+    path('api/search', api.search, name='api_search'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
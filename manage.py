@@ -6,7 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chatter.settings')
+    # The tests add a read replica and keep their caches to themselves, see chatter/test_settings.py
+    settings_module = 'chatter.test_settings' if sys.argv[1:2] == ['test'] else 'chatter.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
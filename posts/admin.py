@@ -1,10 +1,12 @@
 from django.contrib import admin
 from .models import User, Post
+from .admin_scaling import ScalableAdmin
 
 # Register your models here.
+# Both admins page, count, search and drill down by date with index lookups when ADMIN_SCALING is on (see admin_scaling.py)
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(ScalableAdmin):
 
     """Admin interface config for users"""
 
@@ -15,9 +17,19 @@ class UserAdmin(admin.ModelAdmin):
         'last_name',
         'is_active'
     ]
+    search_fields = [
+        'username',
+        'first_name',
+        'last_name'
+    ]
+    search_help_text = 'Start with @ to find usernames beginning with the text'
+    date_hierarchy = 'date_joined'
+    keyset_field = 'date_joined'
+    fts_table = 'posts_user_fts'
+    username_field = 'username'
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ScalableAdmin):
     """Admin interface config for posts"""
 
     list_display = [
@@ -27,10 +39,16 @@ class PostAdmin(admin.ModelAdmin):
         'body',
         'posted_at'
     ]
+    list_select_related = ['author'] # The authors are fetched in the same query rather than one query per row
     search_fields = [
         'title',
         'author__username'
     ]
+    search_help_text = 'Searches titles and bodies, start with @ to find posts by usernames beginning with the text'
     list_filter = [
         'posted_at'
     ]
+    date_hierarchy = 'posted_at'
+    keyset_field = 'posted_at'
+    fts_table = 'posts_post_fts'
+    username_field = 'author__username'
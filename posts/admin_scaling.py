@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .pagination import paginate
+from .queries import repeated_queries
+from . import search
+
+# Admin changelists for tables with tens of millions of rows, turned on with the ADMIN_SCALING setting.
+# Django's defaults run a 'SELECT COUNT(*)' of the whole table on every page (twice when filtered), page with
+# OFFSET so later pages read every row before them, search with LIKE '%term%' and build the date hierarchy with
+# SELECT DISTINCT over the date column. ScalableAdmin replaces each of these with a lookup on an index.
+
+CURSOR_VAR = 'cursor'
+
+
+def estimated_count(queryset):
+    """A cheap stand-in for queryset.count(): estimated for a whole table, counted up to ADMIN_COUNT_LIMIT otherwise."""
+
+    if not queryset.query.where:
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Kept up to date by VACUUM and ANALYZE, -1 for a table that has never been analyzed
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return row[0]
+        # The highest id is read from the end of the primary key index, ids of deleted rows make this an overestimate
+        return queryset.order_by('-pk').values_list('pk', flat=True).first() or 0
+    # Stops counting at the limit, so a filter matching most of a huge table still returns quickly
+    return queryset.order_by()[:settings.ADMIN_COUNT_LIMIT].count()
+
+
+class EstimatedCountPaginator(Paginator):
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)
+
+
+def _truncate(value, kind):
+    return datetime(value.year, value.month if kind != 'year' else 1, value.day if kind == 'day' else 1)
+
+
+def _next(start, kind):
+    if kind == 'year':
+        return start.replace(year=start.year + 1)
+    if kind == 'month':
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start + timedelta(days=1)
+
+
+class IndexedDatesQuerySet(QuerySet):
+    """QuerySet whose datetimes() (used by the admin's date_hierarchy) jumps through an index on the field.
+
+    Each year, month or day found costs one 'WHERE field >= start of the next one ORDER BY field LIMIT 1'
+    lookup, instead of truncating the date of every row and removing duplicates.
+    """
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None, **kwargs):
+        if kind not in ('year', 'month', 'day'):
+            return super().datetimes(field_name, kind, order, tzinfo, **kwargs)
+        tzinfo = tzinfo or timezone.get_current_timezone()
+        values = self.order_by(field_name).values_list(field_name, flat=True)
+        found = []
+        with repeated_queries(): # One lookup per year, month or day is the point, not an N+1 pattern
+            value = values.first()
+            while value is not None:
+                start = _truncate(timezone.localtime(value, tzinfo), kind)
+                found.append(timezone.make_aware(start, tzinfo))
+                value = values.filter(**{f'{field_name}__gte': timezone.make_aware(_next(start, kind), tzinfo)}).first()
+        return found if order == 'ASC' else found[::-1]
+
+
+class KeysetChangeList(ChangeList):
+    """Changelist paged with the feed's (time, id) cursor when sorted by the admin's default ordering.
+
+    'Older' links carry the cursor of the last row shown instead of a page number. Sorting by a column
+    falls back to numbered pages.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        self.keyset = False
+        self.next_page_url = self.first_page_url = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        params = super().get_filters_params(params)
+        params.pop(CURSOR_VAR, None) # Not a filter on the model
+        return params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filtering, searching or sorting starts again from the newest rows
+        if not new_params or CURSOR_VAR not in new_params:
+            remove = [*(remove or []), CURSOR_VAR]
+        return super().get_query_string(new_params, remove)
+
+    def get_results(self, request):
+        if ORDER_VAR in self.params:
+            return super().get_results(request)
+
+        self.keyset = True
+        self.result_list, next_cursor = paginate(
+            self.queryset, cursor=self.cursor, page_size=self.list_per_page, time_field=self.model_admin.keyset_field
+        )
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = self.paginator.count # Estimated, shown as 'about'
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = bool(next_cursor or self.cursor)
+        if next_cursor:
+            self.next_page_url = self.get_query_string({CURSOR_VAR: next_cursor})
+        if self.cursor:
+            self.first_page_url = self.get_query_string()
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Base for admins of large tables, behaving like a plain ModelAdmin when ADMIN_SCALING is off.
+
+    keyset_field names the indexed date field rows are paged on, newest first, with id breaking ties.
+    fts_table is the full text index searched (see search.py). Search terms starting with '@' match
+    usernames by prefix on username_field instead.
+    """
+
+    keyset_field = None
+    fts_table = None
+    username_field = None
+
+    @property
+    def show_full_result_count(self):
+        return not settings.ADMIN_SCALING
+
+    def get_ordering(self, request):
+        return [f'-{self.keyset_field}', '-id']
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if settings.ADMIN_SCALING:
+            queryset = IndexedDatesQuerySet(queryset.model, query=queryset.query, using=queryset._db)
+        return queryset
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        paginator_class = EstimatedCountPaginator if settings.ADMIN_SCALING else Paginator
+        return paginator_class(queryset, per_page, orphans, allow_empty_first_page)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList if settings.ADMIN_SCALING else ChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not settings.ADMIN_SCALING or not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        if search_term.startswith('@'):
+            # A range on the unique index, where LIKE 'term%' would read every row
+            return queryset.filter(**{
+                f'{self.username_field}__gte': search_term, f'{self.username_field}__lt': search_term + '\uffff'
+            }), False
+        if search.is_supported(queryset.db):
+            ids = search.matching_ids(self.fts_table, search_term, settings.ADMIN_SEARCH_LIMIT, using=queryset.db)
+            return queryset.filter(pk__in=ids), False
+        return super().get_search_results(request, queryset, search_term)
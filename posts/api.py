@@ -0,0 +1,174 @@
+import json
+from functools import wraps
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+from .models import User, Post
+from .pagination import PageStream
+from .queries import query_budget
+from .routers import read_from_replica
+from .search import search_posts, search_users
+from .streaming import streaming_response
+from .views import _page_number, _next_page
+
+try:
+    import orjson # In requirements.txt, encodes several times faster than the json module used if it is missing
+except ImportError:
+    orjson = None
+
+# Read-only JSON API with the data of the feed, profile and search pages, for the mobile client and integrations.
+# Requests are authenticated by the session cookie like the pages, errors are answered with {"error": "..."}.
+#
+# Sparse fieldsets: '?fields[posts]=title,author&fields[users]=username' returns only those fields, and only
+# their columns are read from the database. Lists of posts are paginated with the feed's cursor, the response's
+# 'next_cursor' is sent back as '?cursor=' for the next page, '?limit=' sets the page size.
+
+CONTENT_TYPE = 'application/json'
+
+POST_FIELDS = ['id', 'title', 'body', 'image', 'posted_at', 'author']
+USER_FIELDS = ['id', 'username', 'first_name', 'last_name', 'bio', 'num_followers', 'num_following', 'num_posts']
+
+
+class InvalidParameter(Exception):
+    pass
+
+
+def dumps(value):
+    """Encode a value to JSON bytes, with orjson or the json module, which give the same bytes."""
+
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def error_response(message, status):
+    return HttpResponse(dumps({'error': message}), status=status, content_type=CONTENT_TYPE)
+
+
+def api_view(view_function):
+    """Decorator for API views: GET only, logged in users only, and InvalidParameter answered with 400 Bad Request."""
+
+    @require_safe
+    @wraps(view_function)
+    def modified_view_function(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error_response('Authentication required', 401) # Not a redirect to the log in page
+        try:
+            return view_function(request, *args, **kwargs)
+        except InvalidParameter as error:
+            return error_response(str(error), 400)
+    return modified_view_function
+
+
+def _fieldset(request, resource, allowed):
+    # 'fields[posts]=id,title', every field when the parameter is missing
+    value = request.GET.get(f'fields[{resource}]')
+    if value is None:
+        return allowed
+    fields = [field for field in value.split(',') if field]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise InvalidParameter(f"Unknown {resource} fields: {', '.join(unknown)}")
+    return fields
+
+
+def _page_size(request):
+    value = request.GET.get('limit')
+    if value is None:
+        return settings.API_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidParameter('limit must be a number')
+    if not 1 <= limit <= settings.API_MAX_PAGE_SIZE:
+        raise InvalidParameter(f'limit must be between 1 and {settings.API_MAX_PAGE_SIZE}')
+    return limit
+
+
+def _post_queryset(queryset, post_fields, user_fields):
+    # Only the columns of the requested fields, plus the ones the cursor is made from
+    columns = {'id', 'posted_at', *post_fields}
+    if 'author' in post_fields:
+        queryset = queryset.select_related('author') # The authors come in the same query
+        columns.update(f'author__{field}' for field in user_fields)
+    return queryset.only(*columns)
+
+
+def serialize_user(user, fields):
+    return {field: getattr(user, field) for field in fields}
+
+
+def serialize_post(post, fields, user_fields):
+    data = {}
+    for field in fields:
+        if field == 'author':
+            data[field] = serialize_user(post.author, user_fields)
+        elif field == 'image':
+            data[field] = post.image.url if post.image else None
+        elif field == 'posted_at':
+            data[field] = post.posted_at.isoformat() # orjson and json would write datetimes differently
+        else:
+            data[field] = getattr(post, field)
+    return data
+
+
+def _page_chunks(page, serialize, **extra):
+    # {...extra, "results": [...], "next_cursor": ...} written one post at a time, so it can be streamed.
+    # next_cursor is only known once every post of the page has been read, so it comes last
+    head = dumps(extra)[:-1] # Without the closing brace
+    yield head + (b',' if extra else b'') + b'"results":['
+    for position, item in enumerate(page):
+        yield (b',' if position else b'') + dumps(serialize(item))
+    yield b'],"next_cursor":' + dumps(page.next_cursor) + b'}'
+
+
+def _page_response(request, queryset, **extra):
+    post_fields = _fieldset(request, 'posts', POST_FIELDS)
+    user_fields = _fieldset(request, 'users', USER_FIELDS)
+    page = PageStream(_post_queryset(queryset, post_fields, user_fields), _page_size(request), request.GET.get('cursor'))
+    chunks = _page_chunks(page, lambda post: serialize_post(post, post_fields, user_fields), **extra)
+    if page.page_size > settings.API_STREAM_AFTER:
+        # Sent while the posts are read, rather than building the whole page in memory first
+        return streaming_response(request, chunks, content_type=CONTENT_TYPE)
+    return HttpResponse(b''.join(chunks), content_type=CONTENT_TYPE)
+
+
+@api_view
+@read_from_replica
+@query_budget(3)
+def feed(request):
+    return _page_response(request, Post.objects.all())
+
+
+@api_view
+@read_from_replica
+@query_budget(4)
+def user_posts(request, username):
+    user_fields = _fieldset(request, 'users', USER_FIELDS)
+    user = User.objects.filter(username=username).only(*user_fields).first()
+    if user is None:
+        return error_response('User not found', 404)
+    return _page_response(request, Post.objects.filter(author=user), user=serialize_user(user, user_fields))
+
+
+@api_view
+@read_from_replica
+@query_budget(5)
+def search(request):
+    post_fields = _fieldset(request, 'posts', POST_FIELDS)
+    user_fields = _fieldset(request, 'users', USER_FIELDS)
+    query = request.GET.get('query')
+    page = _page_number(request.GET.get('page'))
+    # Results are ranked by relevance, so they are paged by number like the search page rather than by cursor
+    if query:
+        posts, more_posts = search_posts(query, page=page)
+        users, more_users = search_users(query, page=page)
+    else:
+        posts, more_posts = [], False
+        users, more_users = [], False
+
+    return HttpResponse(dumps({
+        'posts': [serialize_post(post, post_fields, user_fields) for post in posts],
+        'users': [serialize_user(user, user_fields) for user in users],
+        'next_page': _next_page(page, more_posts or more_users),
+    }), content_type=CONTENT_TYPE)
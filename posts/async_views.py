@@ -0,0 +1,100 @@
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import StreamingHttpResponse
+from django.shortcuts import render, redirect
+from .models import User, Post, Follow, following_status
+from .forms import PostForm
+from .pagination import apaginate, _parse_id
+from .search import search_posts, search_users
+from .stats import atotals as site_totals
+from .conditional import conditional_page, ahome_etag, afeed_etag, aprofile_etag, aload_user
+from .live import post_events, ClosingStream
+from .routers import read_from_replica
+from .views import _page_number, _next_page
+
+# Async versions of the read-only views in views.py, served instead of them when running under ASGI
+# (see chatter/asgi_urls.py). They render the same templates with the same context, but wait for the
+# database without holding a thread, so a worker can serve many requests at once.
+# request.user has to be loaded with aload_user() before it is used, as loading it queries synchronously.
+
+
+# Async counterpart of django.contrib.auth.decorators.login_required, which only works for sync views
+def login_required(view_function):
+    @wraps(view_function)
+    async def modified_view_function(request, *args, **kwargs):
+        user = await aload_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path()) # To LOGIN_URL, coming back here afterwards
+        return await view_function(request, *args, **kwargs)
+    return modified_view_function
+
+
+@read_from_replica
+@conditional_page(ahome_etag)
+async def home(request):
+    await aload_user(request) # The template checks whether the user is logged in
+    totals = await site_totals()
+    return render(request, 'home.html', {'user_count': totals['users'], 'post_count': totals['posts']})
+
+
+@login_required
+@read_from_replica
+@conditional_page(afeed_etag)
+async def feed(request):
+    form = PostForm()
+    posts, next_cursor = await apaginate(Post.objects.select_related('author'), cursor=request.GET.get('cursor'))
+    return render(request, "feed.html", {'form': form, 'posts': posts, 'next_cursor': next_cursor})
+
+
+@login_required
+async def feed_events(request):
+    # Server-Sent Events stream of new posts, waiting on it costs no thread (see live.py)
+    try:
+        last_event_id = _parse_id(request.headers['Last-Event-ID']) # Sent by browsers when they reconnect
+    except (KeyError, ValueError): # Ids the database can't hold are ignored too
+        last_event_id = None
+    response = StreamingHttpResponse(ClosingStream(post_events(last_event_id)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # Stops nginx holding events back in its buffer
+    return response
+
+
+@login_required
+@read_from_replica
+@conditional_page(aprofile_etag)
+async def profile(request, username):
+    user = await User.objects.filter(username=username).afirst()
+    if user is None:
+        return redirect('feed')
+    posts = [post async for post in Post.objects.filter(author=user).select_related('author').order_by('-posted_at', '-id')]
+    # Same lookup as User.is_following(), which is synchronous
+    following = await Follow.objects.filter(from_user_id=user.pk, to_user_id=request.user.pk).aexists()
+    can_follow = (request.user != user)
+    return render(request, 'profile.html', {'user': user, 'posts': posts, 'following': following, 'can_follow': can_follow})
+
+
+@login_required
+@read_from_replica
+async def search(request):
+    query = request.GET.get('query')
+    page = _page_number(request.GET.get('page'))
+    if query:
+        # Full text search runs raw SQL, which Django can only do synchronously, so it goes to a thread
+        posts, more_posts = await sync_to_async(search_posts)(query, page=page)
+        users, more_users = await sync_to_async(search_users)(query, page=page)
+        followed = await sync_to_async(following_status)(request.user, users)
+        for user in users:
+            user.followed_by_viewer = followed[user.pk]
+    else:
+        posts, more_posts = [], False
+        users, more_users = [], False
+
+    return render(request, 'search_results.html', {
+        'query': query,
+        'posts': posts,
+        'users': users,
+        'page': page,
+        'next_page': _next_page(page, more_posts or more_users),
+        'previous_page': page - 1 if page > 1 else None
+    })
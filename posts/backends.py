@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from .queries import count_saved_query
+
+# Authentication backend keeping logged in users in the SESSION_CACHE_ALIAS cache, so AuthenticationMiddleware
+# doesn't fetch the user row on every request. Cached users are dropped by signals.py when they are saved
+# (editing the profile, changing the password) or log out, and otherwise expire after USER_CACHE_TIMEOUT seconds.
+# Counters updated with F() expressions don't send signals, so request.user's counters can be that far behind.
+
+
+def user_cache_key(user_id):
+    return f'posts.user.{user_id}'
+
+
+def forget_user(user_id):
+    """Drop the cached copy of a user, the next request loads them from the database again."""
+
+    caches[settings.SESSION_CACHE_ALIAS].delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        cache = caches[settings.SESSION_CACHE_ALIAS]
+        user = cache.get(user_cache_key(user_id))
+        if user is not None:
+            count_saved_query() # The user row was not read
+            return user if self.user_can_authenticate(user) else None
+        user = super().get_user(user_id)
+        if user is not None:
+            cache.set(user_cache_key(user_id), user, settings.USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,161 @@
+import asyncio
+import copy
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import async_to_sync
+from django.db import connection, connections
+from django.test import Client, AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .models import User, Post
+from .pagination import encode_cursor
+
+# Drives the views through the test client against a seeded database and measures them, used by
+# 'manage.py benchmark'. Reports are plain dictionaries so they can be saved as JSON and compared later.
+
+# Views that have an async version (see async_views.py), compared under WSGI and ASGI by measure_throughput()
+ASYNC_VIEWS = ['home', 'feed', 'profile', 'search']
+
+# A result is worse than the baseline if it is more than (1 + threshold) times the baseline value
+COMPARED_METRICS = ['p50_ms', 'p90_ms', 'peak_memory_kb']
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summarize(latencies, query_counts, peak_memory):
+    """Turn the raw measurements of one view into the numbers stored in the report."""
+
+    return {
+        'requests': len(latencies),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 0.9) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3),
+        'queries': max(query_counts),
+        'peak_memory_kb': round(peak_memory / 1024, 1),
+    }
+
+
+def view_requests():
+    """Return the requests to measure for the data currently in the database, as name -> (client, url) pairs."""
+
+    viewer = User.objects.order_by('-num_following', 'pk').first() # Follows the most people, worst case for their timeline
+    popular = User.objects.order_by('-num_followers', 'pk').first() # Most followers and so the heaviest profile
+    other = User.objects.exclude(pk__in=[viewer.pk, popular.pk]).order_by('pk').first() or popular
+
+    client = Client()
+    client.force_login(viewer) # Skips password hashing, which would otherwise dominate the timings
+    anonymous = Client()
+
+    requests = {
+        'home': (anonymous, reverse('home')),
+        'feed': (client, reverse('feed')),
+        'following_feed': (client, reverse('following_feed')),
+        'profile': (client, reverse('profile', kwargs={'username': popular.username})),
+        'follow_toggle': (client, reverse('follow_toggle', kwargs={'username': other.username})),
+    }
+
+    # A page from the middle of the feed, which must cost the same as the first one
+    middle = Post.objects.order_by('-posted_at', '-id').values_list('posted_at', 'pk')[Post.objects.count() // 2:][:1]
+    for posted_at, pk in middle:
+        requests['feed_deep_page'] = (client, f"{reverse('feed')}?cursor={encode_cursor(posted_at, pk)}")
+
+    word = Post.objects.values_list('title', flat=True).first()
+    if word:
+        requests['search'] = (client, f"{reverse('search')}?query={word.split()[0]}")
+    return requests
+
+
+def measure(client, url, repeat, warmup=2):
+    """Request the URL repeat times, returns the summary of its latencies, queries and peak memory."""
+
+    for _ in range(warmup):
+        client.get(url)
+
+    latencies = []
+    query_counts = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url)
+            latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{url} answered {response.status_code}')
+        query_counts.append(len(queries))
+
+    # Memory is traced in a separate request as tracing slows everything down and would skew the latencies
+    tracemalloc.start()
+    try:
+        client.get(url)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return summarize(latencies, query_counts, peak_memory)
+
+
+def measure_throughput(client, url, concurrency, total):
+    """Request the URL total times with concurrency requests in flight at once, through WSGI and through ASGI.
+
+    Returns the requests per second of each. WSGI requests go to the sync views, one thread per request in
+    flight like a threaded WSGI server. ASGI requests go to the async views, all on one event loop.
+    """
+
+    def wsgi_worker(count):
+        worker = Client()
+        worker.cookies = copy.deepcopy(client.cookies) # Same logged in session
+        try:
+            for _ in range(count):
+                worker.get(url)
+        finally:
+            connections.close_all() # Each thread opened its own connections
+
+    async def asgi_worker(count):
+        worker = AsyncClient()
+        worker.cookies = copy.deepcopy(client.cookies)
+        for _ in range(count):
+            await worker.get(url)
+
+    async def asgi_run(counts):
+        await asyncio.gather(*[asgi_worker(count) for count in counts])
+
+    counts = [total // concurrency + (1 if n < total % concurrency else 0) for n in range(concurrency)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(wsgi_worker, counts))
+    wsgi_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    async_to_sync(asgi_run)(counts) # The ORM's threads run on this thread, which owns the test database connection
+    asgi_seconds = time.perf_counter() - start
+
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'wsgi_rps': round(total / wsgi_seconds, 1),
+        'asgi_rps': round(total / asgi_seconds, 1),
+    }
+
+
+def compare(report, baseline, threshold):
+    """Return a description of every result in the report that regressed against the baseline report."""
+
+    regressions = []
+    for size, views in report['results'].items():
+        for view, result in views.items():
+            before = baseline.get('results', {}).get(size, {}).get(view)
+            if before is None:
+                continue # New views or sizes have nothing to compare against
+            for metric in COMPARED_METRICS:
+                if before[metric] > 0 and result[metric] > before[metric] * (1 + threshold):
+                    regressions.append(f'{view} at {size} posts: {metric} {before[metric]} -> {result[metric]}')
+            if result['queries'] > before['queries']: # Query counts are exact, any increase is a regression
+                regressions.append(f"{view} at {size} posts: queries {before['queries']} -> {result['queries']}")
+    return regressions
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+# Publish/subscribe for live updates (see live.py). Messages are JSON-serializable values published on a named
+# channel from ordinary sync code, and received by async views that hold a subscription open.
+# The backend is chosen with the BROKER_BACKEND setting, BROKER_OPTIONS are passed to its constructor.
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the broker of this process, created from the settings on first use."""
+
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.BROKER_BACKEND)(**settings.BROKER_OPTIONS)
+        return _broker
+
+
+def reset_broker():
+    """Forget the broker so the next get_broker() builds a new one, for tests changing the settings."""
+
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+class LocalBroker:
+    """Delivers messages to subscribers in the same process, enough for a single ASGI worker and for tests.
+
+    publish() may be called from any thread, messages are handed to each subscriber's event loop.
+    A subscriber that falls more than queue_size messages behind misses the newer ones.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set) # Channel -> {(event loop, queue)}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers[channel])
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_put, queue, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        """Async context manager giving a subscription, whose 'await get()' waits for the next message."""
+
+        queue = asyncio.Queue(self.queue_size)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[channel].add(subscriber)
+        try:
+            yield queue # asyncio.Queue already has the get() coroutine subscriptions need
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(subscriber)
+
+
+def _put(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass # A stalled listener, it catches up with Last-Event-ID when it reconnects
+
+
+class RedisBroker:
+    """Delivers messages through Redis pub/sub, so every process and server sees every message.
+
+    Needs the 'redis' package, set BROKER_OPTIONS = {'url': 'redis://...'}.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0'):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('RedisBroker needs the redis package, pip install redis')
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, channel, message):
+        self._client.publish(channel, json.dumps(message))
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+        try:
+            yield _RedisSubscription(pubsub)
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+            await client.close()
+
+
+class _RedisSubscription:
+
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self):
+        async for message in self.pubsub.listen():
+            if message['type'] == 'message':
+                return json.loads(message['data'])
@@ -0,0 +1,138 @@
+import hashlib
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import Exists, OuterRef, Subquery
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from .models import User, Post, Follow
+from . import stats
+
+# ETags for pages that are read far more often than they change. Each ETag is worked out from a few cheap
+# values before the view runs, when it matches the one the browser sent the page is answered with
+# '304 Not Modified' and nothing else is queried or rendered.
+
+
+def make_etag(*parts):
+    # Hashed so user ids and cookie values are not sent back in the header
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _viewer(request):
+    # The CSRF secret is included as pages with forms hold a token made from it, and it changes on every login.
+    # get_token() creates the secret if the browser has none yet, so the first page's ETag already includes it.
+    get_token(request)
+    return request.user.pk, request.META['CSRF_COOKIE']
+
+
+async def aload_user(request):
+    """Load request.user for an async view, returns it. Further uses of request.user don't query again."""
+
+    # The user (and session) are loaded lazily by a synchronous query the first time they are used,
+    # which async code is not allowed to run, so do it in a thread once
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+# Every ETag function has an async twin for the views in async_views.py, working out the same ETag
+
+def home_etag(request):
+    return _home_etag(request, stats.totals()) # Cached in the process, usually no query at all
+
+
+async def ahome_etag(request):
+    await aload_user(request)
+    return _home_etag(request, await stats.atotals())
+
+
+def _home_etag(request, totals):
+    return make_etag('home', *_viewer(request), totals['users'], totals['posts'])
+
+
+def feed_etag(request):
+    # One primary key lookup, bumped by signals.py whenever a post is created, edited or deleted or a user renamed
+    return _feed_etag(request, *stats.current('posts_version'))
+
+
+async def afeed_etag(request):
+    await aload_user(request)
+    return _feed_etag(request, *await stats.acurrent('posts_version'))
+
+
+def _feed_etag(request, posts_version):
+    return make_etag('feed', *_viewer(request), posts_version, request.GET.get('cursor'), settings.FEED_PAGE_SIZE)
+
+
+def profile_etag(request, username):
+    return _profile_etag(request, _profile_row(request, username).first())
+
+
+async def aprofile_etag(request, username):
+    await aload_user(request)
+    return _profile_etag(request, await _profile_row(request, username).afirst())
+
+
+def _profile_row(request, username):
+    # The profile row and whether the viewer follows them, in one query on indexes.
+    # The user's version changes with their details, num_posts with new and deleted posts, last_edit with post edits.
+    posts = Post.objects.filter(author_id=OuterRef('pk'))
+    return User.objects.filter(username=username).annotate(
+        followed=Exists(Follow.objects.filter(from_user_id=OuterRef('pk'), to_user_id=request.user.pk)),
+        latest_post=Subquery(posts.order_by('-pk').values('pk')[:1]),
+        last_edit=Subquery(posts.filter(edited_at__isnull=False).order_by('-edited_at').values('edited_at')[:1]),
+    ).values_list('pk', 'version', 'num_followers', 'num_following', 'num_posts', 'followed', 'latest_post', 'last_edit')
+
+
+def _profile_etag(request, row):
+    if row is None:
+        return None # The view redirects, leave that alone
+    return make_etag('profile', *_viewer(request), *row)
+
+
+def conditional_page(etag_func):
+    """Decorator answering GET requests with 304 Not Modified when the ETag from etag_func is the one the browser has.
+
+    Pages with messages waiting are always rendered in full, as showing a message uses it up.
+    Browsers are told to check back on every visit, and never to share the page with other users.
+    Async views need an async etag_func.
+    """
+
+    def decorator(view_function):
+        if iscoroutinefunction(view_function):
+            @wraps(view_function)
+            async def modified_view_function(request, *args, **kwargs):
+                etag = None
+                if _may_use_etag(request):
+                    etag = await etag_func(request, *args, **kwargs)
+                return _not_modified(request, etag) or _add_etag(await view_function(request, *args, **kwargs), etag)
+        else:
+            @wraps(view_function)
+            def modified_view_function(request, *args, **kwargs):
+                etag = None
+                if _may_use_etag(request):
+                    etag = etag_func(request, *args, **kwargs)
+                return _not_modified(request, etag) or _add_etag(view_function(request, *args, **kwargs), etag)
+        return modified_view_function
+    return decorator
+
+
+def _may_use_etag(request):
+    # Counting the messages does not mark them as seen
+    return request.method in ('GET', 'HEAD') and not len(get_messages(request))
+
+
+def _not_modified(request, etag):
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=quote_etag(etag))
+    if response is not None:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _add_etag(response, etag):
+    if etag is not None and response.status_code == 200 and not response.has_header('ETag'):
+        response['ETag'] = quote_etag(etag)
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,65 @@
+from collections import Counter
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import User, Post, Follow
+
+# Helpers for the denormalized counters on User (num_followers, num_following, num_posts).
+# Each change is a single 'UPDATE ... SET n = n + x' so concurrent follows never lose an increment.
+
+
+def add_follows(pairs, sign=1):
+    """Update the counters for (follower id, followed id) pairs that were just followed, or unfollowed if sign is -1."""
+
+    followers = Counter(follower_id for follower_id, _ in pairs)
+    followed = Counter(followed_id for _, followed_id in pairs)
+    _apply(followers, 'num_following', sign)
+    _apply(followed, 'num_followers', sign)
+
+
+def add_posts(author_ids, sign=1):
+    """Update the post counters of the authors of posts that were just created, or deleted if sign is -1."""
+
+    _apply(Counter(author_ids), 'num_posts', sign)
+
+
+def _apply(counts, field, sign):
+    # Users with the same change share one UPDATE statement
+    by_amount = {}
+    for pk, amount in counts.items():
+        by_amount.setdefault(amount * sign, []).append(pk)
+    for amount, pks in by_amount.items():
+        User.objects.filter(pk__in=pks).update(**{field: F(field) + amount})
+
+
+def _count_of(queryset, field):
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def recount_users(batch_size=10000):
+    """Recompute every user's counters from the follower and post tables, one range of primary keys at a time.
+
+    Yields the number of users updated after each batch so callers can report progress.
+    """
+
+    last_pk = 0
+    while True:
+        pks = list(User.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        yield _recount(User.objects.filter(pk__gte=pks[0], pk__lte=pks[-1]))
+        last_pk = pks[-1]
+
+
+def recount_user_ids(pks):
+    """Recompute the counters of the given users only, returns the number updated."""
+
+    return _recount(User.objects.filter(pk__in=pks)) if pks else 0
+
+
+def _recount(users):
+    return users.update(
+        num_followers=_count_of(Follow.objects.all(), 'from_user'),
+        num_following=_count_of(Follow.objects.all(), 'to_user'),
+        num_posts=_count_of(Post.objects.all(), 'author'),
+    )
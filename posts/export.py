@@ -0,0 +1,64 @@
+import csv
+import json
+from django.conf import settings
+from django.core.files.storage import default_storage
+from .models import Post
+
+# Exports of a user's posts, followers and following, as JSON Lines or CSV, for the export view and command.
+# Everything is a generator reading the database with iterator(), in chunks of EXPORT_CHUNK_SIZE rows,
+# so an account with hundreds of thousands of posts is exported in constant memory.
+
+SECTIONS = ['posts', 'followers', 'following']
+FORMATS = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'} # Content types
+
+# Every record has a 'type', posts fill the post columns and users the user columns
+CSV_COLUMNS = ['type', 'id', 'username', 'first_name', 'last_name', 'title', 'body', 'image', 'posted_at']
+POST_COLUMNS = ['id', 'title', 'body', 'image', 'posted_at']
+USER_COLUMNS = ['id', 'username', 'first_name', 'last_name']
+
+
+def records(user, sections=SECTIONS, chunk_size=None):
+    """Yield a dictionary for each of the user's posts (oldest first), followers and followed users."""
+
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    if 'posts' in sections:
+        posts = Post.objects.filter(author=user).order_by('posted_at', 'id').values_list(*POST_COLUMNS)
+        for pk, title, body, image, posted_at in posts.iterator(chunk_size=chunk_size):
+            yield {
+                'type': 'post', 'id': pk, 'title': title, 'body': body,
+                'image': default_storage.url(image) if image else None, 'posted_at': posted_at.isoformat()
+            }
+    # user.followers are the users following them, user.following the users they follow (see models.py)
+    for section, users, record_type in [('followers', user.followers, 'follower'), ('following', user.following, 'following')]:
+        if section in sections:
+            for row in users.order_by('pk').values_list(*USER_COLUMNS).iterator(chunk_size=chunk_size):
+                yield {'type': record_type, **dict(zip(USER_COLUMNS, row))}
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class _Line:
+    # File-like object for csv.writer whose write() hands back the line instead of storing it
+    def write(self, line):
+        return line
+
+
+def csv_lines(records):
+    writer = csv.DictWriter(_Line(), fieldnames=CSV_COLUMNS)
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+def export_lines(user, export_format, sections=SECTIONS, chunk_size=None):
+    """Yield the lines of the user's export in the given format, 'jsonl' or 'csv'."""
+
+    lines = jsonl_lines if export_format == 'jsonl' else csv_lines
+    return lines(records(user, sections, chunk_size))
+
+
+def filename(user, export_format):
+    return f"chatter-{user.username.lstrip('@')}.{export_format}"
@@ -0,0 +1,95 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps
+from .models import Post
+from . import stats
+
+# Resized JPEG and WebP copies of post images, so feed rows don't download the full size upload.
+# They are made by a pool of worker threads after the post is saved, off the request/response path,
+# and recorded in Post.image_variants. Until then the row template shows the original image.
+
+logger = logging.getLogger(__name__)
+
+# Format name used in Post.image_variants -> (Pillow format, file extension, save options)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS, thread_name_prefix='image-variants')
+    return _executor
+
+
+def schedule_variants(post):
+    """Queue the variants of a post's image to be generated once the post is committed to the database."""
+
+    if post.image:
+        post_id = post.pk
+        transaction.on_commit(lambda: submit(post_id))
+
+
+def submit(post_id):
+    if settings.IMAGE_VARIANTS_ASYNC:
+        _get_executor().submit(_generate_in_worker, post_id)
+    else:
+        generate_variants(post_id)
+
+
+def _generate_in_worker(post_id):
+    try:
+        generate_variants(post_id)
+    except Exception:
+        logger.exception('Could not generate image variants for post %s', post_id)
+    finally:
+        connection.close() # Each worker thread has its own connection, don't leave it open between jobs
+
+
+def generate_variants(post_id):
+    """Write the resized copies of a post's image to storage and record them on the post, returns the variants."""
+
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return {}
+
+    with post.image.open('rb') as file:
+        original = Image.open(file)
+        original = ImageOps.exif_transpose(original) # Apply the camera rotation before resizing
+
+    variants = {}
+    for width in _widths_for(original.width):
+        resized = original.copy()
+        resized.thumbnail((width, width * 10), Image.LANCZOS) # Height is left free, only the width matters
+        for name, (image_format, extension, options) in FORMATS.items():
+            image = resized
+            if image_format == 'JPEG' and image.mode != 'RGB':
+                image = image.convert('RGB') # JPEG has no alpha channel or palette
+            buffer = io.BytesIO()
+            image.save(buffer, image_format, **options)
+            path = f'post_images/variants/{post_id}_{resized.width}w.{extension}'
+            default_storage.delete(path) # Regenerating replaces the old file instead of adding a suffix
+            path = default_storage.save(path, ContentFile(buffer.getvalue()))
+            variants.setdefault(name, {})[str(resized.width)] = path
+
+    # Only these fields are written, so a concurrent edit of the post is not overwritten.
+    # The version bump makes the cached row be rendered again, now with the resized images.
+    Post.objects.filter(pk=post_id).update(image_variants=variants, version=F('version') + 1, edited_at=timezone.now())
+    stats.add('posts_version')
+    return variants
+
+
+def _widths_for(original_width):
+    # Images are never enlarged, a small original just gets one variant at its own width
+    return sorted({min(width, original_width) for width in settings.IMAGE_VARIANT_WIDTHS})
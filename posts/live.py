@@ -0,0 +1,102 @@
+import asyncio
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from .broker import get_broker
+from .models import Post
+
+# Live feed updates with Server-Sent Events. New posts are rendered once and published on the broker
+# (see broker.py), every open /feed/events/ stream receives them and the page inserts the row at the top.
+
+CHANNEL = 'posts'
+
+
+def render_post(post):
+    return render_to_string('partials/post_as_table_row.html', {'post': post})
+
+
+def publish_post(post):
+    """Push a new post to the open feeds once the transaction creating it has committed."""
+
+    transaction.on_commit(lambda: get_broker().publish(CHANNEL, {'id': post.pk, 'html': render_post(post)}))
+
+
+def sse_event(data, event=None, event_id=None):
+    """Format a message in the text/event-stream format, multi-line data becomes several 'data:' fields."""
+
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event is not None:
+        lines.append(f'event: {event}')
+    lines += [f'data: {line}' for line in data.splitlines() or ['']]
+    return '\n'.join(lines) + '\n\n'
+
+
+async def post_events(last_event_id=None):
+    """Async generator of the SSE stream of new posts, ends after LIVE_MAX_DURATION seconds.
+
+    The time limit also stops streams to browsers that went away, which Django 4.2 does not notice while streaming.
+
+    Browsers reconnect by themselves when a stream ends, sending the id of the last post they got as
+    Last-Event-ID, and the posts they missed in between are sent first.
+    """
+
+    loop = asyncio.get_running_loop()
+    async with get_broker().subscribe(CHANNEL) as subscription:
+        yield f'retry: {settings.LIVE_RETRY_MS}\n\n' # How long browsers wait before reconnecting
+        # Subscribed before looking for missed posts, so one created in between is not lost (the page skips duplicates)
+        if last_event_id is not None:
+            missed = Post.objects.filter(pk__gt=last_event_id).select_related('author').order_by('-pk')
+            replay = [post async for post in missed[:settings.LIVE_REPLAY_LIMIT]]
+            for post in reversed(replay): # Oldest first, each one goes on top of the previous
+                yield sse_event(render_post(post), event='post', event_id=post.pk)
+
+        deadline = loop.time() + settings.LIVE_MAX_DURATION
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(subscription.get(), min(settings.LIVE_HEARTBEAT, remaining))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n' # Comment line, stops proxies closing an idle connection
+                continue
+            yield sse_event(message['html'], event='post', event_id=message['id'])
+
+
+class ClosingStream:
+    """Async iterator over an async generator for StreamingHttpResponse, closing the generator with the response.
+
+    When a response is finished Django closes its own wrapper around the streamed content and calls the content's
+    close(), but never closes the generator itself. Left suspended, post_events() would keep its broker
+    subscription until garbage collected, by then outside the event loop it ran on.
+    """
+
+    def __init__(self, generator):
+        self.generator = generator
+        self._loop = None
+        self._closed = False
+        self._closing = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        self._loop = asyncio.get_running_loop()
+        return await self.generator.__anext__()
+
+    async def aclose(self):
+        self._closed = True
+        await self.generator.aclose()
+
+    def close(self):
+        if self._closed or self._loop is None or self._loop.is_closed():
+            return # Never started or closed already, so there is nothing to clean up
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            # Closed from the event loop itself (the test client does this), close the generator next
+            self._closing = self._loop.create_task(self.aclose())
+        else:
+            # Closed from a worker thread (ASGIHandler calls close() with sync_to_async), wait for the loop to close it
+            asyncio.run_coroutine_threadsafe(self.aclose(), self._loop).result()
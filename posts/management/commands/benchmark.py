@@ -0,0 +1,101 @@
+import json
+import platform
+import subprocess
+from io import StringIO
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from posts.benchmark import ASYNC_VIEWS, view_requests, measure, measure_throughput, compare
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Measures the latency, query count and memory of the main views on seeded databases of several sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,100000,1000000', help='Comma separated numbers of posts to seed')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per view')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed passed to the seed command')
+        parser.add_argument('--output', help='File to write the JSON report to')
+        parser.add_argument('--compare', help='Report of an earlier run to compare against')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown before failing, 0.25 is 25%%')
+        parser.add_argument('--concurrency', type=int, default=0, help='Also compare WSGI and ASGI throughput with this many requests in flight')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma separated list of numbers')
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'requests': options['requests'],
+            'results': {},
+            'throughput': {}, # Only filled with --concurrency, not compared against baselines
+        }
+
+        setup_test_environment() # Lets the test client talk to the views as 'testserver'
+        try:
+            for size in sizes:
+                report['results'][str(size)], report['throughput'][str(size)] = self._run_size(size, options)
+        finally:
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(report, baseline, options['threshold'])
+            if regressions:
+                raise CommandError('Performance regressions found:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
+
+    def _run_size(self, size, options):
+        # Every size gets a fresh throwaway database, like the test runner does, so real data is never touched
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f'Seeding {size} posts...')
+            call_command(
+                'seed', users=max(10, size // 10), posts=size, follows=size * 2, seed=options['seed'], stdout=StringIO()
+            )
+            results = {}
+            for view, (client, url) in view_requests().items():
+                results[view] = measure(client, url, options['requests'])
+                result = results[view]
+                self.stdout.write(
+                    f"  {view:<16} p50 {result['p50_ms']:>9.2f}ms  p90 {result['p90_ms']:>9.2f}ms  "
+                    f"p99 {result['p99_ms']:>9.2f}ms  {result['queries']:>3} queries  {result['peak_memory_kb']:>9.1f}KB"
+                )
+
+            throughput = {}
+            if options['concurrency']:
+                for view, (client, url) in view_requests().items():
+                    if view not in ASYNC_VIEWS:
+                        continue
+                    total = options['requests'] * options['concurrency']
+                    throughput[view] = result = measure_throughput(client, url, options['concurrency'], total)
+                    self.stdout.write(
+                        f"  {view:<16} {result['concurrency']} in flight: WSGI {result['wsgi_rps']:>8.1f} req/s  "
+                        f"ASGI {result['asgi_rps']:>8.1f} req/s"
+                    )
+            return results, throughput
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
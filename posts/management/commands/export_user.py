@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from posts.models import User
+from posts.export import SECTIONS, FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = "Writes a user's posts, followers and following as JSON Lines or CSV, reading them in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Username of the account to export, with the @')
+        parser.add_argument('--format', choices=list(FORMATS), default='jsonl')
+        parser.add_argument('--include', default=','.join(SECTIONS), help=f"Comma separated, from {', '.join(SECTIONS)}")
+        parser.add_argument('--output', help='File to write to, standard output by default')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows read from the database at a time')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with the username {options['username']}")
+        sections = options['include'].split(',')
+        if not set(sections) <= set(SECTIONS):
+            raise CommandError(f"--include must be one or more of {', '.join(SECTIONS)}")
+
+        lines = export_lines(user, options['format'], sections, options['chunk_size'])
+        if options['output']:
+            written = 0
+            with open(options['output'], 'w', encoding='utf-8', newline='') as file:
+                for line in lines:
+                    file.write(line)
+                    written += 1
+            self.stdout.write(self.style.SUCCESS(f"Wrote {written} lines to {options['output']}"))
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from posts.images import generate_variants
+from posts.models import Post
+
+class Command(BaseCommand):
+    help = 'Generates the resized image variants of posts that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate the variants of every post with an image')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            posts = posts.filter(image_variants={})
+        done = 0
+        for post_id in posts.values_list('pk', flat=True).iterator():
+            generate_variants(post_id)
+            done += 1
+            if done % 100 == 0:
+                self.stdout.write(f'Generated variants for {done} posts...')
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {done} posts'))
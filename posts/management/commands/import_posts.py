@@ -0,0 +1,217 @@
+import json
+import sys
+import time
+from collections import OrderedDict
+from datetime import timezone as dt_timezone
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from posts.forms import PostForm
+from posts.models import User, Post
+from posts import counters, stats
+
+# Each line of the file is one post, for example:
+#   {"author": "@johndoe", "title": "Hello", "body": "First post", "posted_at": "2023-05-24T12:00:00Z"}
+# 'body', 'posted_at' (default now, UTC when no offset is given) and 'image' (a path in the media storage) are optional.
+# Posts are inserted with bulk_create, which sends no signals: counters and site totals are updated here,
+# the search index by its triggers, but imported posts are not copied into existing home timelines.
+
+FIELDS = {'author', 'title', 'body', 'posted_at', 'image'}
+
+
+class AuthorCache:
+    """Maps usernames to user ids, looking up the missing ones of a whole batch in one query.
+
+    Unknown usernames are remembered too. The least recently used entries are dropped past max_size.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, usernames):
+        """Return a dictionary mapping each username to its user id, or None if there is no such user."""
+
+        missing = {username for username in usernames if username not in self._ids}
+        self.misses += len(missing)
+        self.hits += len(set(usernames)) - len(missing)
+        if missing:
+            found = dict(User.objects.filter(username__in=missing).values_list('username', 'pk'))
+            for username in missing:
+                self._ids[username] = found.get(username)
+        resolved = {}
+        for username in usernames:
+            self._ids.move_to_end(username)
+            resolved[username] = self._ids[username]
+        while len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+        return resolved
+
+
+class RowValidator:
+    """Checks rows with the rules of PostForm, using its fields directly rather than building a form per row."""
+
+    def __init__(self):
+        form_fields = PostForm.base_fields
+        self.title = form_fields['title']
+        self.body = form_fields['body']
+        self.image_validators = form_fields['image'].validators # Allowed image file extensions, the file is not opened
+
+    def clean(self, row):
+        """Return the cleaned values of a parsed row, raises ValidationError listing every problem found."""
+
+        if not isinstance(row, dict):
+            raise ValidationError('Each line must be a JSON object')
+        errors = []
+        unknown = set(row) - FIELDS
+        if unknown:
+            errors.append(f"Unknown fields: {', '.join(sorted(unknown))}")
+        author = row.get('author')
+        if not isinstance(author, str) or not author:
+            errors.append('author: A username is required')
+
+        cleaned = {'author': author}
+        for name, field in [('title', self.title), ('body', self.body)]:
+            try:
+                cleaned[name] = field.clean(row.get(name))
+            except ValidationError as error:
+                errors.extend(f'{name}: {message}' for message in error.messages)
+
+        cleaned['posted_at'] = timezone.now()
+        if row.get('posted_at') is not None:
+            try:
+                posted_at = parse_datetime(row['posted_at']) if isinstance(row['posted_at'], str) else None
+            except ValueError: # Well formed but impossible, such as February 30th
+                posted_at = None
+            if posted_at is None:
+                errors.append('posted_at: Enter a valid ISO 8601 date and time')
+            else:
+                cleaned['posted_at'] = posted_at if timezone.is_aware(posted_at) else timezone.make_aware(posted_at, dt_timezone.utc)
+
+        cleaned['image'] = row.get('image') or None
+        if cleaned['image'] is not None:
+            try:
+                if not isinstance(cleaned['image'], str):
+                    raise ValidationError('Enter the path of the image file')
+                for validator in self.image_validators:
+                    validator(File(None, name=cleaned['image']))
+            except ValidationError as error:
+                errors.extend(f'image: {message}' for message in error.messages)
+
+        if errors:
+            raise ValidationError(errors)
+        return cleaned
+
+
+class Command(BaseCommand):
+    help = 'Imports posts from a JSON Lines file in batches, writing the rows that cannot be imported to a rejects file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSON Lines file to import, '-' reads standard input")
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows inserted per transaction')
+        parser.add_argument('--rejects', help='File the rejected rows are written to, defaults to <path>.rejects.jsonl')
+        parser.add_argument('--author-cache-size', type=int, default=100000, help='Most usernames remembered at once')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the rows without inserting anything')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        path = options['path']
+        if path == '-':
+            source = sys.stdin
+            rejects_path = options['rejects'] or 'stdin.rejects.jsonl'
+        else:
+            try:
+                source = open(path, encoding='utf-8')
+            except OSError as error:
+                raise CommandError(f'Cannot read {path}: {error}')
+            rejects_path = options['rejects'] or f'{path}.rejects.jsonl'
+
+        self.validator = RowValidator()
+        self.authors = AuthorCache(options['author_cache_size'])
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.rejects_path = rejects_path
+        self.rejects = None # Opened when the first row is rejected
+        self.imported = 0
+        self.rejected = 0
+        start = time.perf_counter()
+        try:
+            batch = []
+            # The file is read line by line, so only one batch is ever held in memory
+            for line_number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                batch.append((line_number, line))
+                if len(batch) == options['batch_size']:
+                    self._import_batch(batch)
+                    batch = []
+                    self._progress(start)
+            if batch:
+                self._import_batch(batch)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if self.rejects is not None:
+                self.rejects.close()
+
+        if self.imported and not self.dry_run:
+            stats.add('posts_version') # Pages cached by browsers are out of date
+        elapsed = time.perf_counter() - start
+        rate = (self.imported + self.rejected) / elapsed if elapsed else 0
+        verb = 'Validated' if self.dry_run else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {self.imported} posts in {elapsed:.1f}s ({rate:,.0f} rows/s), '
+            f'author cache {self.authors.hits} hits and {self.authors.misses} misses'
+        ))
+        if self.rejected:
+            self.stdout.write(self.style.WARNING(f'Rejected {self.rejected} rows, written to {self.rejects_path}'))
+
+    def _import_batch(self, batch):
+        valid = []
+        for line_number, line in batch:
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                self._reject(line_number, line.rstrip('\n'), [f'Invalid JSON: {error}'])
+                continue
+            try:
+                valid.append((line_number, row, self.validator.clean(row)))
+            except ValidationError as error:
+                self._reject(line_number, row, error.messages)
+
+        author_ids = self.authors.resolve([cleaned['author'] for _, _, cleaned in valid])
+        posts = []
+        for line_number, row, cleaned in valid:
+            author_id = author_ids[cleaned['author']]
+            if author_id is None:
+                self._reject(line_number, row, [f"author: No user with the username {cleaned['author']}"])
+                continue
+            posts.append(Post(
+                author_id=author_id, title=cleaned['title'], body=cleaned['body'],
+                posted_at=cleaned['posted_at'], image=cleaned['image']
+            ))
+
+        if posts and not self.dry_run:
+            with transaction.atomic():
+                Post.objects.bulk_create(posts)
+                counters.add_posts([post.author_id for post in posts])
+                stats.add('posts', amount=len(posts))
+        self.imported += len(posts)
+
+    def _reject(self, line_number, row, errors):
+        self.rejected += 1
+        if self.rejects is None:
+            self.rejects = open(self.rejects_path, 'w', encoding='utf-8')
+        self.rejects.write(json.dumps({'line': line_number, 'errors': errors, 'row': row}) + '\n')
+
+    def _progress(self, start):
+        if self.verbosity >= 2:
+            elapsed = time.perf_counter() - start
+            rate = (self.imported + self.rejected) / elapsed if elapsed else 0
+            self.stdout.write(f'{self.imported} posts imported, {self.rejected} rejected ({rate:,.0f} rows/s)')
@@ -0,0 +1,20 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from posts import trending
+
+class Command(BaseCommand):
+    help = 'Ranks the recent posts and stores the trending snapshot, run it periodically or keep it running with --loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=None, help='Number of posts kept in the snapshot')
+        parser.add_argument('--loop', action='store_true', help='Rank again every TRENDING_REFRESH_SECONDS until stopped')
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            snapshot = trending.rank(size=options['size'])
+            self.stdout.write(self.style.SUCCESS(f'Ranked {len(snapshot)} trending posts in {time.perf_counter() - start:.2f}s'))
+            if not options['loop']:
+                return
+            time.sleep(settings.TRENDING_REFRESH_SECONDS)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from posts import search
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of posts and users from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild the index in')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.is_supported(using):
+            raise CommandError('The search index needs SQLite with FTS5, other databases search without an index')
+        indexed = search.rebuild_index(using)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} posts and users'))
@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from posts import recommendations
+
+class Command(BaseCommand):
+    help = 'Computes the "who to follow" suggestions of every user, or with --stale only of users whose follows changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale', action='store_true', help='Only recompute the users marked stale by follows since the last run')
+        parser.add_argument('--per-user', type=int, default=None, help='Suggestions stored per user')
+        parser.add_argument('--batch-size', type=int, default=None, help='Number of users stored per transaction')
+
+    def handle(self, *args, **options):
+        update = recommendations.update_stale if options['stale'] else recommendations.rebuild
+        start = time.perf_counter()
+        total = 0
+        for stored in update(count=options['per_user'], batch_size=options['batch_size']):
+            total += stored
+            self.stdout.write(f'Computed suggestions for {total} users...')
+        backend = 'numpy' if recommendations.np is not None else 'array' # numpy is optional, see recommendations.py
+        self.stdout.write(self.style.SUCCESS(
+            f'Computed the suggestions of {total} users in {time.perf_counter() - start:.1f}s ({backend} graph)'
+        ))
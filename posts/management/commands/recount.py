@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from posts.counters import recount_users
+from posts import stats
+
+class Command(BaseCommand):
+    help = 'Recomputes the follower, following and post counters of every user and the site totals to repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Number of users updated per query')
+
+    def handle(self, *args, **options):
+        total = 0
+        for updated in recount_users(batch_size=options['batch_size']):
+            total += updated
+            self.stdout.write(f'Recounted {total} users...')
+        self.stdout.write(self.style.SUCCESS(f'Recounted the counters of {total} users'))
+        totals = stats.recount()
+        self.stdout.write(self.style.SUCCESS(f"Recounted the site totals: {totals['users']} users, {totals['posts']} posts"))
@@ -1,7 +1,173 @@
+import random
+import re
+import time
+from datetime import timedelta
+from multiprocessing import Pool
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
 from faker import Faker
-from posts import User
+from posts.models import User, Post, Follow
+from posts.counters import recount_users
+from posts import stats, timeline
+
+# Seeded users get an email address at this domain, which is how the unseed command finds them again
+SEED_EMAIL_DOMAIN = 'seed.chatter.test'
+SEED_PASSWORD = 'Password123'
+
+# Rows are generated in chunks of this size, by worker processes when --workers is above 1
+CHUNK_SIZE = 5000
+
+
+def _power_law_index(rng, n, skew):
+    # u ** skew with u uniform in [0, 1) piles up near 0, so low indexes are picked far more often than high ones.
+    # Used for follow targets and post authors so a few users get most followers, like on a real network.
+    return int(n * rng.random() ** skew)
+
+
+def _make_users(args):
+    start, count, seed, offset = args
+    fake = Faker()
+    fake.seed_instance(seed + start)
+    users = []
+    for number in range(offset + start, offset + start + count):
+        first_name = fake.first_name()
+        last_name = fake.last_name()
+        name = re.sub(r'\W', '', fake.user_name())[:30] or 'user'
+        username = f'@{name}{number}' # The number keeps usernames and emails unique across chunks
+        users.append((username, first_name, last_name, f'{name}{number}@{SEED_EMAIL_DOMAIN}', fake.sentence(nb_words=10)))
+    return users
+
+
+def _make_posts(args):
+    start, count, seed, num_users, max_age_seconds, skew = args
+    fake = Faker()
+    fake.seed_instance(seed + start)
+    rng = random.Random(seed + start)
+    posts = []
+    for _ in range(count):
+        posts.append((
+            _power_law_index(rng, num_users, skew),
+            fake.sentence(nb_words=6)[:150],
+            fake.paragraph(nb_sentences=3)[:500],
+            rng.randint(0, max_age_seconds)
+        ))
+    return posts
+
+
+def _chunks(total, *extra):
+    return [(start, min(CHUNK_SIZE, total - start), *extra) for start in range(0, total, CHUNK_SIZE)]
+
 
 class Command(BaseCommand):
+    help = 'Fills the database with fake users, posts and follows for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create')
+        parser.add_argument('--posts', type=int, default=10000, help='Number of posts to create')
+        parser.add_argument('--follows', type=int, default=10000, help='Number of follow edges to create')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, the same seed gives the same data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows inserted per query')
+        parser.add_argument('--workers', type=int, default=1, help='Processes generating fake text, 1 disables multiprocessing')
+        parser.add_argument('--days', type=int, default=365, help='Posts are spread over this many days back from now')
+        parser.add_argument('--skew', type=float, default=3.0, help='Higher values concentrate followers and posts on fewer users')
+
     def handle(self, *args, **options):
-        print("Not implemented yet...")
\ No newline at end of file
+        if options['users'] < 1 and (options['posts'] or options['follows']):
+            raise CommandError('Posts and follows need at least one user')
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(seed)
+        self.batch_size = options['batch_size']
+        self.stdout.write(f'Seeding with --seed {seed}')
+
+        pool = Pool(options['workers']) if options['workers'] > 1 else None
+        generate = pool.imap if pool else map # imap keeps chunks in order so the data only depends on the seed
+        try:
+            start = time.perf_counter()
+            user_ids = self._create_users(generate, options['users'], seed)
+            self._create_posts(generate, user_ids, options['posts'], seed, options['days'], options['skew'])
+            self._create_follows(user_ids, options['follows'], options['skew'])
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        # Bulk inserts don't send signals, so the user counters are worked out in one go at the end
+        self._timed('Recounting user counters', lambda: sum(recount_users()))
+        # Follows made without signals leave the home timelines empty, they need the follower counts found above
+        self._timed('Filling timelines', timeline.backfill_all)
+        stats.add('posts_version') # Pages cached by browsers are out of date
+        self.stdout.write(self.style.SUCCESS(f'Seeding finished in {time.perf_counter() - start:.1f}s'))
+
+    def _create_users(self, generate, total, seed):
+        password = make_password(SEED_PASSWORD) # Hashing is slow on purpose, so every seeded user shares one hash
+        # Usernames are numbered from the current highest id so seeding twice does not clash
+        offset = (User.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        user_ids = []
+
+        def insert():
+            for rows in generate(_make_users, _chunks(total, seed, offset)):
+                users = [
+                    User(username=username, first_name=first_name, last_name=last_name, email=email, bio=bio, password=password)
+                    for username, first_name, last_name, email, bio in rows
+                ]
+                with transaction.atomic():
+                    created = User.objects.bulk_create(users, batch_size=self.batch_size)
+                    stats.add('users', amount=len(created))
+                user_ids.extend(user.pk for user in created)
+            return len(user_ids)
+
+        self._timed('Creating users', insert)
+        return user_ids
+
+    def _create_posts(self, generate, user_ids, total, seed, days, skew):
+        now = timezone.now()
+
+        def insert():
+            created = 0
+            chunks = _chunks(total, seed, len(user_ids), days * 24 * 60 * 60, skew)
+            for rows in generate(_make_posts, chunks):
+                posts = [
+                    Post(author_id=user_ids[author], title=title, body=body, posted_at=now - timedelta(seconds=age))
+                    for author, title, body, age in rows
+                ]
+                with transaction.atomic():
+                    Post.objects.bulk_create(posts, batch_size=self.batch_size)
+                    stats.add('posts', amount=len(posts))
+                created += len(posts)
+            return created
+
+        self._timed('Creating posts', insert)
+
+    def _create_follows(self, user_ids, total, skew):
+        if len(user_ids) < 2:
+            return
+
+        def insert():
+            before = Follow.objects.count()
+            generated = 0
+            while generated < total:
+                # Pairs repeated within a batch are dropped here, ones already in the table by ignore_conflicts
+                pairs = set()
+                for _ in range(min(self.batch_size, total - generated)):
+                    follower = user_ids[self.rng.randrange(len(user_ids))]
+                    followed = user_ids[_power_law_index(self.rng, len(user_ids), skew)]
+                    if follower != followed:
+                        pairs.add((follower, followed))
+                with transaction.atomic():
+                    Follow.objects.bulk_create(
+                        [Follow(from_user_id=followed, to_user_id=follower) for follower, followed in pairs],
+                        batch_size=self.batch_size, ignore_conflicts=True
+                    )
+                generated += self.batch_size
+            return Follow.objects.count() - before # Duplicates mean this can be a little under --follows
+
+        self._timed('Creating follows', insert)
+
+    def _timed(self, label, action):
+        start = time.perf_counter()
+        rows = action()
+        elapsed = time.perf_counter() - start
+        rate = rows / elapsed if elapsed else 0
+        self.stdout.write(f'{label}: {rows} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)')
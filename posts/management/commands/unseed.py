@@ -1,7 +1,114 @@
-from django.core.management.base import BaseCommand, CommandError
-from faker import Faker
-from posts import User
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from posts.models import User, Post, Follow
+from posts.counters import recount_user_ids
+from posts import stats
+from posts.management.commands.seed import SEED_EMAIL_DOMAIN
+
+# Seeded data is removed with raw DELETE statements in small transactions, one range of user ids at a time.
+# Going through the ORM would load and delete every cascaded post and follower row one by one and keep SQLite
+# locked for the whole run. Every batch commits on its own, so an interrupted run is resumed by running the
+# command again: whatever was already deleted is simply not found any more.
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _referencing_columns(model, skip=()):
+    """Return the (table, column) pairs of every foreign key to the model, many-to-many tables included."""
+
+    columns = set()
+    # include_hidden also finds relations declared with related_name='+', like TimelineEntry.post
+    relations = [field for field in model._meta.get_fields(include_hidden=True) if field.auto_created and not field.concrete]
+    relations += [field.remote_field for field in model._meta.local_many_to_many]
+    for relation in relations:
+        if relation.many_to_many:
+            through = relation.through._meta
+            for field in through.fields:
+                if field.is_relation and field.related_model is model:
+                    columns.add((through.db_table, field.column))
+        elif relation.related_model not in skip:
+            columns.add((relation.related_model._meta.db_table, relation.field.column))
+    return sorted(columns)
+
 
 class Command(BaseCommand):
+    help = 'Deletes the users created by the seed command, with their posts and follows, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users deleted per transaction')
+        parser.add_argument('--post-batch-size', type=int, default=5000, help='Posts deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to wait between batches so other writers get the lock')
+
     def handle(self, *args, **options):
-        print("Not implemented yet...")
\ No newline at end of file
+        self.pause = options['pause']
+        seeded = User.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}')
+        remaining = seeded.count()
+        if not remaining:
+            self.stdout.write('No seeded users to delete')
+            return
+        self.stdout.write(f'Deleting {remaining} seeded users...')
+
+        self.post_columns = _referencing_columns(Post)
+        self.user_columns = _referencing_columns(User, skip=[Post]) # Posts are deleted separately, before their authors
+
+        start = time.perf_counter()
+        deleted = 0
+        last_pk = 0
+        while True:
+            pks = list(seeded.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+            if not pks:
+                break
+            deleted += self._delete_users(pks[0], pks[-1], options['post_batch_size'])
+            last_pk = pks[-1]
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'Deleted {deleted}/{remaining} users ({deleted / elapsed:,.0f} users/s), up to id {last_pk}')
+            self._wait()
+
+        stats.add('posts_version') # Pages cached by browsers are out of date
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} seeded users in {time.perf_counter() - start:.1f}s'))
+
+    def _delete_users(self, first_pk, last_pk, post_batch_size):
+        # The users of this batch, selected by id range so the statements don't need thousands of parameters
+        users_sql = f"SELECT id FROM {_quote(User._meta.db_table)} WHERE id BETWEEN %s AND %s AND email LIKE %s"
+        users_params = [first_pk, last_pk, f'%@{SEED_EMAIL_DOMAIN}']
+
+        # Posts first, in their own smaller transactions as a popular seeded user can have a great many
+        posts_sql = f"SELECT id FROM {_quote(Post._meta.db_table)} WHERE author_id IN ({users_sql}) LIMIT %s"
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(posts_sql, users_params + [post_batch_size])
+                post_ids = [row[0] for row in cursor.fetchall()]
+                if not post_ids:
+                    break
+                placeholders = ', '.join(['%s'] * len(post_ids))
+                for table, column in self.post_columns:
+                    cursor.execute(f'DELETE FROM {_quote(table)} WHERE {_quote(column)} IN ({placeholders})', post_ids)
+                cursor.execute(f'DELETE FROM {_quote(Post._meta.db_table)} WHERE id IN ({placeholders})', post_ids)
+                stats.add('posts', amount=-cursor.rowcount) # Raw deletes send no signals either
+            self._wait()
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Real users who followed or were followed by seeded users need their counters fixed afterwards
+            follows = _quote(Follow._meta.db_table)
+            cursor.execute(
+                f'SELECT from_user_id FROM {follows} WHERE to_user_id IN ({users_sql}) '
+                f'UNION SELECT to_user_id FROM {follows} WHERE from_user_id IN ({users_sql})',
+                users_params * 2
+            )
+            affected = [row[0] for row in cursor.fetchall()]
+
+            for table, column in self.user_columns:
+                cursor.execute(f'DELETE FROM {_quote(table)} WHERE {_quote(column)} IN ({users_sql})', users_params)
+            cursor.execute(f'DELETE FROM {_quote(User._meta.db_table)} WHERE id IN ({users_sql})', users_params)
+            deleted = cursor.rowcount
+            stats.add('users', amount=-deleted)
+            for start in range(0, len(affected), 1000): # Seeded ones among them are gone already, only real users are updated
+                recount_user_ids(affected[start:start + 1000])
+        return deleted
+
+    def _wait(self):
+        if self.pause:
+            time.sleep(self.pause)
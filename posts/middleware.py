@@ -0,0 +1,107 @@
+import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from .queries import QueryReport, QueryBudgetExceeded
+from .routers import STICKY_COOKIE, track_writes, stop_tracking_writes
+
+logger = logging.getLogger(__name__)
+
+
+class QueryInspectorMiddleware:
+    """Records the queries of every request, warns about N+1 patterns and checks the view's query budget.
+
+    The report is available as request.query_report and response.query_report, the number of queries is
+    sent in the X-Query-Count header and the number caches saved in X-Queries-Saved. Turned on by the
+    QUERY_INSPECTOR setting.
+    """
+
+    sync_capable = True
+    async_capable = True # A sync-only middleware would make Django run every async view in a thread
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # Async views run their queries in other threads, where the wrapper can't see them, so they are not inspected
+        if not settings.QUERY_INSPECTOR or self.async_mode:
+            return self.get_response(request)
+
+        report = QueryReport(settings.QUERY_N_PLUS_ONE_THRESHOLD)
+        request.query_report = report
+        with report.record():
+            response = self.get_response(request)
+        response.query_report = report
+        response['X-Query-Count'] = str(report.count)
+        response['X-Queries-Saved'] = str(report.saved)
+
+        for problem in report.problems():
+            logger.warning('%s %s: %s', request.method, request.path, problem)
+        if report.over_budget and settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(f'{request.path} ran {report.count} queries, its budget is {report.budget}')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        report = getattr(request, 'query_report', None)
+        if report is not None:
+            report.budget = getattr(view_func, 'query_budget', None) # Set by the @query_budget decorator
+
+
+class AsyncViewsMiddleware:
+    """Serves requests coming in through ASGI with the URLs in ASGI_URLCONF, which use the views in async_views.py."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if isinstance(request, ASGIRequest):
+            request.urlconf = settings.ASGI_URLCONF # Django resolves and reverses URLs with this from here on
+        return self.get_response(request)
+
+
+class ReplicaStickinessMiddleware:
+    """Gives browsers whose request wrote to the primary a cookie that makes their reads use the primary for a while.
+
+    Only needed when DATABASE_REPLICAS is set, see routers.py.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token, wrote = track_writes()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_tracking_writes(token)
+        return self.mark_sticky(response, wrote)
+
+    async def __acall__(self, request):
+        token, wrote = track_writes()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_tracking_writes(token)
+        return self.mark_sticky(response, wrote)
+
+    def mark_sticky(self, response, wrote):
+        if wrote[0] and settings.DATABASE_REPLICAS:
+            # Long enough for the replicas to have caught up with the write
+            response.set_cookie(STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_alter_user_followers'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['posted_at', 'id'], name='post_posted_at_id_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# The full-text search index as it was when this migration was written. The SQL is kept here rather than taken
+# from posts/search.py, so later changes to the index there don't change what this migration creates.
+# Only SQLite has FTS5, other databases keep using the 'icontains' lookups.
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5(title, body, tokenize='unicode61')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_user_fts USING fts5(username, first_name, last_name, tokenize='unicode61')",
+
+    'CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert AFTER INSERT ON posts_post BEGIN '
+    'INSERT INTO posts_post_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END',
+    'CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete AFTER DELETE ON posts_post BEGIN '
+    'DELETE FROM posts_post_fts WHERE rowid = old.id; END',
+    'CREATE TRIGGER IF NOT EXISTS posts_post_fts_update AFTER UPDATE OF title, body ON posts_post BEGIN '
+    'DELETE FROM posts_post_fts WHERE rowid = old.id; '
+    'INSERT INTO posts_post_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END',
+
+    'CREATE TRIGGER IF NOT EXISTS posts_user_fts_insert AFTER INSERT ON posts_user BEGIN '
+    'INSERT INTO posts_user_fts(rowid, username, first_name, last_name) '
+    'VALUES (new.id, new.username, new.first_name, new.last_name); END',
+    'CREATE TRIGGER IF NOT EXISTS posts_user_fts_delete AFTER DELETE ON posts_user BEGIN '
+    'DELETE FROM posts_user_fts WHERE rowid = old.id; END',
+    'CREATE TRIGGER IF NOT EXISTS posts_user_fts_update AFTER UPDATE OF username, first_name, last_name ON posts_user BEGIN '
+    'DELETE FROM posts_user_fts WHERE rowid = old.id; '
+    'INSERT INTO posts_user_fts(rowid, username, first_name, last_name) '
+    'VALUES (new.id, new.username, new.first_name, new.last_name); END',
+
+    # Index the rows that existed before the triggers
+    'DELETE FROM posts_post_fts',
+    'INSERT INTO posts_post_fts(rowid, title, body) SELECT id, title, body FROM posts_post',
+    'DELETE FROM posts_user_fts',
+    'INSERT INTO posts_user_fts(rowid, username, first_name, last_name) SELECT id, username, first_name, last_name FROM posts_user',
+]
+
+DROP_SQL = [
+    *(f'DROP TRIGGER IF EXISTS {table}_{suffix}' for table in ['posts_post_fts', 'posts_user_fts'] for suffix in ['insert', 'delete', 'update']),
+    'DROP TABLE IF EXISTS posts_post_fts',
+    'DROP TABLE IF EXISTS posts_user_fts',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        with schema_editor.connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_timelineentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
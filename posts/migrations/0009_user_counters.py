@@ -0,0 +1,48 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    User = apps.get_model('posts', 'User')
+    Post = apps.get_model('posts', 'Post')
+    Follow = User.followers.through
+
+    def count_of(queryset, field):
+        counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('*')).values('total')
+        return Coalesce(Subquery(counts), 0)
+
+    using = schema_editor.connection.alias
+    User.objects.using(using).update(
+        num_followers=count_of(Follow.objects.using(using), 'from_user'),
+        num_following=count_of(Follow.objects.using(using), 'to_user'),
+        num_posts=count_of(Post.objects.using(using), 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='num_followers',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='num_following',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='num_posts',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:18
+
+from django.db import migrations, models
+
+
+def count_existing(apps, schema_editor):
+    using = schema_editor.connection.alias
+    SiteStat = apps.get_model('posts', 'SiteStat')
+    SiteStat.objects.using(using).create(name='users', value=apps.get_model('posts', 'User').objects.using(using).count())
+    SiteStat.objects.using(using).create(name='posts', value=apps.get_model('posts', 'Post').objects.using(using).count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_posted_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
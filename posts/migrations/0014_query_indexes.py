@@ -0,0 +1,29 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_render_versions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'posted_at', 'id'], name='post_author_posted_at_idx'),
+        ),
+        # The follower table is created by Django for the many to many field, so it has no Meta to list indexes in
+        migrations.RunSQL(
+            'CREATE INDEX follow_to_from_user_idx ON posts_user_followers (to_user_id, from_user_id)',
+            'DROP INDEX follow_to_from_user_idx',
+        ),
+    ]
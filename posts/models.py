@@ -1,6 +1,8 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
+from django.core.files.storage import default_storage
 
 # Create your models here.
 
@@ -23,31 +25,199 @@ class User(AbstractUser):
     # related_name is used to access the reverse relationship, so the users this one follows
     followers = models.ManyToManyField('self', symmetrical=False, related_name='following')
 
+    # Denormalized counters so profile pages and user lists don't count the follower table or posts on every read.
+    # Kept up to date with F() expressions by the receivers in signals.py, so save() leaves them out for existing users.
+    # 'manage.py recount' repairs any drift
+    num_followers = models.PositiveIntegerField(default=0, editable=False)
+    num_following = models.PositiveIntegerField(default=0, editable=False)
+    num_posts = models.PositiveIntegerField(default=0, editable=False)
+    COUNTER_FIELDS = ['num_followers', 'num_following', 'num_posts']
+
+    # Bumped whenever the profile fields below change. Part of the cache key of rendered posts
+    # (see post_as_table_row.html) and of the profile page's ETag (see conditional.py)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    VERSIONED_FIELDS = ['username', 'first_name', 'last_name', 'bio']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # Deferred fields are left out, they can't have been changed without being loaded
+        user._loaded_profile = {field: user.__dict__[field] for field in cls.VERSIONED_FIELDS if field in user.__dict__}
+        return user
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # The counters are only written with F() updates, an instance loaded earlier (e.g. the cached request.user,
+            # see backends.py) would put back the values it was loaded with
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        loaded = getattr(self, '_loaded_profile', {})
+        self.profile_changed = any(getattr(self, field) != value for field, value in loaded.items())
+        if self.profile_changed:
+            self.version += 1 # So cached posts and profile pages showing the old details are rendered again
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
+        self._loaded_profile = {field: getattr(self, field) for field in self.VERSIONED_FIELDS}
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # The admin lists users newest first with a (date_joined, id) cursor, see admin_scaling.py
+            models.Index(fields=['date_joined', 'id'], name='user_date_joined_id_idx')
+        ]
+
     def full_name(self):
         return f'{self.first_name} {self.last_name}'
     
     def toggle_follow(self, to_follow):
         if self == to_follow:
             return # Cannot follow self
-        if self in to_follow.followers.all(): # If current user is in the followers of target user, then we remove (unfollow) from the followers
+        if self.is_following(to_follow): # If current user is in the followers of target user, then we remove (unfollow) from the followers
             to_follow.followers.remove(self)
+            change = -1
         else:
             to_follow.followers.add(self) # Add current user to target user's followers
+            change = 1
+        # The database counters are updated by signals.py, keep these two instances in step with them
+        self.num_following += change
+        to_follow.num_followers += change
 
 
     def is_following(self, user):
-        return user in self.following.all() # Check if target user is in the following list of current user
+        # Looks up the single row of the follower table on its unique index instead of loading everyone followed
+        return Follow.objects.filter(from_user_id=user.pk, to_user_id=self.pk).exists()
 
+    # These read the latest counter values from the database, templates can use the fields directly instead
     def follower_count(self):
-        return self.followers.count()
+        return self._current_counter('num_followers')
     
     def following_count(self):
-        return self.following.count()
+        return self._current_counter('num_following')
+
+    def post_count(self):
+        return self._current_counter('num_posts')
+
+    def _current_counter(self, field):
+        value = User.objects.filter(pk=self.pk).values_list(field, flat=True).first() # Primary key lookup, no aggregation
+        setattr(self, field, value)
+        return value
+
+# In the follower table a row (from_user, to_user) means to_user follows from_user.
+# Django indexes the unique (from_user, to_user) pair and each column on its own. Migration 0014 adds
+# (to_user, from_user) as well, so the users someone follows are read from that index without the table
+Follow = User.followers.through
+
+
+def following_status(user, candidates):
+    """Return a dictionary mapping the id of each candidate user to whether user follows them, using one query.
+
+    Meant for pages listing many users (search results, follower lists) so they don't call is_following() per row.
+    """
+
+    candidate_ids = {candidate.pk for candidate in candidates}
+    status = dict.fromkeys(candidate_ids, False)
+    if not user.is_authenticated or not candidate_ids:
+        return status
+    followed = Follow.objects.filter(to_user_id=user.pk, from_user_id__in=candidate_ids).values_list('from_user_id', flat=True)
+    for pk in followed:
+        status[pk] = True
+    return status
 
 class Post(models.Model):
-    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    # The (author, posted_at, id) index below starts with author, so the default index on the foreign key is not needed
+    author = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     title = models.CharField(max_length= 150, blank=False)
     image = models.ImageField(upload_to='post_images/', blank=True, null=True)
     # The 'upload_to' folder must be in the 'media' folder of the project root, project root is where manage.py is
     body = models.CharField(max_length=500, blank=True)
-    posted_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    # A default rather than auto_now_add so bulk loads (seed, import_posts) can keep their own timestamps
+    posted_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Resized copies of the image made by images.py, e.g. {'webp': {'300': 'post_images/variants/1_300w.webp'}}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Part of the cache key of the rendered post (see post_as_table_row.html), bumped on every change
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Time of the last change after the post was created, the author's latest makes their profile's ETag change
+    edited_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Feed pages are read newest first with a (posted_at, id) cursor, see pagination.py
+            models.Index(fields=['posted_at', 'id'], name='post_posted_at_id_idx'),
+            # Profile pages and timelines read one author's posts newest first, in the same order
+            models.Index(fields=['author', 'posted_at', 'id'], name='post_author_posted_at_idx'),
+            # The latest edit of an author's posts is found at the end of their part of this index
+            models.Index(fields=['author', 'edited_at'], name='post_author_edited_at_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1 # Edited, so the cached copy is out of date
+            self.edited_at = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version', 'edited_at'}
+        super().save(*args, **kwargs)
+
+    # 'srcset' attribute values for the image variants, empty until they have been generated
+    def webp_srcset(self):
+        return self._srcset('webp')
+
+    def jpeg_srcset(self):
+        return self._srcset('jpeg')
+
+    def _srcset(self, image_format):
+        variants = (self.image_variants or {}).get(image_format, {})
+        return ', '.join(f'{default_storage.url(variants[width])} {width}w' for width in sorted(variants, key=int))
+
+class TimelineEntry(models.Model):
+    """A post in a user's home timeline, written when the post is created (fan-out-on-write), see timeline.py"""
+
+    # The composite index below starts with user, so the default index on the foreign key is not needed
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries', db_index=False)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    posted_at = models.DateTimeField() # Copied from the post so a timeline page is read from this table alone
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry')
+        ]
+        indexes = [
+            # Timeline pages use the same cursor as the feed, keyed on (posted_at, post id) per user
+            models.Index(fields=['user', 'posted_at', 'post'], name='timeline_user_posted_at_idx')
+        ]
+
+class SiteStat(models.Model):
+    """A site-wide total, such as the number of users or posts, kept up to date by signals.py (see stats.py)"""
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+class Recommendation(models.Model):
+    """A user suggested to follow, reached through people the user follows, computed by recommendations.py"""
+
+    # The composite index below starts with user, so the default index on the foreign key is not needed
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommendations', db_index=False)
+    candidate = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    mutual_count = models.PositiveIntegerField() # How many of the people the user follows follow the candidate
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'candidate'], name='unique_recommendation')
+        ]
+        indexes = [
+            # A user's suggestions are read best first, in the order they are shown
+            models.Index(fields=['user', '-mutual_count', 'candidate'], name='recommendation_user_rank_idx')
+        ]
+
+class StaleRecommendations(models.Model):
+    """A user whose suggestions are out of date since a follow or unfollow, until recomputed (see recommendations.py)"""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='+')
+
+class TrendingPost(models.Model):
+    """A post in the latest trending snapshot, written by the rank_trending command (see trending.py)"""
+
+    rank = models.PositiveIntegerField(unique=True) # 1 is the top post
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    ranked_at = models.DateTimeField()
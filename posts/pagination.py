@@ -0,0 +1,138 @@
+import base64
+import binascii
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Keyset (cursor) pagination, pages are found with a 'WHERE (posted_at, id) < cursor' lookup on an index
+# instead of an OFFSET, so fetching an old page costs the same as fetching the first one
+
+MAX_ID = 2 ** 63 - 1 # Largest id the database can store, larger ones in a cursor can't be compared with a column
+
+
+def _parse_id(value):
+    pk = int(value)
+    if not -MAX_ID - 1 <= pk <= MAX_ID:
+        raise ValueError(f'{value} is out of range for an id')
+    return pk
+
+
+def encode_cursor(posted_at, pk):
+    """Turn the sort key of the last item on a page into an opaque string for URLs."""
+
+    raw = f'{posted_at.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=') # Padding is not needed in URLs
+
+
+def decode_cursor(cursor):
+    """Return the (posted_at, id) pair held in a cursor, or None if the cursor is missing or malformed."""
+
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        posted_at, pk = raw.rsplit('|', 1)
+        posted_at = parse_datetime(posted_at)
+        pk = _parse_id(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if posted_at is None:
+        return None
+    return posted_at, pk
+
+
+def get_page_size(page_size=None):
+    if page_size is None:
+        page_size = settings.FEED_PAGE_SIZE
+    return max(1, min(page_size, settings.FEED_MAX_PAGE_SIZE))
+
+
+def paginate(queryset, cursor=None, page_size=None, time_field='posted_at', id_field='id'):
+    """Return one page of the queryset, newest first, and the cursor of the next (older) page.
+
+    The cursor is None when there are no older items. time_field and id_field name the
+    sort key, which must be covered by an index for the lookup to stay cheap.
+    """
+
+    page_size = get_page_size(page_size)
+    items = list(_page_queryset(queryset, cursor, page_size, time_field, id_field))
+    return _split_page(items, page_size, time_field, id_field)
+
+
+async def apaginate(queryset, cursor=None, page_size=None, time_field='posted_at', id_field='id'):
+    """Same as paginate() for async views, the page is fetched with the async ORM."""
+
+    page_size = get_page_size(page_size)
+    items = [item async for item in _page_queryset(queryset, cursor, page_size, time_field, id_field)]
+    return _split_page(items, page_size, time_field, id_field)
+
+
+def _page_queryset(queryset, cursor, page_size, time_field, id_field):
+    queryset = queryset.order_by(f'-{time_field}', f'-{id_field}')
+
+    position = decode_cursor(cursor)
+    if position is not None:
+        posted_at, pk = position
+        # Same as 'time < posted_at OR (time = posted_at AND id < pk)', but written so the first condition is a plain
+        # upper bound, which SQLite uses to start a range scan of the index instead of walking it from the newest end
+        queryset = queryset.filter(
+            Q(**{f'{time_field}__lte': posted_at}),
+            Q(**{f'{time_field}__lt': posted_at}) | Q(**{f'{id_field}__lt': pk})
+        )
+    return queryset[:page_size + 1] # Fetch one extra row to find out if there is an older page
+
+
+def _split_page(items, page_size, time_field, id_field):
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, time_field), getattr(last, id_field))
+    return items, next_cursor
+
+
+def paginate_by_id(queryset, cursor=None, page_size=None, id_field='id'):
+    """Same as paginate() for rows without a timestamp (e.g. follows), newest (highest id) first.
+
+    The cursor is the id of the last item on the page, used with an index whose last column is the id.
+    """
+
+    page_size = get_page_size(page_size)
+    queryset = queryset.order_by(f'-{id_field}')
+    try:
+        if cursor:
+            queryset = queryset.filter(**{f'{id_field}__lt': _parse_id(cursor)})
+    except ValueError: # Malformed cursors show the first page, like decode_cursor()
+        pass
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = str(getattr(items[-1], id_field))
+    return items, next_cursor
+
+
+class PageStream:
+    """One page of the queryset, newest first, read from the database in chunks while it is iterated over.
+
+    For responses streamed to the client (see api.py), so a large page is never held in memory at once.
+    page_size is not limited to FEED_MAX_PAGE_SIZE, next_cursor is set once the page has been iterated over.
+    """
+
+    def __init__(self, queryset, page_size, cursor=None, time_field='posted_at', id_field='id', chunk_size=100):
+        # Iterating may happen after the view has returned, pin the database chosen while it runs (see routers.py)
+        self.queryset = _page_queryset(queryset.using(queryset.db), cursor, page_size, time_field, id_field)
+        self.page_size = page_size
+        self.time_field = time_field
+        self.id_field = id_field
+        self.chunk_size = chunk_size
+        self.next_cursor = None
+
+    def __iter__(self):
+        last = None
+        for position, item in enumerate(self.queryset.iterator(chunk_size=self.chunk_size)):
+            if position == self.page_size: # The extra row, there is an older page
+                self.next_cursor = encode_cursor(getattr(last, self.time_field), getattr(last, self.id_field))
+                break
+            last = item
+            yield item
@@ -0,0 +1,134 @@
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from django.db import connections
+from django.template.base import Node
+
+# Records the SQL queries run while handling a request, see QueryInspectorMiddleware in middleware.py.
+# Queries with the same shape (the same SQL apart from parameter values) run several times in one request
+# are usually an N+1 pattern: a template or loop fetching a related object once per row.
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+# The report of the request being handled, so caches that avoid a query can say so with count_saved_query()
+_current_report = ContextVar('current_query_report', default=None)
+
+
+def count_saved_query(count=1):
+    """Record that a cache answered in place of the database, shown in the X-Queries-Saved header."""
+
+    report = _current_report.get()
+    if report is not None:
+        report.saved += count
+
+
+# Set while code runs one query shape many times on purpose, see repeated_queries()
+_repeats_expected = ContextVar('repeats_expected', default=False)
+
+
+@contextmanager
+def repeated_queries():
+    """Context manager for code repeating a query on purpose, such as stepping through an index one lookup at a time.
+
+    Its queries still count towards the budget, but their shapes are not reported as N+1 patterns.
+    """
+
+    token = _repeats_expected.set(True)
+    try:
+        yield
+    finally:
+        _repeats_expected.reset(token)
+
+
+def query_budget(limit):
+    """Decorator declaring the most queries a view may run per request, checked by QueryInspectorMiddleware."""
+
+    def decorator(view_function):
+        view_function.query_budget = limit
+        return view_function
+    return decorator
+
+
+def query_shape(sql):
+    # Parameters are sent separately so they are already '%s', only the length of 'IN (...)' lists varies
+    return re.sub(r'IN \((?:%s, )*%s\)', 'IN (...)', sql)
+
+
+def _template_location():
+    # Walk up from the database call to the innermost template node being rendered, if there is one
+    frame = sys._getframe(2)
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        # type() rather than isinstance() as isinstance() would evaluate lazy objects such as request.user
+        if issubclass(type(node), Node) and getattr(node, 'token', None) is not None and hasattr(node, 'origin'):
+            return f'{node.origin.template_name or node.origin.name}:{node.token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+class QueryReport:
+    """The queries run during one request and the N+1 patterns found among them."""
+
+    def __init__(self, n_plus_one_threshold):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.queries = [] # (alias, sql, seconds, template location)
+        self.budget = None
+        self.saved = 0 # Queries caches answered instead, see count_saved_query()
+        self.expected_shapes = set() # Repeated on purpose, see repeated_queries()
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper(), so it sees every query on the connection
+        location = _template_location()
+        if _repeats_expected.get():
+            self.expected_shapes.add(query_shape(sql))
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((context['connection'].alias, sql, time.perf_counter() - start, location))
+
+    def record(self):
+        """Context manager recording the queries run on every database connection of this thread."""
+
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        stack.callback(_current_report.reset, _current_report.set(self))
+        return stack
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.count > self.budget
+
+    def n_plus_one(self):
+        """Return (shape, times run, template locations) for every query shape repeated past the threshold."""
+
+        by_shape = defaultdict(list)
+        for _, sql, _, location in self.queries:
+            by_shape[query_shape(sql)].append(location)
+        return [
+            (shape, len(locations), sorted({location for location in locations if location}))
+            for shape, locations in by_shape.items()
+            if len(locations) >= self.n_plus_one_threshold and shape not in self.expected_shapes
+        ]
+
+    def problems(self):
+        """Describe the budget overrun and N+1 patterns of the request, an empty list if there are none."""
+
+        problems = []
+        if self.over_budget:
+            problems.append(f'{self.count} queries run, the budget is {self.budget}')
+        for shape, times, locations in self.n_plus_one():
+            where = ', '.join(locations) if locations else 'outside templates'
+            problems.append(f'Possible N+1: query run {times} times from {where}: {shape}')
+        return problems
@@ -0,0 +1,227 @@
+import heapq
+from array import array
+from collections import Counter
+from itertools import chain
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from .models import Follow, Recommendation, StaleRecommendations
+
+try:
+    import numpy as np # In requirements.txt, finds the suggestions of each user with a few vectorized operations
+except ImportError:
+    np = None
+
+# "Who to follow" suggestions: friends of friends, ranked by how many of the people a user follows follow them.
+# That needs two hops of the follow graph per user, far too slow to work out during a request, so they are
+# computed by the recommend_follows command and stored in the Recommendation table, which the page reads.
+# A follow or unfollow marks the users whose suggestions it changes as stale (see signals.py), and
+# 'recommend_follows --stale' recomputes only those, from just the part of the graph around them.
+
+IN_CHUNK = 500 # Ids per 'IN (...)' lookup, well under SQLite's limit on query parameters
+
+
+class FollowGraph:
+    """Who follows whom, as compressed sparse rows held in flat arrays.
+
+    ids holds user ids in ascending order and users are known by their position in it. The positions of the
+    users followed by the user at position i are indices[indptr[i]:indptr[i + 1]]. These are numpy arrays, or
+    array.array if numpy is missing, about 4 bytes per follow and 16 per user either way.
+    """
+
+    def __init__(self, pairs):
+        # pairs are (follower id, followed id), in any order
+        followers, followed = array('q'), array('q')
+        for follower_id, followed_id in pairs:
+            followers.append(follower_id)
+            followed.append(followed_id)
+        self.numpy = np is not None
+        if self.numpy:
+            self._build_numpy(followers, followed)
+        else:
+            self._build_arrays(followers, followed)
+
+    @classmethod
+    def load(cls, using='default'):
+        """The whole follow graph, read in chunks."""
+
+        # A row (from_user, to_user) means to_user follows from_user, read in the order of the (to_user, from_user) index
+        rows = Follow.objects.using(using).order_by('to_user_id', 'from_user_id').values_list('to_user_id', 'from_user_id')
+        return cls(rows.iterator(chunk_size=10000))
+
+    @classmethod
+    def around(cls, user_ids, using='default'):
+        """The part of the graph the given users' suggestions come from: who they follow, and who those users follow."""
+
+        first_hop = list(_follows_of(user_ids, using))
+        second_hop = {followed_id for _, followed_id in first_hop} - set(user_ids) # The users' own follows are loaded already
+        return cls(chain(first_hop, _follows_of(second_hop, using)))
+
+    def _build_numpy(self, followers, followed):
+        followers = np.frombuffer(followers, dtype=np.int64)
+        followed = np.frombuffer(followed, dtype=np.int64)
+        self.ids = np.unique(np.concatenate([followers, followed]))
+        sources = np.searchsorted(self.ids, followers)
+        targets = np.searchsorted(self.ids, followed)
+        self.indices = targets[np.lexsort((targets, sources))].astype(np.int32)
+        self.indptr = np.zeros(len(self.ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(self.ids)), out=self.indptr[1:])
+
+    def _build_arrays(self, followers, followed):
+        self.ids = array('q', sorted(set(followers) | set(followed)))
+        self._positions = {pk: position for position, pk in enumerate(self.ids)}
+        edges = sorted((self._positions[follower_id], self._positions[followed_id]) for follower_id, followed_id in zip(followers, followed))
+        self.indices = array('i', [target for _, target in edges])
+        counts = Counter(source for source, _ in edges)
+        self.indptr = array('q', [0])
+        for position in range(len(self.ids)):
+            self.indptr.append(self.indptr[-1] + counts[position])
+
+    def position(self, user_id):
+        if self.numpy:
+            position = int(np.searchsorted(self.ids, user_id))
+            return position if position < len(self.ids) and self.ids[position] == user_id else None
+        return self._positions.get(user_id)
+
+    def user_ids(self):
+        """Ids of the users who follow someone, the only ones who can have suggestions, in ascending order."""
+
+        if self.numpy:
+            return self.ids[np.diff(self.indptr) > 0].tolist()
+        return [pk for position, pk in enumerate(self.ids) if self.indptr[position + 1] > self.indptr[position]]
+
+    def suggestions(self, user_id, count):
+        """Return up to count (candidate id, mutual count) pairs for the user, most mutual follows first, then by id."""
+
+        position = self.position(user_id)
+        if position is None:
+            return []
+        return self._suggest_numpy(position, count) if self.numpy else self._suggest_arrays(position, count)
+
+    def _suggest_numpy(self, position, count):
+        followed = self.indices[self.indptr[position]:self.indptr[position + 1]]
+        starts = self.indptr[followed]
+        lengths = self.indptr[followed + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return []
+        # Everyone the followed users follow, once per path: item k of the run of followed user j is at starts[j] + k
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        candidates, mutual = np.unique(self.indices[offsets + np.arange(total)], return_counts=True)
+        keep = (candidates != position) & ~np.isin(candidates, followed)
+        candidates, mutual = candidates[keep], mutual[keep]
+        best = np.lexsort((candidates, -mutual))[:count] # Positions sort in the same order as ids
+        return list(zip(self.ids[candidates[best]].tolist(), mutual[best].tolist()))
+
+    def _suggest_arrays(self, position, count):
+        followed = self.indices[self.indptr[position]:self.indptr[position + 1]]
+        mutual = Counter()
+        for followed_position in followed:
+            mutual.update(self.indices[self.indptr[followed_position]:self.indptr[followed_position + 1]])
+        excluded = {position, *followed}
+        best = heapq.nsmallest(count, ((-number, candidate) for candidate, number in mutual.items() if candidate not in excluded))
+        return [(self.ids[candidate], -number) for number, candidate in best]
+
+
+def _follows_of(user_ids, using):
+    # (follower id, followed id) for everyone the given users follow
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), IN_CHUNK):
+        rows = Follow.objects.using(using).filter(to_user_id__in=user_ids[start:start + IN_CHUNK])
+        yield from rows.values_list('to_user_id', 'from_user_id')
+
+
+def _store(graph, user_ids, count, replaced):
+    # Swap the rows of the replaced queryset for the users' new suggestions in one transaction
+    rows = [
+        Recommendation(user_id=user_id, candidate_id=candidate_id, mutual_count=mutual)
+        for user_id in user_ids for candidate_id, mutual in graph.suggestions(user_id, count)
+    ]
+    with transaction.atomic(using=replaced.db):
+        replaced.delete()
+        Recommendation.objects.using(replaced.db).bulk_create(rows)
+
+
+def rebuild(count=None, batch_size=None, using='default'):
+    """Recompute everyone's suggestions from the whole follow graph.
+
+    Yields the number of users stored after each batch so callers can report progress.
+    """
+
+    count = count or settings.RECOMMENDATIONS_PER_USER
+    batch_size = batch_size or settings.RECOMMENDATIONS_BATCH
+    StaleRecommendations.objects.using(using).all().delete() # Follows made from here on are in the graph or marked again
+    graph = FollowGraph.load(using)
+    user_ids = graph.user_ids()
+    previous = 0
+    recommendations = Recommendation.objects.using(using)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        # The whole range of ids is replaced, so users who no longer follow anyone lose their old suggestions
+        _store(graph, batch, count, recommendations.filter(user_id__gt=previous, user_id__lte=batch[-1]))
+        previous = batch[-1]
+        yield len(batch)
+    recommendations.filter(user_id__gt=previous).delete()
+
+
+def update_stale(count=None, batch_size=None, using='default'):
+    """Recompute the suggestions of the users marked stale, from the part of the graph around them.
+
+    Yields the number of users stored after each batch so callers can report progress.
+    """
+
+    count = count or settings.RECOMMENDATIONS_PER_USER
+    batch_size = batch_size or settings.RECOMMENDATIONS_BATCH
+    stale = StaleRecommendations.objects.using(using)
+    while True:
+        with transaction.atomic(using=using):
+            user_ids = list(stale.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not user_ids:
+                return
+            stale.filter(pk__in=user_ids).delete() # Unmarked first, so a follow made while computing marks them again
+            _store(FollowGraph.around(user_ids, using), user_ids, count, Recommendation.objects.using(using).filter(user_id__in=user_ids))
+        yield len(user_ids)
+
+
+def follows_changed(pairs, added):
+    """Update the suggestions for (follower, followed) users that were just followed, or unfollowed if added is False.
+
+    The follower's suggestions change, and so do those of the follower's followers, who reach the followed user
+    through them. Both are marked stale, except the followers of users with more than
+    RECOMMENDATIONS_FANOUT_MAX_FOLLOWERS followers, which wait for the next full rebuild.
+    """
+
+    if added:
+        # Nobody is suggested once followed, even before their follower's suggestions are recomputed
+        just_followed = Q()
+        for follower, followed in pairs:
+            just_followed |= Q(user_id=follower.pk, candidate_id=followed.pk)
+        Recommendation.objects.filter(just_followed).delete()
+
+    followers = {follower.pk: follower for follower, _ in pairs}
+    _mark_stale(followers)
+    for follower in followers.values():
+        if follower.num_followers <= settings.RECOMMENDATIONS_FANOUT_MAX_FOLLOWERS:
+            _mark_stale(follower.followers.values_list('pk', flat=True).iterator(chunk_size=settings.RECOMMENDATIONS_BATCH))
+
+
+def _mark_stale(user_ids):
+    batch = []
+    for user_id in user_ids:
+        batch.append(StaleRecommendations(user_id=user_id))
+        if len(batch) == settings.RECOMMENDATIONS_BATCH:
+            StaleRecommendations.objects.bulk_create(batch, ignore_conflicts=True) # Users marked already are skipped
+            batch = []
+    if batch:
+        StaleRecommendations.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def for_user(user):
+    """The users suggested to user, best first, each with the number of people user follows who follow them."""
+
+    rows = Recommendation.objects.filter(user=user).select_related('candidate').order_by('-mutual_count', 'candidate_id')
+    suggested = []
+    for row in rows:
+        row.candidate.mutual_count = row.mutual_count
+        suggested.append(row.candidate)
+    return suggested
@@ -0,0 +1,73 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+# Database router sending the reads of read-heavy views to a replica listed in DATABASE_REPLICAS and everything
+# else, writes included, to 'default' (the primary). Replicas lag behind the primary, so a browser that just
+# caused a write gets a cookie (see ReplicaStickinessMiddleware) and reads from the primary until it expires,
+# which lets users see their own changes straight away.
+
+# Alias of the replica the current view reads from, None outside views decorated with @read_from_replica
+_read_alias = ContextVar('read_alias', default=None)
+# Set when the current request wrote to the primary
+_wrote = ContextVar('wrote', default=None)
+
+STICKY_COOKIE = 'db_primary'
+
+
+class ReadReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'sessions':
+            return None # A session must be found straight after logging in, before the replicas have it
+        return _read_alias.get() # None leaves it to the other routers, so 'default'
+
+    def db_for_write(self, model, **hints):
+        wrote = _wrote.get()
+        if wrote is not None:
+            wrote[0] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True # Replicas hold the same rows as the primary
+
+
+def read_from_replica(view_function):
+    """Decorator making the queries of a view read from a random replica, unless the browser wrote recently."""
+
+    def replica_for(request):
+        if not settings.DATABASE_REPLICAS or STICKY_COOKIE in request.COOKIES:
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    if iscoroutinefunction(view_function):
+        @wraps(view_function)
+        async def async_modified_view_function(request, *args, **kwargs):
+            token = _read_alias.set(replica_for(request))
+            try:
+                return await view_function(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+        return async_modified_view_function
+
+    @wraps(view_function)
+    def modified_view_function(request, *args, **kwargs):
+        token = _read_alias.set(replica_for(request)) # Also covers querysets evaluated while rendering the template
+        try:
+            return view_function(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return modified_view_function
+
+
+def track_writes():
+    """Start recording whether the current request writes, returns (token, flag) for the middleware."""
+
+    flag = [False] # A list so router calls made in other threads by sync_to_async() can set it
+    return _wrote.set(flag), flag
+
+
+def stop_tracking_writes(token):
+    _wrote.reset(token)
@@ -0,0 +1,146 @@
+import re
+from django.conf import settings
+from django.db import connections
+from .models import User, Post
+
+# Full-text search backed by SQLite FTS5 virtual tables, created in migration 0008 with its own frozen copy of the
+# SQL below, which rebuild_index() uses at runtime.
+# Triggers copy every insert, update and delete on posts_post and posts_user into the index, so bulk
+# inserts and raw deletes stay in sync too. SQLite drops triggers when Django rebuilds a table during a
+# migration, which is why they are (re)installed after every migrate, see install_triggers().
+# Other database backends fall back to the old 'icontains' lookups.
+
+INDEXES = {
+    'posts_post_fts': ('posts_post', ['title', 'body']),
+    'posts_user_fts': ('posts_user', ['username', 'first_name', 'last_name']),
+}
+
+
+def is_supported(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """Turn what the user typed into an FTS5 query where every word must match the start of a word.
+
+    Only letters and digits are kept so characters with a meaning in the FTS5 syntax (quotes, '*', '-',
+    'OR' and so on) cannot change the query.
+    """
+
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words) # 'word*' is a prefix match, words next to each other are ANDed
+
+
+def _trigger_sql(fts_table, table, columns):
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table} BEGIN '
+        f'INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values}); END',
+
+        f'CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table} BEGIN '
+        f'DELETE FROM {fts_table} WHERE rowid = old.id; END',
+
+        f'CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE OF {column_list} ON {table} BEGIN '
+        f'DELETE FROM {fts_table} WHERE rowid = old.id; '
+        f'INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values}); END',
+    ]
+
+
+def create_tables(using='default'):
+    with connections[using].cursor() as cursor:
+        for fts_table, (table, columns) in INDEXES.items():
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5({', '.join(columns)}, tokenize='unicode61')"
+            )
+
+
+def drop_tables(using='default'):
+    with connections[using].cursor() as cursor:
+        for fts_table in INDEXES:
+            for suffix in ('insert', 'delete', 'update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {fts_table}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {fts_table}')
+
+
+def install_triggers(using='default'):
+    with connections[using].cursor() as cursor:
+        for fts_table, (table, columns) in INDEXES.items():
+            for sql in _trigger_sql(fts_table, table, columns):
+                cursor.execute(sql)
+
+
+def rebuild_index(using='default'):
+    """Re-create the triggers and refill both indexes from the tables, returns the number of rows indexed."""
+
+    create_tables(using)
+    install_triggers(using)
+    indexed = 0
+    with connections[using].cursor() as cursor:
+        for fts_table, (table, columns) in INDEXES.items():
+            column_list = ', '.join(columns)
+            cursor.execute(f'DELETE FROM {fts_table}')
+            cursor.execute(f'INSERT INTO {fts_table}(rowid, {column_list}) SELECT id, {column_list} FROM {table}')
+            cursor.execute(f'SELECT COUNT(*) FROM {fts_table}')
+            indexed += cursor.fetchone()[0]
+            cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('optimize')") # Merge index segments
+    return indexed
+
+
+def _ranked_ids(using, fts_table, match, page, page_size):
+    # 'rank' is the bm25 score of the match, lower is better
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s ORDER BY rank LIMIT %s OFFSET %s',
+            [match, page_size + 1, (page - 1) * page_size]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def matching_ids(fts_table, text, limit, using='default'):
+    """Return the ids of at most limit rows of the table behind fts_table matching the text, best match first."""
+
+    match = build_match_query(text)
+    if match is None:
+        return []
+    return _ranked_ids(using, fts_table, match, 1, limit)[:limit]
+
+
+def _page(queryset, fts_table, text, page, page_size):
+    match = build_match_query(text)
+    if match is None:
+        return [], False
+    ids = _ranked_ids(queryset.db, fts_table, match, page, page_size)
+    has_next = len(ids) > page_size
+    ids = ids[:page_size]
+    found = queryset.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found], has_next
+
+
+def _fallback_page(queryset, page, page_size):
+    start = (page - 1) * page_size
+    results = list(queryset[start:start + page_size + 1])
+    return results[:page_size], len(results) > page_size
+
+
+def search_posts(text, page=1, page_size=None):
+    """Return one page of the posts matching the text, best match first, and whether there is a next page."""
+
+    page_size = page_size or settings.SEARCH_PAGE_SIZE
+    if not is_supported():
+        posts = Post.objects.filter(title__icontains=text) | Post.objects.filter(body__icontains=text)
+        return _fallback_page(posts.select_related('author').order_by('-posted_at'), page, page_size)
+    return _page(Post.objects.select_related('author'), 'posts_post_fts', text, page, page_size)
+
+
+def search_users(text, page=1, page_size=None):
+    """Return one page of the users whose username or name matches the text, and whether there is a next page."""
+
+    page_size = page_size or settings.SEARCH_PAGE_SIZE
+    if not is_supported():
+        users = (User.objects.filter(username__icontains=text) | User.objects.filter(first_name__icontains=text)
+                 | User.objects.filter(last_name__icontains=text))
+        return _fallback_page(users.order_by('username'), page, page_size)
+    return _page(User.objects.all(), 'posts_user_fts', text, page, page_size)
@@ -0,0 +1,44 @@
+import time
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from .queries import count_saved_query
+
+# Session engine (SESSION_ENGINE = 'posts.sessions') reading sessions from the SESSION_CACHE_ALIAS cache and writing
+# changes to the database behind it. New sessions (logging in) and deleted ones (logging out) go to the database
+# straight away, and so does a change of the logged in user or their password hash. Other changes such as messages
+# only go to the cache, and to the database with the next change made SESSION_WRITE_BEHIND seconds or more after
+# the last database write. If the cache loses a session, its database copy is used, which is at most that many
+# seconds behind and still has the logged in user.
+
+# Session keys holding the time of the last database write, and the logged in user and password hash it held
+DB_SAVED_AT = '_db_saved_at'
+DB_SAVED_AUTH = '_db_saved_auth'
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = 'posts.sessions'
+
+    def load(self):
+        try:
+            data = self._cache.get(self.cache_key)
+        except Exception:
+            data = None # Some backends raise on invalid keys, the parent class resets the session then
+        if data is not None:
+            count_saved_query() # The session row was not read
+            return data
+        return super().load()
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create() # Calls save(must_create=True) with a new key
+        session = self._get_session(no_load=must_create)
+        # Logging in happens after the new session was created, so it is only in the database if written here
+        auth = [session.get(SESSION_KEY), session.get(HASH_SESSION_KEY)]
+        if must_create or auth != session.get(DB_SAVED_AUTH) or time.time() - session.get(DB_SAVED_AT, 0) >= settings.SESSION_WRITE_BEHIND:
+            session[DB_SAVED_AT] = time.time()
+            session[DB_SAVED_AUTH] = auth
+            super().save(must_create)
+        else:
+            self._cache.set(self.cache_key, session, self.get_expiry_age())
+            count_saved_query() # The session row was not written
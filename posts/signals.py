@@ -0,0 +1,99 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db import connections
+from django.db.models.signals import post_save, post_delete, m2m_changed, post_migrate
+from django.dispatch import receiver
+from .models import User, Post
+from . import timeline, search, counters, images, stats, live, recommendations
+from .backends import forget_user
+
+# Receivers are connected in PostsConfig.ready() by importing this module
+
+
+def _follow_pairs(instance, reverse, pk_set):
+    # 'to_follow.followers.add(user)' sends the followed user as instance, 'user.following.add(to_follow)' the follower
+    if reverse:
+        return [(instance.pk, pk) for pk in pk_set]
+    return [(pk, instance.pk) for pk in pk_set]
+
+
+@receiver(post_save, sender=Post)
+def on_post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.add_posts([instance.author_id])
+        stats.add('posts', 'posts_version') # The version makes pages showing posts out of date, see conditional.py
+        timeline.fan_out(instance)
+        images.schedule_variants(instance)
+        live.publish_post(instance)
+    else:
+        stats.add('posts_version') # The profile page's ETag follows the post's edited_at, see conditional.py
+
+
+@receiver(post_delete, sender=Post)
+def on_post_deleted(sender, instance, **kwargs):
+    counters.add_posts([instance.author_id], sign=-1)
+    stats.add('posts', amount=-1)
+    stats.add('posts_version')
+
+
+@receiver(post_save, sender=User)
+def on_user_saved(sender, instance, created, **kwargs):
+    # Covers editing the profile and changing the password (see backends.py), and new users, who can reuse the id
+    # of a deleted user still in the cache
+    forget_user(instance.pk)
+    if created:
+        stats.add('users')
+        return
+    if getattr(instance, 'profile_changed', False):
+        stats.add('posts_version') # Their posts in the feed show the old username
+
+
+@receiver(post_delete, sender=User)
+def on_user_deleted(sender, instance, **kwargs):
+    stats.add('users', amount=-1)
+    forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def on_user_logged_out(sender, request, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
+
+
+@receiver(m2m_changed, sender=User.followers.through)
+def on_follow_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('pre_remove', 'pre_clear'):
+        # pk_set may name users that were not followed, and is not given at all when clearing,
+        # so find the rows that really go before they are deleted
+        related = instance.following if reverse else instance.followers
+        if pk_set is not None:
+            related = related.filter(pk__in=pk_set)
+        instance._removed_follows = _follow_pairs(instance, reverse, related.values_list('pk', flat=True))
+        return
+
+    if action == 'post_add':
+        pairs = _follow_pairs(instance, reverse, pk_set) # Only holds users that were not followed already
+    elif action in ('post_remove', 'post_clear'):
+        pairs = instance.__dict__.pop('_removed_follows', [])
+    else:
+        return
+    if not pairs:
+        return
+
+    added = action == 'post_add'
+    counters.add_follows(pairs, sign=1 if added else -1)
+    users = User.objects.in_bulk({pk for pair in pairs for pk in pair})
+    for follower_id, followee_id in pairs:
+        if added:
+            timeline.backfill(users[follower_id], users[followee_id])
+        else:
+            timeline.remove(users[follower_id], users[followee_id])
+    recommendations.follows_changed([(users[follower_id], users[followee_id]) for follower_id, followee_id in pairs], added)
+
+
+@receiver(post_migrate)
+def install_search_triggers(sender, using, **kwargs):
+    # SQLite loses the triggers when a migration rebuilds posts_post or posts_user, so put them back
+    if sender.name != 'posts' or not search.is_supported(using):
+        return
+    if 'posts_post_fts' in connections[using].introspection.table_names():
+        search.install_triggers(using)
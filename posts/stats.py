@@ -0,0 +1,94 @@
+import threading
+import time
+from django.conf import settings
+from django.db.models import F
+from .models import User, Post, SiteStat
+
+# Site-wide totals shown on the home page. COUNT(*) scans the whole table on SQLite and Postgres, so the totals
+# are kept in the SiteStat table instead, updated by signals.py as rows come and go, and each process keeps its
+# own copy for SITE_STATS_MAX_AGE seconds. The totals can be that many seconds behind other processes' writes.
+
+# 'posts_version' is not a total but is bumped whenever a post or the profile of a user changes, the feed's
+# ETag is built from it (see conditional.py)
+
+# Stat name -> the model it counts, used when recounting
+COUNTED_MODELS = {
+    'users': User,
+    'posts': Post,
+}
+
+_cache = {'totals': None, 'expires': 0}
+_lock = threading.Lock()
+
+
+def add(*names, amount=1):
+    """Add amount (negative to subtract) to each named stat, all in a single 'UPDATE ... SET value = value + x'."""
+
+    if SiteStat.objects.filter(name__in=names).update(value=F('value') + amount) < len(names):
+        # Some rows are missing, recount() gives them their real value
+        missing = set(names) - set(SiteStat.objects.filter(name__in=names).values_list('name', flat=True))
+        SiteStat.objects.bulk_create([SiteStat(name=name, value=amount) for name in missing], ignore_conflicts=True)
+    clear_cache() # Changes made by this process show straight away
+
+
+def totals():
+    """Return a dictionary of stat name -> value, read from the database at most once every SITE_STATS_MAX_AGE seconds."""
+
+    cached = _cached_totals()
+    if cached is not None:
+        return cached
+    return _store_totals(dict(SiteStat.objects.values_list('name', 'value')))
+
+
+async def atotals():
+    """Same as totals() for async views."""
+
+    cached = _cached_totals()
+    if cached is not None:
+        return cached
+    return _store_totals({name: value async for name, value in SiteStat.objects.values_list('name', 'value')})
+
+
+def _cached_totals():
+    with _lock:
+        if _cache['totals'] is not None and time.monotonic() < _cache['expires']:
+            return _cache['totals']
+    return None
+
+
+def _store_totals(stored):
+    result = {name: max(0, stored.get(name, 0)) for name in COUNTED_MODELS}
+    with _lock:
+        _cache['totals'] = result
+        _cache['expires'] = time.monotonic() + settings.SITE_STATS_MAX_AGE
+    return result
+
+
+def current(*names):
+    """Read stats straight from the database, bypassing the cache, for values that must never be stale."""
+
+    stored = dict(SiteStat.objects.filter(name__in=names).values_list('name', 'value'))
+    return [stored.get(name, 0) for name in names]
+
+
+async def acurrent(*names):
+    """Same as current() for async views."""
+
+    stored = {name: value async for name, value in SiteStat.objects.filter(name__in=names).values_list('name', 'value')}
+    return [stored.get(name, 0) for name in names]
+
+
+def clear_cache():
+    with _lock:
+        _cache['totals'] = None
+
+
+def recount():
+    """Set every stat to the exact number of rows in its table, returns the new totals."""
+
+    result = {}
+    for name, model in COUNTED_MODELS.items():
+        result[name] = model.objects.count()
+        SiteStat.objects.update_or_create(name=name, defaults={'value': result[name]})
+    clear_cache()
+    return result
@@ -0,0 +1,49 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+# Streamed responses (the export view and large API pages) are built by sync generators reading the database.
+# Under ASGI, Django turns a sync iterator into an async one with sync_to_async(list), which builds the whole
+# response in memory before sending any of it. AsyncChunks is an async iterator instead, running the generator
+# in the request's sync thread for STREAM_BATCH_BYTES at a time, so only that much is held at once.
+
+
+class AsyncChunks:
+    """Async iterator over a sync iterator of str or bytes chunks, each step joins the next few chunks into one."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # thread_sensitive, so the generator always runs in the thread holding its database connection
+        batch = await sync_to_async(self._next_batch, thread_sensitive=True)()
+        if not batch:
+            raise StopAsyncIteration
+        return batch[0][:0].join(batch) # '' or b'', the same type as the chunks
+
+    def _next_batch(self):
+        batch, size = [], 0
+        for chunk in self.chunks:
+            batch.append(chunk)
+            size += len(chunk)
+            if size >= settings.STREAM_BATCH_BYTES:
+                break
+        return batch
+
+    def close(self):
+        # Called with the response's close(), so a download that stops early releases the generator's cursor
+        close = getattr(self.chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def streaming_response(request, chunks, **kwargs):
+    """StreamingHttpResponse sending the chunks while they are generated, under WSGI and ASGI alike."""
+
+    if isinstance(request, ASGIRequest):
+        chunks = AsyncChunks(chunks)
+    return StreamingHttpResponse(chunks, **kwargs)
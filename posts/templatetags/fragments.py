@@ -0,0 +1,10 @@
+from django import template
+from django.core.cache import caches
+
+register = template.Library()
+
+
+@register.simple_tag
+def fragment_timeout():
+    # The {% cache %} tag needs a timeout, this is the 'fragments' cache's own TIMEOUT from settings.py
+    return caches['fragments'].default_timeout
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.contrib.admin.views.main import ChangeList
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.admin import PostAdmin
+from posts.admin_scaling import KeysetChangeList, IndexedDatesQuerySet, estimated_count
+from posts.models import User, Post
+
+
+class AdminScalingTestCase(TestCase):
+
+    fixtures = [
+        'posts/tests/fixtures/test_user.json',
+        'posts/tests/fixtures/other_users.json'
+    ]
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='@admin', email='admin@example.org', password='Password123', first_name='Ad', last_name='Min'
+        )
+        self.jane = User.objects.get(username='@janedoe')
+        self.john = User.objects.get(username='@johndoe')
+        self.client.login(username='@admin', password='Password123')
+        self.url = reverse('admin:posts_post_changelist')
+
+    def _create_posts(self, count, author, start=datetime(2023, 12, 30, tzinfo=dt_timezone.utc), step=timedelta(hours=12)):
+        return [
+            Post.objects.create(author=author, title=f'Post {number}', body='Lorem ipsum', posted_at=start - step * number)
+            for number in range(count)
+        ]
+
+    @mock.patch.object(PostAdmin, 'list_per_page', 2)
+    def test_changelist_is_paged_with_cursor(self):
+        posts = self._create_posts(5, self.jane)
+        response = self.client.get(self.url)
+        cl = response.context['cl']
+        self.assertIsInstance(cl, KeysetChangeList)
+        self.assertEqual(list(cl.result_list), posts[:2])
+        self.assertContains(response, 'Older')
+        self.assertIsNone(cl.first_page_url)
+
+        response = self.client.get(self.url + cl.next_page_url)
+        cl = response.context['cl']
+        self.assertEqual(list(cl.result_list), posts[2:4])
+        self.assertContains(response, 'Newest')
+
+    def test_changelist_does_not_count_the_table(self):
+        self._create_posts(3, self.jane)
+        self.client.get(self.url) # Loads the session and user into the cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+        self.assertContains(response, 'About 3 posts')
+
+    def test_authors_are_fetched_with_the_posts(self):
+        self._create_posts(3, self.jane)
+        self._create_posts(3, self.john)
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        author_queries = [query for query in queries if query['sql'].startswith('SELECT') and 'FROM "posts_user"' in query['sql']]
+        self.assertEqual(author_queries, [])
+
+    def test_sorting_by_column_falls_back_to_numbered_pages(self):
+        self._create_posts(3, self.jane)
+        response = self.client.get(self.url, {'o': '1'})
+        cl = response.context['cl']
+        self.assertFalse(cl.keyset)
+        self.assertEqual([post.title for post in cl.result_list], ['Post 0', 'Post 1', 'Post 2'])
+
+    def test_search_by_username_prefix(self):
+        self._create_posts(2, self.jane)
+        self._create_posts(1, self.john)
+        response = self.client.get(self.url, {'q': '@jan'})
+        self.assertEqual({post.author for post in response.context['cl'].result_list}, {self.jane})
+
+    def test_search_uses_full_text_index(self):
+        Post.objects.create(author=self.jane, title='Gardening tips', body='Tomatoes')
+        Post.objects.create(author=self.jane, title='Cooking', body='Tomato soup')
+        Post.objects.create(author=self.jane, title='Unrelated', body='Nothing here')
+        response = self.client.get(self.url, {'q': 'tomato'})
+        self.assertEqual({post.title for post in response.context['cl'].result_list}, {'Gardening tips', 'Cooking'})
+
+    def test_user_changelist(self):
+        response = self.client.get(reverse('admin:posts_user_changelist'), {'q': '@j'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {user.username for user in response.context['cl'].result_list}, {'@johndoe', '@janedoe', '@jimdoe', '@jackiedoe'}
+        )
+        response = self.client.get(reverse('admin:posts_user_changelist'), {'q': 'jane'})
+        self.assertEqual([user.username for user in response.context['cl'].result_list], ['@janedoe'])
+
+    def test_date_hierarchy(self):
+        self._create_posts(3, self.jane, step=timedelta(days=200))
+        response = self.client.get(self.url)
+        self.assertContains(response, 'posted_at__year=2022')
+        self.assertContains(response, 'posted_at__year=2023')
+        response = self.client.get(self.url, {'posted_at__year': '2023'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'posted_at__month=12')
+
+    def test_indexed_datetimes_match_django(self):
+        self._create_posts(40, self.jane, step=timedelta(days=9, hours=7))
+        queryset = Post.objects.all()
+        indexed = IndexedDatesQuerySet(Post, using='default')
+        for kind in ['year', 'month', 'day']:
+            with self.subTest(kind=kind):
+                self.assertEqual(list(indexed.datetimes('posted_at', kind)), list(queryset.datetimes('posted_at', kind)))
+                self.assertEqual(
+                    list(indexed.datetimes('posted_at', kind, order='DESC')), list(queryset.datetimes('posted_at', kind, order='DESC'))
+                )
+
+    @override_settings(ADMIN_COUNT_LIMIT=2)
+    def test_estimated_count(self):
+        posts = self._create_posts(4, self.jane)
+        self.assertEqual(estimated_count(Post.objects.all()), posts[-1].pk) # The highest id
+        self.assertEqual(estimated_count(Post.objects.filter(author=self.jane)), 2) # Stops at the limit
+        self.assertEqual(estimated_count(Post.objects.filter(author=self.john)), 0)
+
+    @override_settings(ADMIN_SCALING=False)
+    def test_scaling_turned_off(self):
+        self._create_posts(3, self.jane)
+        response = self.client.get(self.url)
+        cl = response.context['cl']
+        self.assertIs(type(cl), ChangeList)
+        self.assertEqual(cl.full_result_count, 3) # Counted exactly
+        response = self.client.get(self.url, {'q': 'Post'})
+        self.assertEqual(len(response.context['cl'].result_list), 3) # LIKE search
@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase
+from posts.benchmark import summarize, compare
+
+
+class BenchmarkReportTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.baseline = self._report(p50=10.0, queries=3)
+
+    def test_summarize(self):
+        result = summarize([0.001 * n for n in range(1, 101)], [3, 3, 4], 2048)
+        self.assertEqual(result['requests'], 100)
+        self.assertEqual(result['p50_ms'], 51.0)
+        self.assertEqual(result['p99_ms'], 99.0)
+        self.assertEqual(result['max_ms'], 100.0)
+        self.assertEqual(result['queries'], 4)
+        self.assertEqual(result['peak_memory_kb'], 2.0)
+
+    def test_compare_within_threshold(self):
+        self.assertEqual(compare(self._report(p50=12.0, queries=3), self.baseline, 0.25), [])
+
+    def test_compare_finds_slowdown(self):
+        regressions = compare(self._report(p50=13.0, queries=3), self.baseline, 0.25)
+        self.assertEqual(regressions, ['feed at 1000 posts: p50_ms 10.0 -> 13.0'])
+
+    def test_compare_finds_extra_queries(self):
+        regressions = compare(self._report(p50=10.0, queries=4), self.baseline, 0.25)
+        self.assertEqual(regressions, ['feed at 1000 posts: queries 3 -> 4'])
+
+    def test_compare_skips_views_missing_from_baseline(self):
+        self.assertEqual(compare(self._report(p50=99.0, queries=9), {'results': {}}, 0.25), [])
+
+    def _report(self, p50, queries):
+        result = {'p50_ms': p50, 'p90_ms': 20.0, 'peak_memory_kb': 100.0, 'queries': queries}
+        return {'results': {'1000': {'feed': result}}}
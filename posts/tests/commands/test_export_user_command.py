@@ -0,0 +1,49 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from posts.models import User, Post
+
+
+class ExportUserCommandTestCase(TestCase):
+
+    fixtures = [
+            'posts/tests/fixtures/test_user.json',
+            'posts/tests/fixtures/other_users.json'
+        ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        self.jane.toggle_follow(self.user)
+        for number in range(5):
+            Post.objects.create(author=self.user, title=f'Post {number}')
+
+    def test_export_to_stdout(self):
+        output = StringIO()
+        call_command('export_user', '@johndoe', chunk_size=2, stdout=output)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([record['title'] for record in records if record['type'] == 'post'], [f'Post {number}' for number in range(5)])
+        self.assertEqual([record['username'] for record in records if record['type'] == 'follower'], ['@janedoe'])
+
+    def test_export_csv_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.csv')
+            output = StringIO()
+            call_command('export_user', '@johndoe', format='csv', include='followers', output=path, stdout=output)
+            with open(path) as file:
+                lines = file.read().splitlines()
+        self.assertEqual(lines[0], 'type,id,username,first_name,last_name,title,body,image,posted_at')
+        self.assertTrue(lines[1].startswith(f'follower,{self.jane.pk},@janedoe,'))
+        self.assertIn('Wrote 2 lines', output.getvalue())
+
+    def test_export_unknown_user(self):
+        with self.assertRaises(CommandError):
+            call_command('export_user', '@nobody', stdout=StringIO())
+
+    def test_export_unknown_section(self):
+        with self.assertRaises(CommandError):
+            call_command('export_user', '@johndoe', include='posts,likes', stdout=StringIO())
@@ -0,0 +1,128 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from posts.models import User, Post
+from posts import search, stats
+
+
+class ImportPostsCommandTestCase(TestCase):
+
+    fixtures = [
+            'posts/tests/fixtures/test_user.json',
+            'posts/tests/fixtures/other_users.json'
+        ]
+
+    def setUp(self):
+        self.john = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'posts.jsonl')
+        self.rejects_path = self.path + '.rejects.jsonl'
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, *rows):
+        with open(self.path, 'w') as file:
+            for row in rows:
+                file.write((row if isinstance(row, str) else json.dumps(row)) + '\n')
+
+    def _import(self, **options):
+        output = StringIO()
+        call_command('import_posts', self.path, stdout=output, **options)
+        return output.getvalue()
+
+    def _rejects(self):
+        with open(self.rejects_path) as file:
+            return [json.loads(line) for line in file]
+
+    def test_import_posts(self):
+        self._write(
+            {'author': '@johndoe', 'title': 'Imported', 'body': 'Old post', 'posted_at': '2020-01-02T03:04:05Z'},
+            {'author': '@janedoe', 'title': 'Also imported'},
+            '', # Blank lines are skipped
+            {'author': '@johndoe', 'title': 'With image', 'image': 'post_images/old.png', 'posted_at': '2020-01-03T00:00:00'},
+        )
+        output = self._import(batch_size=2)
+
+        self.assertEqual(Post.objects.count(), 3)
+        post = Post.objects.get(title='Imported')
+        self.assertEqual((post.author, post.body, post.posted_at.isoformat()), (self.john, 'Old post', '2020-01-02T03:04:05+00:00'))
+        self.assertEqual(Post.objects.get(title='With image').posted_at.isoformat(), '2020-01-03T00:00:00+00:00') # UTC
+        self.assertEqual(Post.objects.get(title='With image').image.name, 'post_images/old.png')
+        self.assertIn('Imported 3 posts', output)
+        self.assertIn('rows/s', output)
+        self.assertFalse(os.path.exists(self.rejects_path)) # Nothing was rejected
+
+    def test_import_updates_counters_totals_and_search(self):
+        self._write(*[{'author': '@janedoe', 'title': f'Imported {number}'} for number in range(3)])
+        self._import()
+        self.jane.refresh_from_db()
+        self.assertEqual(self.jane.num_posts, 3)
+        self.assertEqual(stats.totals()['posts'], 3)
+        posts, _ = search.search_posts('imported')
+        self.assertEqual(len(posts), 3)
+
+    def test_invalid_rows_are_rejected(self):
+        self._write(
+            {'author': '@johndoe', 'title': 'Fine'},
+            '{not json',
+            {'author': '@johndoe', 'title': ''},
+            {'author': '@johndoe', 'title': 'x' * 151, 'body': 'y' * 501},
+            {'author': '@nobody', 'title': 'Unknown author'},
+            {'title': 'No author', 'likes': 3},
+            {'author': '@johndoe', 'title': 'Bad date', 'posted_at': 'yesterday'},
+            {'author': '@johndoe', 'title': 'Impossible date', 'posted_at': '2020-02-30T00:00:00'},
+            {'author': '@johndoe', 'title': 'Impossible time', 'posted_at': '2020-01-01T25:00:00'},
+            {'author': '@johndoe', 'title': 'Bad image', 'image': 'post_images/script.exe'},
+            '["a list"]',
+        )
+        output = self._import()
+
+        self.assertEqual(list(Post.objects.values_list('title', flat=True)), ['Fine'])
+        self.assertIn('Rejected 10 rows', output)
+        rejects = sorted(self._rejects(), key=lambda reject: reject['line']) # Unknown authors are found last
+        self.assertEqual([reject['line'] for reject in rejects], [2, 3, 4, 5, 6, 7, 8, 9, 10, 11])
+        self.assertTrue(rejects[0]['errors'][0].startswith('Invalid JSON'))
+        self.assertEqual(rejects[0]['row'], '{not json')
+        self.assertEqual(rejects[1]['errors'], ['title: This field is required.'])
+        self.assertEqual(len(rejects[2]['errors']), 2) # Title and body too long
+        self.assertEqual(rejects[3]['errors'], ['author: No user with the username @nobody'])
+        self.assertEqual(rejects[3]['row'], {'author': '@nobody', 'title': 'Unknown author'})
+        self.assertEqual(rejects[4]['errors'], ['Unknown fields: likes', 'author: A username is required'])
+        for reject in rejects[5:8]:
+            self.assertEqual(reject['errors'], ['posted_at: Enter a valid ISO 8601 date and time'])
+        self.assertTrue(rejects[8]['errors'][0].startswith('image'))
+        self.assertEqual(rejects[9]['errors'], ['Each line must be a JSON object'])
+
+    def test_authors_are_looked_up_once(self):
+        self._write(*[{'author': '@janedoe', 'title': f'Post {number}'} for number in range(10)])
+        output = self._import(batch_size=5)
+        self.assertIn('author cache 1 hits and 1 misses', output)
+
+    def _import_queries(self, rows):
+        stats.add('posts_version') # Created by the first import otherwise
+        self._write(*[{'author': author, 'title': 'Post'} for author in ['@johndoe', '@janedoe', '@jimdoe'] * (rows // 3)])
+        with CaptureQueriesContext(connection) as queries:
+            self._import(batch_size=rows)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_batch_size(self):
+        self.assertEqual(self._import_queries(6), self._import_queries(60))
+
+    def test_dry_run(self):
+        self._write({'author': '@johndoe', 'title': 'Fine'}, {'author': '@johndoe', 'title': ''})
+        output = self._import(dry_run=True)
+        self.assertEqual(Post.objects.count(), 0)
+        self.assertIn('Validated 1 posts', output)
+        self.assertEqual(len(self._rejects()), 1)
+
+    def test_missing_file(self):
+        with self.assertRaises(CommandError):
+            call_command('import_posts', os.path.join(self.directory.name, 'missing.jsonl'), stdout=StringIO())
@@ -0,0 +1,20 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from posts.models import User, Post, TrendingPost
+from posts import trending
+
+
+class RankTrendingCommandTestCase(TestCase):
+
+    fixtures = ['posts/tests/fixtures/test_user.json']
+
+    def tearDown(self):
+        trending.clear_cache()
+
+    def test_rank_trending(self):
+        Post.objects.create(author=User.objects.get(username='@johndoe'), title='First')
+        output = StringIO()
+        call_command('rank_trending', size=10, stdout=output)
+        self.assertIn('Ranked 1 trending posts', output.getvalue())
+        self.assertEqual(TrendingPost.objects.get().post.title, 'First')
@@ -0,0 +1,37 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from posts.models import User, Recommendation, StaleRecommendations
+
+
+class RecommendFollowsCommandTestCase(TestCase):
+
+    fixtures = [
+            'posts/tests/fixtures/test_user.json',
+            'posts/tests/fixtures/other_users.json'
+        ]
+
+    def setUp(self):
+        self.john = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        self.jim = User.objects.get(username='@jimdoe')
+        self.john.toggle_follow(self.jane)
+        self.jane.toggle_follow(self.jim)
+
+    def _run(self, **options):
+        output = StringIO()
+        call_command('recommend_follows', stdout=output, **options)
+        return output.getvalue()
+
+    def test_recommend_follows(self):
+        output = self._run(per_user=5, batch_size=1)
+        self.assertIn('Computed the suggestions of 2 users', output)
+        self.assertEqual(list(Recommendation.objects.values_list('user', 'candidate', 'mutual_count')), [(self.john.pk, self.jim.pk, 1)])
+
+    def test_stale_only(self):
+        self._run()
+        self.jim.toggle_follow(self.john)
+        output = self._run(stale=True)
+        self.assertIn('Computed the suggestions of 2 users', output) # Jim and Jane, who follows Jim
+        self.assertTrue(Recommendation.objects.filter(user=self.jim, candidate=self.jane).exists())
+        self.assertFalse(StaleRecommendations.objects.exists())
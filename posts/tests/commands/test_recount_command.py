@@ -0,0 +1,39 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from posts.models import User, Post, SiteStat
+from posts import stats
+
+
+class RecountCommandTestCase(TestCase):
+
+    fixtures = [
+            'posts/tests/fixtures/test_user.json',
+            'posts/tests/fixtures/other_users.json'
+        ]
+
+    def setUp(self):
+        self.john = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+
+    def test_recount_repairs_drift(self):
+        self.john.toggle_follow(self.jane)
+        Post.objects.create(author=self.jane, title='Test')
+        User.objects.update(num_followers=7, num_following=7, num_posts=7) # Simulate drifted counters
+
+        call_command('recount', batch_size=2, stdout=StringIO())
+
+        self.john.refresh_from_db()
+        self.jane.refresh_from_db()
+        self.assertEqual((self.john.num_followers, self.john.num_following, self.john.num_posts), (0, 1, 0))
+        self.assertEqual((self.jane.num_followers, self.jane.num_following, self.jane.num_posts), (1, 0, 1))
+        self.assertEqual(User.objects.get(username='@jimdoe').num_following, 0)
+
+    def test_recount_repairs_site_totals(self):
+        Post.objects.create(author=self.jane, title='Test')
+        SiteStat.objects.update(value=1000) # Simulate drifted totals
+
+        call_command('recount', stdout=StringIO())
+
+        stats.clear_cache()
+        self.assertEqual(stats.totals(), {'users': User.objects.count(), 'posts': 1})
@@ -0,0 +1,52 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+from posts.models import User, Post, Follow, TimelineEntry
+from posts import stats
+from posts.management.commands.seed import SEED_EMAIL_DOMAIN, SEED_PASSWORD
+
+
+class SeedCommandTestCase(TestCase):
+
+    def test_seed_creates_users_posts_and_follows(self):
+        output = StringIO()
+        call_command('seed', users=30, posts=100, follows=60, seed=1, batch_size=16, stdout=output)
+
+        self.assertEqual(User.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}').count(), 30)
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertTrue(0 < Follow.objects.count() <= 60)
+        self.assertIn('rows/s', output.getvalue())
+
+        user = User.objects.first()
+        user.full_clean() # Generated usernames and emails pass the model validation
+        self.assertTrue(self.client.login(username=user.username, password=SEED_PASSWORD))
+
+    def test_seed_sets_counters(self):
+        call_command('seed', users=20, posts=50, follows=40, seed=2, stdout=StringIO())
+        for user in User.objects.annotate(posts=Count('post', distinct=True), follower_rows=Count('followers', distinct=True)):
+            self.assertEqual(user.num_posts, user.posts)
+            self.assertEqual(user.num_followers, user.follower_rows)
+        self.assertEqual(stats.totals(), {'users': 20, 'posts': 50})
+
+    def test_seed_twice_does_not_clash(self):
+        call_command('seed', users=10, posts=0, follows=0, seed=3, stdout=StringIO())
+        call_command('seed', users=10, posts=0, follows=0, seed=3, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 20)
+
+    def test_seed_fills_timelines(self):
+        with self.settings(TIMELINE_BACKFILL=3, TIMELINE_MAX_ENTRIES=5):
+            call_command('seed', users=20, posts=200, follows=60, seed=4, stdout=StringIO())
+        self.assertTrue(TimelineEntry.objects.exists())
+        for user in User.objects.filter(following__isnull=False).distinct():
+            expected = set()
+            for followed in user.following.all():
+                expected |= set(Post.objects.filter(author=followed).order_by('-posted_at', '-id').values_list('pk', flat=True)[:3])
+            entries = set(TimelineEntry.objects.filter(user=user).values_list('post_id', flat=True))
+            self.assertTrue(entries <= expected)
+            self.assertEqual(len(entries), min(len(expected), 5)) # Trimmed to TIMELINE_MAX_ENTRIES
+
+    def test_seed_leaves_high_follower_authors_out_of_timelines(self):
+        with self.settings(TIMELINE_FANOUT_MAX_FOLLOWERS=1):
+            call_command('seed', users=10, posts=50, follows=30, seed=5, stdout=StringIO())
+        self.assertFalse(TimelineEntry.objects.exists()) # Everyone followed has at least one follower
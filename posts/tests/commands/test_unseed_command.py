@@ -0,0 +1,38 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from posts.models import User, Post, Follow, TimelineEntry
+from posts import stats
+
+
+class UnseedCommandTestCase(TestCase):
+
+    fixtures = ['posts/tests/fixtures/test_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        call_command('seed', users=25, posts=80, follows=50, seed=1, stdout=StringIO())
+        self.seeded = list(User.objects.exclude(pk=self.user.pk).order_by('pk')[:2])
+
+    def test_unseed_deletes_seeded_data_only(self):
+        self.user.toggle_follow(self.seeded[0]) # Backfills the timeline with the seeded user's posts
+        self.seeded[1].toggle_follow(self.user)
+        own_post = Post.objects.create(author=self.user, title='Mine')
+
+        output = StringIO()
+        call_command('unseed', batch_size=10, post_batch_size=7, stdout=output)
+
+        self.assertEqual(list(User.objects.all()), [self.user])
+        self.assertEqual(list(Post.objects.all()), [own_post])
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exclude(post=own_post).exists())
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.num_followers, self.user.num_following, self.user.num_posts), (0, 0, 1))
+        self.assertIn('Deleted 25 seeded users', output.getvalue())
+        self.assertEqual(stats.totals(), {'users': 1, 'posts': 1})
+
+    def test_unseed_again_has_nothing_to_do(self):
+        call_command('unseed', stdout=StringIO())
+        output = StringIO()
+        call_command('unseed', stdout=output) # A run that was interrupted is resumed the same way
+        self.assertIn('No seeded users to delete', output.getvalue())
@@ -1,3 +1,52 @@
+import re
+from contextlib import contextmanager
+from django.db import connections
+
 class LogInTest:
     def _is_logged_in(self):
-        return '_auth_user_id' in self.client.session.keys()
\ No newline at end of file
+        return '_auth_user_id' in self.client.session.keys()
+
+class QueryBudgetTest:
+    # Needs QUERY_INSPECTOR on (it follows DEBUG in settings.py) so QueryInspectorMiddleware reports the queries
+    def assertWithinQueryBudget(self, response):
+        report = getattr(response, 'query_report', None)
+        if report is None:
+            self.fail('No query report on the response, is QUERY_INSPECTOR turned on?')
+        problems = report.problems()
+        if problems:
+            self.fail('\n'.join(problems))
+
+class QueryPlanTest:
+    # SQLite describes reading a whole table as 'SCAN <table>', older versions as 'SCAN TABLE <table>'.
+    # Scans of an index ('SCAN t USING INDEX i') and of full text indexes ('SCAN t VIRTUAL TABLE ...') are fine
+    FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\S+)(?: AS \S+)?$')
+    SUBQUERY = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (\S+)')
+
+    @contextmanager
+    def assertNoFullTableScans(self, using='default'):
+        """Fail if the query plan of any SELECT run inside the block reads a whole table."""
+
+        selects = []
+        def record(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                selects.append((sql, params))
+            return execute(sql, params, many, context)
+
+        connection = connections[using]
+        with connection.execute_wrapper(record):
+            yield
+        self.assertTrue(selects, 'No queries were run')
+
+        scans = []
+        with connection.cursor() as cursor:
+            for sql, params in selects:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                details = [row[3] for row in cursor.fetchall()]
+                # Reading every row of a subquery's result is not a table scan, only its own plan lines matter
+                subqueries = {match[1] for match in map(self.SUBQUERY.match, details) if match}
+                for match in map(self.FULL_SCAN.match, details):
+                    if match and match[1] not in subqueries and not match[1].startswith('('):
+                        scans.append(f'{sql}\n    ' + '\n    '.join(details))
+                        break
+        if scans:
+            self.fail('Full table scans:\n' + '\n'.join(scans))
@@ -0,0 +1,107 @@
+import tempfile
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.backends import user_cache_key
+from posts.models import User
+from posts.sessions import SessionStore
+
+
+class CachedSessionsTestCase(TestCase):
+
+    fixtures = ['posts/tests/fixtures/test_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.cache = caches['sessions']
+        self.client.login(username=self.user.username, password='Password123')
+
+    @override_settings(QUERY_INSPECTOR=True)
+    def test_logged_in_requests_read_session_and_user_from_cache(self):
+        self.client.get(reverse('edit_profile'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('edit_profile'))
+        self.assertEqual(response['X-Queries-Saved'], '2')
+
+    def test_edit_profile_updates_cached_user(self):
+        self.client.get(reverse('edit_profile'))
+        self.client.post(reverse('edit_profile'), {
+            'username': self.user.username, 'first_name': 'Johnny', 'last_name': 'Doe', 'email': self.user.email, 'bio': 'New'
+        })
+        response = self.client.get(reverse('edit_profile'))
+        self.assertEqual(response.wsgi_request.user.first_name, 'Johnny')
+
+    def test_edit_profile_keeps_counters_updated_since_user_was_cached(self):
+        self.client.get(reverse('edit_profile')) # Caches the user with no followers
+        follower = User.objects.create_user(username='@janedoe', email='jane@example.org', password='Password123')
+        follower.toggle_follow(self.user)
+        self.client.post(reverse('edit_profile'), {
+            'username': self.user.username, 'first_name': 'Johnny', 'last_name': 'Doe', 'email': self.user.email, 'bio': 'New'
+        })
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.first_name, self.user.num_followers), ('Johnny', 1))
+
+    def test_change_password_logs_out_other_sessions(self):
+        other = self.client_class()
+        other.login(username=self.user.username, password='Password123')
+        other.get(reverse('feed')) # Caches the user with the old password hash
+        self.client.post(reverse('change_password'), {
+            'password': 'Password123', 'new_password': 'NewPassword123', 'password_confirmation': 'NewPassword123'
+        })
+        self.assertEqual(self.client.get(reverse('feed')).status_code, 200)
+        self.assertRedirects(other.get(reverse('feed')), f"{reverse('log_in')}?next={reverse('feed')}")
+
+    def test_log_out_drops_cached_user(self):
+        self.client.get(reverse('feed'))
+        self.assertIsNotNone(self.cache.get(user_cache_key(self.user.pk)))
+        self.client.get(reverse('log_out'))
+        self.assertIsNone(self.cache.get(user_cache_key(self.user.pk)))
+
+    def test_logged_in_user_is_written_to_database(self):
+        self.cache.delete(SessionStore.cache_key_prefix + self.client.session.session_key) # The cache lost the session
+        self.assertEqual(self.client.get(reverse('feed')).status_code, 200)
+
+    def test_log_out_is_seen_by_other_processes(self):
+        # Files stand in for Redis here, a cache kept outside the process that each worker has its own connection to
+        with tempfile.TemporaryDirectory() as location:
+            shared = {**settings.CACHES, 'sessions': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+            with self.settings(CACHES=shared):
+                self.client.get(reverse('feed'))
+                session_key = SessionStore.cache_key_prefix + self.client.session.session_key
+                other = caches.create_connection('sessions') # What another worker process reads
+                self.assertIsNotNone(other.get(session_key))
+                self.assertIsNotNone(other.get(user_cache_key(self.user.pk)))
+
+                self.client.get(reverse('log_out'))
+                self.assertIsNone(other.get(session_key))
+                self.assertIsNone(other.get(user_cache_key(self.user.pk)))
+
+
+class WriteBehindSessionStoreTestCase(TestCase):
+
+    def test_changes_are_written_to_database_later(self):
+        session = SessionStore()
+        session['first'] = 1
+        session.save() # New sessions are written straight away
+        session['second'] = 2
+        session.save()
+
+        stored = Session.objects.get(session_key=session.session_key).get_decoded()
+        self.assertEqual(stored['first'], 1)
+        self.assertNotIn('second', stored)
+        self.assertEqual(SessionStore(session.session_key)['second'], 2) # From the cache
+
+        with self.settings(SESSION_WRITE_BEHIND=0):
+            session['third'] = 3
+            session.save()
+        stored = Session.objects.get(session_key=session.session_key).get_decoded()
+        self.assertEqual((stored['second'], stored['third']), (2, 3))
+
+    def test_database_copy_is_used_when_cache_loses_session(self):
+        session = SessionStore()
+        session['first'] = 1
+        session.save()
+        caches['sessions'].delete(session.cache_key)
+        self.assertEqual(SessionStore(session.session_key)['first'], 1)
@@ -0,0 +1,86 @@
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory, TestCase, override_settings
+from posts.middleware import QueryInspectorMiddleware
+from posts.models import User, Post
+from posts.queries import QueryBudgetExceeded, query_budget, query_shape, repeated_queries
+
+
+@override_settings(QUERY_INSPECTOR=True, QUERY_N_PLUS_ONE_THRESHOLD=3)
+class QueryInspectorMiddlewareTestCase(TestCase):
+
+    fixtures = ['posts/tests/fixtures/test_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        for i in range(3):
+            Post.objects.create(author=self.user, title=f'Post {i}')
+        self.request = RequestFactory().get('/test/')
+
+    def test_query_shape_ignores_in_list_length(self):
+        self.assertEqual(query_shape('SELECT 1 WHERE id IN (%s, %s)'), query_shape('SELECT 1 WHERE id IN (%s)'))
+
+    def test_n_plus_one_is_reported_with_template_line(self):
+        template = engines['django'].from_string('{% for post in posts %}\n{{ post.author.username }}\n{% endfor %}')
+
+        def view(request):
+            return HttpResponse(template.render({'posts': Post.objects.all()})) # No select_related: one query per post
+
+        with self.assertLogs('posts.middleware', level='WARNING'):
+            response = self._call(view)
+        self.assertEqual(response['X-Query-Count'], '4')
+        [(shape, times, locations)] = response.query_report.n_plus_one()
+        self.assertEqual(times, 3)
+        self.assertIn('posts_user', shape)
+        self.assertEqual(len(locations), 1)
+        self.assertTrue(locations[0].endswith(':2')) # Line of the template that triggered the queries
+
+    def test_select_related_is_not_reported(self):
+        def view(request):
+            return HttpResponse(', '.join(post.author.username for post in Post.objects.select_related('author')))
+
+        response = self._call(view)
+        self.assertEqual(response.query_report.problems(), [])
+
+    def test_repeated_queries_are_not_reported(self):
+        def view(request):
+            with repeated_queries():
+                for post in Post.objects.all():
+                    post.author.username
+            return HttpResponse()
+
+        response = self._call(view)
+        self.assertEqual(response.query_report.problems(), [])
+        self.assertEqual(response.query_report.count, 4) # Still counted
+
+    def test_budget_is_only_logged_by_default(self):
+        @query_budget(1)
+        def view(request):
+            list(User.objects.all())
+            list(Post.objects.all())
+            return HttpResponse()
+
+        with self.assertLogs('posts.middleware', level='WARNING') as logs:
+            response = self._call(view)
+        self.assertTrue(response.query_report.over_budget)
+        self.assertIn('2 queries run, the budget is 1', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_strict_budget_raises(self):
+        @query_budget(0)
+        def view(request):
+            list(User.objects.all())
+            return HttpResponse()
+
+        with self.assertRaises(QueryBudgetExceeded), self.assertLogs('posts.middleware', level='WARNING'):
+            self._call(view)
+
+    def _call(self, view):
+        middleware = QueryInspectorMiddleware(lambda request: view(request))
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware.get_response = get_response
+        return middleware(self.request)
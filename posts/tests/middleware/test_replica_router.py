@@ -0,0 +1,49 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts import stats
+from posts.models import User, Post
+from posts.routers import STICKY_COOKIE
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTestCase(TestCase):
+    """'default' and 'replica' are two separate SQLite databases here, so where a row is found shows where it was read"""
+
+    databases = {'default', 'replica'}
+    fixtures = ['posts/tests/fixtures/test_user.json'] # Loaded into both databases
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        # Only on the replica, bulk_create sends no signals that would write to the primary
+        Post.objects.using('replica').bulk_create([Post(author_id=self.user.pk, title='Replicated')])
+        self.client.login(username=self.user.username, password='Password123')
+        self.client.cookies.pop(STICKY_COOKIE, None) # Logging in wrote to the primary
+        stats.clear_cache()
+
+    def test_read_views_use_replica(self):
+        self.assertContains(self.client.get(reverse('feed')), 'Replicated')
+        self.assertContains(self.client.get(reverse('profile', kwargs={'username': self.user.username})), 'Replicated')
+
+    def test_other_views_use_primary(self):
+        response = self.client.get(reverse('following_feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Replicated')
+
+    def test_writes_go_to_primary_and_make_reads_sticky(self):
+        response = self.client.post(reverse('new_post'), {'title': 'Fresh', 'body': 'Test'})
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertTrue(Post.objects.using('default').filter(title='Fresh').exists())
+        self.assertFalse(Post.objects.using('replica').filter(title='Fresh').exists())
+
+        response = self.client.get(reverse('feed')) # Has the cookie, so reads the primary and sees the new post
+        self.assertContains(response, 'Fresh')
+        self.assertNotContains(response, 'Replicated')
+
+    def test_follow_toggle_makes_reads_sticky(self):
+        other = User.objects.create_user(username='@janedoe', email='jane@example.org', password='Password123')
+        response = self.client.get(reverse('follow_toggle', kwargs={'username': other.username}))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_everything_uses_primary_without_replicas(self):
+        self.assertNotContains(self.client.get(reverse('feed')), 'Replicated')
@@ -32,6 +32,34 @@ class PostModelTestCase(TestCase):
         self.post.image = None
         self._assert_post_is_valid()
 
+    def test_version_bumped_on_edit(self):
+        self.assertEqual(self.post.version, 1)
+        self.post.title = 'Edited'
+        self.post.save(update_fields=['title'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+
+    def test_edit_records_edit_time_but_not_author_version(self):
+        self.assertIsNone(self.post.edited_at)
+        self.post.title = 'Edited'
+        self.post.save(update_fields=['title'])
+        self.post.refresh_from_db()
+        self.assertIsNotNone(self.post.edited_at)
+        # The cached rows of the author's other posts stay valid
+        self.assertEqual(User.objects.get(pk=self.author.pk).version, 1)
+
+    def test_author_version_bumped_on_profile_changes_only(self):
+        author = User.objects.get(pk=self.author.pk)
+        author.is_active = False
+        author.save()
+        self.assertEqual(author.version, 1)
+        author.username = '@johnny'
+        author.save()
+        author.bio = 'New bio'
+        author.save()
+        author.refresh_from_db()
+        self.assertEqual(author.version, 3)
+
     def _assert_post_is_valid(self):
         try:
             self.post.full_clean()
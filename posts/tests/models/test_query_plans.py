@@ -0,0 +1,85 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.management.commands.seed import SEED_PASSWORD
+from posts.models import User, following_status
+from posts.timeline import pulled_author_ids
+from posts import recommendations, trending
+from ..helpers import QueryPlanTest
+
+
+@override_settings(FEED_PAGE_SIZE=5) # So the feeds have a second page
+class QueryPlanTestCase(TestCase, QueryPlanTest):
+    """Checks that the queries behind the main pages are answered from indexes on a seeded database."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed', users=200, posts=3000, follows=2000, seed=7, stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE') # Table statistics, so the planner chooses as it would on a real database
+        cls.user = User.objects.order_by('-num_followers', 'pk').first()
+        cls.viewer = User.objects.exclude(pk=cls.user.pk).order_by('-num_following', 'pk').first()
+
+    def setUp(self):
+        self.client.login(username=self.viewer.username, password=SEED_PASSWORD)
+
+    def test_feed(self):
+        with self.assertNoFullTableScans():
+            response = self.client.get(reverse('feed'))
+        with self.assertNoFullTableScans():
+            self.client.get(reverse('feed'), {'cursor': response.context['next_cursor']})
+
+    def test_following_feed(self):
+        with self.assertNoFullTableScans():
+            response = self.client.get(reverse('following_feed'))
+        with self.assertNoFullTableScans():
+            self.client.get(reverse('following_feed'), {'cursor': response.context['next_cursor']})
+
+    def test_profile(self):
+        with self.assertNoFullTableScans():
+            response = self.client.get(reverse('profile', kwargs={'username': self.user.username}))
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_lists(self):
+        for name, user in [('followers', self.user), ('following', self.viewer)]: # Both have a second page
+            url = reverse(name, kwargs={'username': user.username})
+            with self.assertNoFullTableScans():
+                response = self.client.get(url)
+            with self.assertNoFullTableScans():
+                self.client.get(url, {'cursor': response.context['next_cursor']})
+
+    def test_suggestions(self):
+        list(recommendations.rebuild()) # Reads the whole follow graph on purpose
+        with self.assertNoFullTableScans():
+            response = self.client.get(reverse('suggestions'))
+            self.viewer.toggle_follow(response.context['users'][0]) # Removes the suggestion, marks followers stale
+        self.assertTrue(response.context['users'])
+
+    def test_trending(self):
+        trending.clear_cache()
+        with self.assertNoFullTableScans():
+            trending.rank()
+            self.client.get(reverse('trending_feed'))
+
+    def test_search(self):
+        word = self.user.first_name
+        with self.assertNoFullTableScans():
+            response = self.client.get(reverse('search'), {'query': word})
+        self.assertIn(self.user, response.context['users'])
+
+    def test_follow_checks(self):
+        candidates = list(User.objects.order_by('pk')[:20])
+        with self.assertNoFullTableScans():
+            self.viewer.is_following(self.user)
+            following_status(self.viewer, candidates)
+            list(pulled_author_ids(self.viewer))
+            list(self.user.followers.values_list('pk', flat=True)) # Fan-out of a new post
+
+    def test_follow_toggle(self):
+        was_following = self.viewer.is_following(self.user)
+        with self.assertNoFullTableScans():
+            self.client.get(reverse('follow_toggle', kwargs={'username': self.user.username}))
+            self.client.get(reverse('follow_toggle', kwargs={'username': self.user.username}))
+        self.assertEqual(self.viewer.is_following(self.user), was_following) # Followed and unfollowed again
@@ -0,0 +1,104 @@
+from unittest import mock
+from django.test import SimpleTestCase, TestCase
+from posts.models import User, Recommendation, StaleRecommendations
+from posts import recommendations
+from posts.recommendations import FollowGraph
+
+
+class FollowGraphTestCase(SimpleTestCase):
+
+    def test_graph_without_numpy(self):
+        pairs = [(1, 2), (1, 3), (2, 4), (3, 4), (2, 5), (3, 1), (4, 6), (5, 1)]
+        with mock.patch.object(recommendations, 'np', None):
+            graph = FollowGraph(pairs)
+        self.assertFalse(graph.numpy)
+        self.assertEqual(graph.user_ids(), [1, 2, 3, 4, 5])
+        self.assertEqual(graph.suggestions(1, 5), [(4, 2), (5, 1)])
+        self.assertEqual(graph.suggestions(1, 1), [(4, 2)])
+        self.assertEqual(graph.suggestions(6, 5), []) # Follows nobody
+        self.assertEqual(graph.suggestions(99, 5), []) # Not in the graph
+
+    def test_numpy_graph_matches_arrays(self):
+        pairs = [(follower, (follower * 7 + step) % 40 + 1) for follower in range(1, 41) for step in range(1, 6)]
+        with mock.patch.object(recommendations, 'np', None):
+            arrays = FollowGraph(pairs)
+        graph = FollowGraph(pairs)
+        self.assertTrue(graph.numpy) # numpy is in requirements.txt
+        self.assertEqual(graph.user_ids(), arrays.user_ids())
+        for user_id in range(1, 42):
+            self.assertEqual(graph.suggestions(user_id, 10), arrays.suggestions(user_id, 10))
+
+
+class RecommendationsTestCase(TestCase):
+
+    fixtures = [
+            'posts/tests/fixtures/test_user.json',
+            'posts/tests/fixtures/other_users.json'
+        ]
+
+    def setUp(self):
+        self.john = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        self.jim = User.objects.get(username='@jimdoe')
+        self.jackie = User.objects.get(username='@jackiedoe')
+        self.john.toggle_follow(self.jane)
+        self.john.toggle_follow(self.jim)
+        self.jane.toggle_follow(self.jackie)
+        self.jim.toggle_follow(self.jackie)
+        self.jim.toggle_follow(self.john)
+
+    def _stored(self, user):
+        return [(suggested.username, suggested.mutual_count) for suggested in recommendations.for_user(user)]
+
+    def _rebuild(self):
+        return sum(recommendations.rebuild())
+
+    def test_friends_of_friends_ranked_by_mutual_follows(self):
+        self.assertEqual(self._rebuild(), 3) # Everyone following someone
+        self.assertEqual(self._stored(self.john), [('@jackiedoe', 2)]) # Not themselves or the users they follow
+        self.assertEqual(self._stored(self.jim), [('@janedoe', 1)])
+        self.assertEqual(self._stored(self.jackie), [])
+
+    def test_rebuild_replaces_old_suggestions(self):
+        self._rebuild()
+        self.jim.toggle_follow(self.john) # Jim no longer follows John, so has no suggestions
+        self._rebuild()
+        self.assertEqual(self._stored(self.jim), [])
+        self.assertFalse(StaleRecommendations.objects.exists())
+
+    def test_following_marks_follower_and_their_followers_stale(self):
+        self._rebuild()
+        self.jane.toggle_follow(self.jim)
+        stale = set(StaleRecommendations.objects.values_list('user__username', flat=True))
+        self.assertEqual(stale, {'@janedoe', '@johndoe'}) # John follows Jane, so now reaches Jim's follows through her
+
+    def test_followed_user_is_no_longer_suggested(self):
+        self._rebuild()
+        self.john.toggle_follow(self.jackie)
+        self.assertEqual(self._stored(self.john), [])
+
+    def test_update_stale_recomputes_only_marked_users(self):
+        self._rebuild()
+        self.jane.toggle_follow(self.john)
+        Recommendation.objects.filter(user=self.jim).delete() # Not stale, so left as it is
+        self.assertEqual(sum(recommendations.update_stale()), 2)
+        self.assertEqual(self._stored(self.jane), [('@jimdoe', 1)]) # Through John, Jane herself is not suggested
+        self.assertEqual(self._stored(self.john), [('@jackiedoe', 2)])
+        self.assertEqual(self._stored(self.jim), [])
+        self.assertFalse(StaleRecommendations.objects.exists())
+
+    def test_followers_of_popular_users_wait_for_rebuild(self):
+        self._rebuild()
+        with self.settings(RECOMMENDATIONS_FANOUT_MAX_FOLLOWERS=0):
+            self.jane.toggle_follow(self.jim)
+        self.assertEqual(list(StaleRecommendations.objects.values_list('user__username', flat=True)), ['@janedoe'])
+
+
+class RecommendationsWithoutNumpyTestCase(RecommendationsTestCase):
+    """The same tests with the array.array graph, used when numpy is not installed"""
+
+    def setUp(self):
+        patcher = mock.patch.object(recommendations, 'np', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
@@ -0,0 +1,60 @@
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from posts.models import User, Post, TrendingPost
+from posts import trending
+
+
+class TrendingTestCase(TestCase):
+
+    fixtures = [
+            'posts/tests/fixtures/test_user.json',
+            'posts/tests/fixtures/other_users.json'
+        ]
+
+    def setUp(self):
+        trending.clear_cache() # The cache lives in the process, so it outlasts each test's transaction
+        self.now = timezone.now()
+        self.john = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        User.objects.filter(pk=self.jane.pk).update(num_followers=1023) # Ten times the weight of an author without followers
+
+    def _post(self, author, title, hours_ago):
+        return Post.objects.create(author=author, title=title, posted_at=self.now - timedelta(hours=hours_ago))
+
+    def _ranked(self, **kwargs):
+        return [row.post.title for row in trending.rank(now=self.now, **kwargs)]
+
+    @override_settings(TRENDING_HALF_LIFE_HOURS=6, TRENDING_FOLLOWER_WEIGHT=1.0)
+    def test_score_decays_and_grows_with_followers(self):
+        self.assertAlmostEqual(trending.score(self.now, 0, self.now), 1)
+        self.assertAlmostEqual(trending.score(self.now - timedelta(hours=6), 0, self.now), 0.5)
+        self.assertAlmostEqual(trending.score(self.now, 1023, self.now), 11)
+
+    @override_settings(TRENDING_HALF_LIFE_HOURS=6, TRENDING_WINDOW_HOURS=48)
+    def test_rank(self):
+        self._post(self.john, 'New', 0)
+        self._post(self.jane, 'Popular author', 12) # 11 / 4
+        self._post(self.john, 'Older', 6)
+        self._post(self.jane, 'Too old', 49)
+        self._post(self.john, 'Future', -1) # Not posted yet at the time of ranking
+        self.assertEqual(self._ranked(), ['Popular author', 'New', 'Older'])
+        self.assertEqual(list(TrendingPost.objects.order_by('rank').values_list('rank', flat=True)), [1, 2, 3])
+
+    def test_snapshot_is_bounded_and_replaced(self):
+        for number in range(5):
+            self._post(self.john, f'Post {number}', number)
+        self.assertEqual(self._ranked(size=2), ['Post 0', 'Post 1'])
+        self._post(self.john, 'Newest', 0)
+        self.assertEqual(self._ranked(size=2), ['Newest', 'Post 0'])
+        self.assertEqual(TrendingPost.objects.count(), 2)
+
+    def test_trending_posts_are_cached_until_ranked_again(self):
+        post = self._post(self.john, 'First', 0)
+        trending.rank(now=self.now)
+        self.assertEqual(trending.trending_posts(), [post])
+        TrendingPost.objects.all().delete() # Another process storing an empty snapshot
+        with self.assertNumQueries(1): # Only the posts are read, the ids come from the cache
+            self.assertEqual(trending.trending_posts(), [post])
+        post.delete()
+        self.assertEqual(trending.trending_posts(), []) # Deleted posts are left out straight away
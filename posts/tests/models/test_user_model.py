@@ -1,6 +1,7 @@
 from django.test import TestCase
 from django.core.exceptions import ValidationError
-from posts.models import User
+from django.contrib.auth.models import AnonymousUser
+from posts.models import User, Post, following_status
 
 # Create your tests here.
 
@@ -181,6 +182,56 @@ class UserModelTestCase(TestCase):
         self.assertEqual(jim.follower_count(), 1)
         self.assertEqual(jim.following_count(), 0)
     
+    def test_counter_fields_follow_changes_from_both_sides(self):
+        john = User.objects.get(username='@johndoe')
+        jane = User.objects.get(username='@janedoe')
+        jim = User.objects.get(username='@jimdoe')
+
+        john.following.add(jane, jim) # Reverse side of the relation
+        john.following.add(jane) # Already followed, must not count twice
+        jane.followers.remove(jim) # jim does not follow jane, must not count
+        self._assert_counters(john, followers=0, following=2)
+        self._assert_counters(jane, followers=1, following=0)
+
+        jane.followers.clear()
+        self._assert_counters(john, followers=0, following=1)
+        self._assert_counters(jane, followers=0, following=0)
+        self._assert_counters(jim, followers=1, following=0)
+
+    def test_is_following_is_a_single_query(self):
+        john = User.objects.get(username='@johndoe')
+        jane = User.objects.get(username='@janedoe')
+        john.toggle_follow(jane)
+        with self.assertNumQueries(1):
+            self.assertTrue(john.is_following(jane))
+        with self.assertNumQueries(1):
+            self.assertFalse(jane.is_following(john))
+
+    def test_following_status(self):
+        john = User.objects.get(username='@johndoe')
+        jane = User.objects.get(username='@janedoe')
+        jim = User.objects.get(username='@jimdoe')
+        jackie = User.objects.get(username='@jackiedoe')
+        john.toggle_follow(jane)
+        john.toggle_follow(jackie)
+        jim.toggle_follow(john)
+
+        with self.assertNumQueries(1):
+            status = following_status(john, [jane, jim, jackie])
+        self.assertEqual(status, {jane.pk: True, jim.pk: False, jackie.pk: True})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(following_status(john, []), {})
+            self.assertEqual(following_status(AnonymousUser(), [jane]), {jane.pk: False})
+
+    def test_post_counter(self):
+        john = User.objects.get(username='@johndoe')
+        post = Post.objects.create(author=john, title='Test')
+        Post.objects.create(author=john, title='Test')
+        self.assertEqual(john.post_count(), 2)
+        post.delete()
+        self.assertEqual(john.post_count(), 1)
+
     def test_user_cannot_follow_self(self):
         john = User.objects.get(username='@johndoe')
 
@@ -195,6 +246,11 @@ class UserModelTestCase(TestCase):
         self.assertEqual(before_followers, after_followers)
         self.assertEqual(before_following, after_following)
 
+    def _assert_counters(self, user, followers, following):
+        user.refresh_from_db()
+        self.assertEqual(user.num_followers, followers)
+        self.assertEqual(user.num_following, following)
+
     def _assert_user_is_valid(self):
         try:
             self.user.full_clean()
@@ -0,0 +1,188 @@
+import json
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.http import StreamingHttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts import api
+from posts.models import User, Post
+from ..helpers import QueryBudgetTest
+
+
+class ApiViewsTestCase(TestCase, QueryBudgetTest):
+
+    fixtures = [
+        'posts/tests/fixtures/test_user.json',
+        'posts/tests/fixtures/other_users.json',
+        'posts/tests/fixtures/test_post.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.other_user = User.objects.get(username='@janedoe')
+        self.client.login(username=self.user.username, password='Password123')
+
+    def _create_posts(self, count, author):
+        now = timezone.now()
+        return [
+            Post.objects.create(author=author, title=f'Post {number}', body='Body', posted_at=now - timedelta(minutes=number))
+            for number in range(count)
+        ]
+
+    def _get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        if isinstance(response, StreamingHttpResponse):
+            return response, json.loads(b''.join(response.streaming_content))
+        return response, response.json()
+
+    def test_api_urls(self):
+        self.assertEqual(reverse('api_feed'), '/api/feed')
+        self.assertEqual(reverse('api_user_posts', kwargs={'username': '@johndoe'}), '/api/users/@johndoe/posts')
+        self.assertEqual(reverse('api_search'), '/api/search')
+
+    def test_feed_serializes_posts_with_authors(self):
+        response, data = self._get(reverse('api_feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['next_cursor'], None)
+        post = Post.objects.get(pk=1)
+        self.assertEqual(data['results'], [{
+            'id': 1,
+            'title': 'Test Post',
+            'body': 'Test post body',
+            'image': post.image.url,
+            'posted_at': post.posted_at.isoformat(),
+            'author': {
+                'id': self.user.pk,
+                'username': '@johndoe',
+                'first_name': self.user.first_name,
+                'last_name': self.user.last_name,
+                'bio': self.user.bio,
+                'num_followers': self.user.num_followers,
+                'num_following': self.user.num_following,
+                'num_posts': self.user.num_posts,
+            }
+        }])
+
+    def test_feed_is_paginated_with_cursor(self):
+        posts = self._create_posts(5, self.other_user)
+        _, first = self._get(reverse('api_feed'), limit=3)
+        self.assertEqual([post['id'] for post in first['results']], [post.pk for post in posts[:3]])
+        _, second = self._get(reverse('api_feed'), limit=3, cursor=first['next_cursor'])
+        self.assertEqual([post['id'] for post in second['results']], [posts[3].pk, posts[4].pk, 1])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_sparse_fieldsets(self):
+        _, data = self._get(reverse('api_feed'), **{'fields[posts]': 'title,author', 'fields[users]': 'username'})
+        self.assertEqual(data['results'], [{'title': 'Test Post', 'author': {'username': '@johndoe'}}])
+
+    def test_sparse_fieldsets_only_read_requested_columns(self):
+        self._get(reverse('api_feed')) # Loads the user into the cache (see backends.py)
+        with self.assertNumQueries(1) as queries:
+            self._get(reverse('api_feed'), **{'fields[posts]': 'title'})
+        self.assertNotIn('posts_user', queries.captured_queries[0]['sql'])
+        self.assertNotIn('"body"', queries.captured_queries[0]['sql'])
+
+    def test_unknown_field_is_bad_request(self):
+        response, data = self._get(reverse('api_feed'), **{'fields[posts]': 'title,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(data, {'error': 'Unknown posts fields: password'})
+        response, _ = self._get(reverse('api_feed'), **{'fields[users]': 'email'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_limit_is_bad_request(self):
+        for limit in ['0', 'ten', '100000']:
+            response, data = self._get(reverse('api_feed'), limit=limit)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('limit', data['error'])
+
+    @override_settings(API_STREAM_AFTER=2)
+    def test_large_pages_are_streamed(self):
+        posts = self._create_posts(4, self.other_user)
+        response, data = self._get(reverse('api_feed'), limit=3)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual([post['id'] for post in data['results']], [post.pk for post in posts[:3]])
+        self.assertIsNotNone(data['next_cursor'])
+
+        response, data = self._get(reverse('api_feed'), limit=2)
+        self.assertNotIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(len(data['results']), 2)
+
+    @override_settings(API_STREAM_AFTER=2, STREAM_BATCH_BYTES=1)
+    def test_large_pages_are_streamed_under_asgi(self):
+        posts = self._create_posts(4, self.other_user)
+
+        async def get_chunks():
+            response = await self.async_client.get(reverse('api_feed'), {'limit': 3})
+            self.assertTrue(response.is_async) # Sent as it is read, not built in memory by Django first
+            return [chunk async for chunk in response.streaming_content]
+
+        self.async_client.force_login(self.user)
+        chunks = async_to_sync(get_chunks)()
+        self.assertEqual(len(chunks), 5) # The opening, one chunk per post and the closing
+        data = json.loads(b''.join(chunks))
+        self.assertEqual([post['id'] for post in data['results']], [post.pk for post in posts[:3]])
+
+    def test_not_logged_in(self):
+        self.client.logout()
+        response, data = self._get(reverse('api_feed'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(data, {'error': 'Authentication required'})
+
+    def test_only_get(self):
+        response = self.client.post(reverse('api_feed'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_user_posts(self):
+        posts = self._create_posts(2, self.other_user)
+        response, data = self._get(reverse('api_user_posts', kwargs={'username': '@janedoe'}), **{'fields[users]': 'username'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['user'], {'username': '@janedoe'})
+        self.assertEqual([post['id'] for post in data['results']], [post.pk for post in posts])
+        self.assertEqual(data['results'][0]['author'], {'username': '@janedoe'})
+
+    def test_user_posts_unknown_user(self):
+        response, data = self._get(reverse('api_user_posts', kwargs={'username': '@nobody'}))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(data, {'error': 'User not found'})
+
+    def test_search(self):
+        response, data = self._get(reverse('api_search'), query='test', **{'fields[posts]': 'id', 'fields[users]': 'username'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data, {'posts': [{'id': 1}], 'users': [], 'next_page': None})
+
+        _, data = self._get(reverse('api_search'), query='jane', **{'fields[users]': 'username'})
+        self.assertEqual(data['users'], [{'username': '@janedoe'}])
+
+    def test_search_page_number_is_limited(self):
+        response, data = self._get(reverse('api_search'), query='test', page='99999999999999999999')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['posts'], [])
+
+    def test_search_without_query(self):
+        _, data = self._get(reverse('api_search'))
+        self.assertEqual(data, {'posts': [], 'users': [], 'next_page': None})
+
+    @override_settings(QUERY_INSPECTOR=True)
+    def test_within_query_budget(self):
+        self.assertWithinQueryBudget(self.client.get(reverse('api_feed')))
+        self.assertWithinQueryBudget(self.client.get(reverse('api_user_posts', kwargs={'username': '@johndoe'})))
+        self.assertWithinQueryBudget(self.client.get(reverse('api_search'), {'query': 'doe'}))
+
+    def test_encoders_give_same_bytes(self):
+        value = {'title': 'Café ☕', 'id': 1, 'image': None, 'tags': [True, 1.5], 'next_cursor': 'MjAyMw'}
+        encoded = api.dumps(value)
+        with mock.patch.object(api, 'orjson', None):
+            self.assertEqual(api.dumps(value), encoded)
+
+
+class ApiViewsWithoutOrjsonTestCase(ApiViewsTestCase):
+    """The same tests with the json module, used when orjson is not installed"""
+
+    def setUp(self):
+        patcher = mock.patch.object(api, 'orjson', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
@@ -0,0 +1,91 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+from posts import async_views, stats
+from posts.models import User, Post
+from posts.views import login_prohibited
+
+
+class AsyncViewsTestCase(TestCase):
+    """Requests made with the async client come in through ASGI, so they are served by async_views.py"""
+
+    fixtures = [
+            'posts/tests/fixtures/test_user.json',
+            'posts/tests/fixtures/other_users.json'
+        ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        stats.clear_cache()
+
+    def get(self, url, *args, **kwargs):
+        async def request():
+            return await self.async_client.get(url, *args, **kwargs)
+        return async_to_sync(request)()
+
+    def test_asgi_requests_use_async_views(self):
+        response = self.get(reverse('home'))
+        self.assertEqual(response.resolver_match.func, async_views.home)
+        self.assertEqual(self.client.get(reverse('home')).resolver_match.func.__module__, 'posts.views')
+
+    def test_home(self):
+        Post.objects.create(author=self.user, title='Test')
+        response = self.get(reverse('home'))
+        self.assertTemplateUsed(response, 'home.html')
+        self.assertEqual(response.context['user_count'], User.objects.count())
+        self.assertEqual(response.context['post_count'], 1)
+
+    def test_feed_redirects_when_not_logged_in(self):
+        response = self.get(reverse('feed'))
+        self.assertRedirects(response, f"{reverse('log_in')}?next={reverse('feed')}", fetch_redirect_response=False)
+
+    def test_feed_pages(self):
+        for i in range(3):
+            Post.objects.create(author=self.jane, title=f'Post {i}')
+        self.async_client.force_login(self.user)
+        with self.settings(FEED_PAGE_SIZE=2):
+            response = self.get(reverse('feed'))
+            self.assertEqual([post.title for post in response.context['posts']], ['Post 2', 'Post 1'])
+            response = self.get(reverse('feed'), {'cursor': response.context['next_cursor']})
+        self.assertEqual([post.title for post in response.context['posts']], ['Post 0'])
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_feed_not_modified(self):
+        self.async_client.force_login(self.user)
+        etag = self.get(reverse('feed'))['ETag']
+        self.assertEqual(self.get(reverse('feed'), headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_profile(self):
+        Post.objects.create(author=self.jane, title='Hello')
+        self.user.toggle_follow(self.jane)
+        self.async_client.force_login(self.user)
+        response = self.get(reverse('profile', kwargs={'username': self.jane.username}))
+        self.assertContains(response, 'Hello')
+        self.assertTrue(response.context['following'])
+        self.assertTrue(response.context['can_follow'])
+
+    def test_profile_invalid_username(self):
+        self.async_client.force_login(self.user)
+        response = self.get(reverse('profile', kwargs={'username': '@nobody'}))
+        self.assertRedirects(response, reverse('feed'), fetch_redirect_response=False)
+
+    def test_search(self):
+        self.async_client.force_login(self.user)
+        response = self.get(reverse('search'), {'query': 'jane'})
+        self.assertTemplateUsed(response, 'search_results.html')
+        self.assertIn(self.jane, response.context['users'])
+
+    def test_login_prohibited_works_with_async_views(self):
+        async def view(request):
+            return HttpResponse('Signed out only')
+        wrapped = login_prohibited(view)
+        self.assertTrue(iscoroutinefunction(wrapped))
+
+        request = AsyncRequestFactory().get('/')
+        request.user = AnonymousUser()
+        self.assertEqual(async_to_sync(wrapped)(request).content, b'Signed out only')
+        request.user = self.user
+        self.assertRedirects(async_to_sync(wrapped)(request), reverse('feed'), fetch_redirect_response=False)
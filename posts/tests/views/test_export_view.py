@@ -0,0 +1,118 @@
+import csv
+import io
+import json
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.urls import reverse
+from posts.export import export_lines
+from posts.models import User, Post
+
+
+class ExportViewTestCase(TestCase):
+
+    fixtures = [
+        'posts/tests/fixtures/test_user.json',
+        'posts/tests/fixtures/other_users.json',
+        'posts/tests/fixtures/test_post.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        self.jim = User.objects.get(username='@jimdoe')
+        self.jane.toggle_follow(self.user) # Jane follows John
+        self.user.toggle_follow(self.jim) # John follows Jim
+        Post.objects.create(author=self.jane, title='Not exported')
+        self.url = reverse('export')
+        self.client.login(username=self.user.username, password='Password123')
+
+    def _content(self, response):
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_url(self):
+        self.assertEqual(self.url, '/export/')
+
+    def test_export_jsonl(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="chatter-johndoe.jsonl"')
+        records = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual([(record['type'], record['id']) for record in records], [
+            ('post', 1), ('follower', self.jane.pk), ('following', self.jim.pk)
+        ])
+        self.assertEqual(records[0]['title'], 'Test Post')
+        self.assertEqual(records[0]['posted_at'], '2023-05-24T12:00:00+00:00')
+        self.assertEqual(records[1]['username'], '@janedoe')
+
+    def test_export_csv(self):
+        response = self.client.get(self.url, {'format': 'csv', 'include': 'posts,following'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(self._content(response))))
+        self.assertEqual([(row['type'], row['id']) for row in rows], [('post', '1'), ('following', str(self.jim.pk))])
+        self.assertEqual(rows[0]['body'], 'Test post body')
+        self.assertEqual(rows[1]['username'], '@jimdoe')
+
+    def test_export_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'include': 'posts,passwords'}).status_code, 400)
+
+    def test_export_redirects_when_not_logged_in(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('log_in') + f'?next={self.url}')
+
+    def test_export_link_on_own_profile_only(self):
+        response = self.client.get(reverse('profile', kwargs={'username': self.user.username}))
+        self.assertContains(response, 'Export my data')
+        response = self.client.get(reverse('profile', kwargs={'username': self.jane.username}))
+        self.assertNotContains(response, 'Export my data')
+
+    def test_export_is_streamed_under_asgi(self):
+        # Django would read a sync generator to the end before sending anything, the view hands it an async iterator
+        generated, closed = [], []
+        def lines(*args, **kwargs):
+            try:
+                for line in export_lines(*args, **kwargs):
+                    generated.append(line)
+                    yield line
+            finally:
+                closed.append(True)
+
+        async def download(chunks_read):
+            response = await self.async_client.get(self.url)
+            self.assertTrue(response.is_async)
+            chunks = response.streaming_content
+            read = [await anext(chunks) for _ in range(chunks_read)]
+            self.assertEqual(len(generated), chunks_read) # Only what was sent so far was generated
+            read.extend([chunk async for chunk in chunks])
+            return b''.join(read).decode()
+
+        self.async_client.force_login(self.user)
+        with mock.patch('posts.views.export_lines', lines), self.settings(STREAM_BATCH_BYTES=1): # One line at a time
+            content = async_to_sync(download)(1)
+        self.assertEqual([json.loads(line)['type'] for line in content.splitlines()], ['post', 'follower', 'following'])
+        self.assertEqual(closed, [True])
+
+    def test_export_stopped_early_under_asgi_closes_generator(self):
+        closed = []
+        def lines(*args, **kwargs):
+            try:
+                yield from export_lines(*args, **kwargs)
+            finally:
+                closed.append(True)
+
+        async def download_first_line():
+            response = await self.async_client.get(self.url)
+            chunks = response.streaming_content
+            line = await anext(chunks)
+            await chunks.aclose() # The client went away, the response is closed
+            return line
+
+        self.async_client.force_login(self.user)
+        with mock.patch('posts.views.export_lines', lines), self.settings(STREAM_BATCH_BYTES=1):
+            self.assertEqual(json.loads(async_to_sync(download_first_line)())['type'], 'post')
+        self.assertEqual(closed, [True])
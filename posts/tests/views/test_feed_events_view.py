@@ -0,0 +1,140 @@
+import asyncio
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.broker import LocalBroker, get_broker
+from posts.live import CHANNEL, sse_event
+from posts.models import User, Post
+
+
+class FeedEventsViewTestCase(TestCase):
+
+    fixtures = ['posts/tests/fixtures/test_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.url = reverse('feed_events')
+
+    def test_feed_events_url(self):
+        self.assertEqual(self.url, '/feed/events/')
+
+    def test_wsgi_tells_browser_not_to_reconnect(self):
+        self.client.login(username=self.user.username, password='Password123')
+        self.assertEqual(self.client.get(self.url).status_code, 204)
+
+    def test_redirects_when_not_logged_in(self):
+        response = async_to_sync(self._open)()
+        self.assertEqual(response.status_code, 302)
+
+    def test_new_posts_are_streamed(self):
+        self.async_client.force_login(self.user)
+
+        async def listen():
+            response = await self._open()
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            stream = response.streaming_content
+            await anext(stream) # The retry interval, sent once subscribed
+            get_broker().publish(CHANNEL, {'id': 7, 'html': '<tr>\n<td>New</td>\n</tr>'})
+            event = (await anext(stream)).decode()
+            await self._close(response) # As when the browser goes away
+            # The stream's subscription ends with the response, not when the generator is garbage collected
+            self.assertFalse(get_broker()._subscribers[CHANNEL])
+            return event
+
+        self.assertEqual(async_to_sync(listen)(), 'id: 7\nevent: post\ndata: <tr>\ndata: <td>New</td>\ndata: </tr>\n\n')
+
+    def test_missed_posts_are_sent_on_reconnect(self):
+        first = Post.objects.create(author=self.user, title='Seen')
+        Post.objects.create(author=self.user, title='Missed')
+        self.async_client.force_login(self.user)
+
+        async def reconnect():
+            response = await self._open(headers={'Last-Event-ID': str(first.pk)})
+            stream = response.streaming_content
+            try:
+                await anext(stream)
+                return (await anext(stream)).decode()
+            finally:
+                await self._close(response)
+
+        event = async_to_sync(reconnect)()
+        self.assertIn('Missed', event)
+        self.assertTrue(event.startswith(f'id: {first.pk + 1}\nevent: post\n'))
+
+    def test_out_of_range_last_event_id_is_ignored(self):
+        Post.objects.create(author=self.user, title='Old')
+        self.async_client.force_login(self.user)
+
+        async def reconnect():
+            response = await self._open(headers={'Last-Event-ID': '9' * 30}) # Too large for the database
+            stream = response.streaming_content
+            try:
+                await anext(stream)
+                get_broker().publish(CHANNEL, {'id': 7, 'html': 'New'}) # Still streaming, nothing replayed
+                return (await anext(stream)).decode()
+            finally:
+                await self._close(response)
+
+        self.assertEqual(async_to_sync(reconnect)(), 'id: 7\nevent: post\ndata: New\n\n')
+
+    @override_settings(LIVE_HEARTBEAT=0.01, LIVE_MAX_DURATION=0.05)
+    def test_idle_streams_get_keepalives_and_end(self):
+        self.async_client.force_login(self.user)
+
+        async def listen():
+            response = await self._open()
+            return [chunk.decode() async for chunk in response.streaming_content]
+
+        chunks = async_to_sync(listen)()
+        self.assertIn(': keepalive\n\n', chunks)
+
+    def test_creating_a_post_publishes_it(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            post = Post.objects.create(author=self.user, title='Live')
+
+        async def listen():
+            async with get_broker().subscribe(CHANNEL) as subscription:
+                for callback in callbacks: # Published once the post is committed
+                    callback()
+                return await asyncio.wait_for(subscription.get(), 1)
+
+        message = async_to_sync(listen)()
+        self.assertEqual(message['id'], post.pk)
+        self.assertIn('Live', message['html'])
+        self.assertIn(f'id="post-{post.pk}"', message['html'])
+
+    async def _open(self, **kwargs):
+        return await self.async_client.get(self.url, **kwargs)
+
+    async def _close(self, response):
+        # What ASGIHandler does once the response is finished, which closes the post_events() generator
+        await sync_to_async(response.close)()
+
+
+class LocalBrokerTestCase(TestCase):
+
+    def test_messages_reach_subscribers_of_the_channel_only(self):
+        broker = LocalBroker()
+
+        async def run():
+            async with broker.subscribe('a') as a, broker.subscribe('b') as b:
+                broker.publish('a', {'n': 1})
+                await asyncio.sleep(0)
+                return await a.get(), b.empty()
+
+        self.assertEqual(async_to_sync(run)(), ({'n': 1}, True))
+
+    def test_slow_subscribers_drop_messages(self):
+        broker = LocalBroker(queue_size=1)
+
+        async def run():
+            async with broker.subscribe('a') as subscription:
+                broker.publish('a', 1)
+                broker.publish('a', 2)
+                await asyncio.sleep(0)
+                return subscription.qsize()
+
+        self.assertEqual(async_to_sync(run)(), 1)
+
+    def test_sse_event_format(self):
+        self.assertEqual(sse_event('one\ntwo', event='post', event_id=3), 'id: 3\nevent: post\ndata: one\ndata: two\n\n')
@@ -1,10 +1,15 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from posts.models import User, Post
 from posts.forms import PostForm
-from ..helpers import LogInTest
+from posts.pagination import encode_cursor
+from ..helpers import LogInTest, QueryBudgetTest
 
-class FeedViewTestCase(TestCase, LogInTest):
+class FeedViewTestCase(TestCase, LogInTest, QueryBudgetTest):
 
     fixtures = ['posts/tests/fixtures/test_user.json']
 
@@ -27,4 +32,139 @@ class FeedViewTestCase(TestCase, LogInTest):
     def test_get_feed_redirects_when_not_logged_in(self):
         response = self.client.get(self.url)
         redirect_url = reverse('log_in') + f'?next={self.url}' # Query parameter 'next' holds URL to redirect to after log in
-        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
\ No newline at end of file
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
+
+    @override_settings(FEED_PAGE_SIZE=2)
+    def test_feed_is_paginated_with_cursor(self):
+        posts = self._create_posts(5)
+        self.client.login(username=self.user.username, password="Password123")
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['posts'], [posts[4], posts[3]]) # Newest first
+        next_cursor = response.context['next_cursor']
+        self.assertIsNotNone(next_cursor)
+        self.assertContains(response, 'Older posts')
+
+        response = self.client.get(self.url, {'cursor': next_cursor})
+        self.assertEqual(response.context['posts'], [posts[2], posts[1]])
+
+        response = self.client.get(self.url, {'cursor': response.context['next_cursor']})
+        self.assertEqual(response.context['posts'], [posts[0]])
+        self.assertIsNone(response.context['next_cursor']) # No older page left
+        self.assertNotContains(response, 'Older posts')
+
+    @override_settings(FEED_PAGE_SIZE=2)
+    def test_feed_cursor_breaks_ties_on_id(self):
+        posts = self._create_posts(3)
+        Post.objects.update(posted_at=posts[0].posted_at) # Same timestamp for every post
+        self.client.login(username=self.user.username, password="Password123")
+
+        response = self.client.get(self.url)
+        self.assertEqual([post.pk for post in response.context['posts']], [posts[2].pk, posts[1].pk])
+        response = self.client.get(self.url, {'cursor': response.context['next_cursor']})
+        self.assertEqual([post.pk for post in response.context['posts']], [posts[0].pk])
+
+    @override_settings(QUERY_INSPECTOR=True)
+    def test_feed_does_not_query_once_per_post(self):
+        jane = User.objects.create_user('@janedoe', first_name='Jane', last_name='Doe', email='jane@test.com', password='Password123')
+        self._create_posts(3)
+        for i in range(3):
+            Post.objects.create(author=jane, title=f'Jane {i}')
+        self.client.login(username=self.user.username, password="Password123")
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['posts']), 6)
+        self.assertWithinQueryBudget(response)
+
+    def test_feed_invalid_cursor_shows_first_page(self):
+        self._create_posts(1)
+        self.client.login(username=self.user.username, password="Password123")
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['posts']), 1)
+        response = self.client.get(self.url, {'cursor': encode_cursor(timezone.now(), 10 ** 23)}) # Id too large for the database
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['posts']), 1)
+
+    def test_feed_reuses_cached_rows(self):
+        post = self._create_posts(1)[0]
+        self.client.login(username=self.user.username, password="Password123")
+        self.client.get(self.url)
+        Post.objects.filter(pk=post.pk).update(title='Changed') # Bypasses save(), so the version is not bumped
+        self.assertContains(self.client.get(self.url), 'Post 0')
+
+    def test_cached_rows_expire(self):
+        self._create_posts(1)
+        self.client.login(username=self.user.username, password="Password123")
+        fragments = caches['fragments']
+        with mock.patch.object(fragments, 'set', wraps=fragments.set) as cache_set:
+            self.client.get(self.url)
+        self.assertEqual(cache_set.call_args.args[2], fragments.default_timeout) # The TIMEOUT in settings.py
+        self.assertIsNotNone(fragments.default_timeout)
+
+    def test_feed_rerenders_edited_posts(self):
+        post = self._create_posts(1)[0]
+        self.client.login(username=self.user.username, password="Password123")
+        self.client.get(self.url)
+        post.title = 'Edited'
+        post.save()
+        self.assertContains(self.client.get(self.url), 'Edited')
+
+    def test_feed_rerenders_posts_of_renamed_authors(self):
+        self._create_posts(1)
+        self.client.login(username=self.user.username, password="Password123")
+        self.client.get(self.url)
+        user = User.objects.get(pk=self.user.pk)
+        user.username = '@johnny'
+        user.save()
+        self.assertContains(self.client.get(self.url), '@johnny')
+
+    def test_feed_times_are_machine_readable(self):
+        post = self._create_posts(1)[0]
+        self.client.login(username=self.user.username, password="Password123")
+        response = self.client.get(self.url)
+        self.assertContains(response, f'<time datetime="{post.posted_at.isoformat()}" class="relative-time">')
+
+    def test_unchanged_feed_is_not_modified(self):
+        self._create_posts(2)
+        self.client.login(username=self.user.username, password="Password123")
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1): # The posts version, the session and user come from the cache
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_feed_is_modified_by_new_posts(self):
+        self.client.login(username=self.user.username, password="Password123")
+        etag = self.client.get(self.url)['ETag']
+        self._create_posts(1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Post 0')
+
+    def test_feed_pages_have_their_own_etag(self):
+        posts = self._create_posts(2)
+        self.client.login(username=self.user.username, password="Password123")
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, {'cursor': encode_cursor(posts[1].posted_at, posts[1].pk)}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_feed_with_messages_is_always_rendered(self):
+        self.client.login(username=self.user.username, password="Password123")
+        etag = self.client.get(self.url)['ETag']
+        # Redirects to the feed with a 'Password updated!' message
+        self.client.post(reverse('change_password'), {'password': 'Password123', 'new_password': 'NewPassword123', 'password_confirmation': 'NewPassword123'})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(len(response.context['messages']), 1)
+
+    def _create_posts(self, count):
+        # posted_at is set automatically on creation, so spread the posts out afterwards
+        now = timezone.now()
+        posts = []
+        for i in range(count):
+            post = Post.objects.create(author=self.user, title=f'Post {i}', body='Test')
+            Post.objects.filter(pk=post.pk).update(posted_at=now - timedelta(minutes=count - i))
+            post.refresh_from_db()
+            posts.append(post)
+        return posts
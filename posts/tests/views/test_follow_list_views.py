@@ -0,0 +1,100 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import User
+from ..helpers import QueryBudgetTest
+
+
+class FollowListViewsTestCase(TestCase, QueryBudgetTest):
+
+    fixtures = [
+            'posts/tests/fixtures/test_user.json',
+            'posts/tests/fixtures/other_users.json'
+        ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        self.jim = User.objects.get(username='@jimdoe')
+        self.followers_url = reverse('followers', kwargs={'username': self.jane.username})
+        self.following_url = reverse('following', kwargs={'username': self.jane.username})
+        self.client.login(username=self.user.username, password='Password123')
+
+    def _usernames(self, response):
+        return [user.username for user in response.context['users']]
+
+    def test_follow_list_urls(self):
+        self.assertEqual(self.followers_url, '/profile/@janedoe/followers')
+        self.assertEqual(self.following_url, '/profile/@janedoe/following')
+
+    def test_followers_newest_first(self):
+        self.jim.toggle_follow(self.jane)
+        self.user.toggle_follow(self.jane)
+        response = self.client.get(self.followers_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'follow_list.html')
+        self.assertEqual(self._usernames(response), ['@johndoe', '@jimdoe'])
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_following(self):
+        self.jane.toggle_follow(self.jim)
+        self.jim.toggle_follow(self.jane) # Not someone Jane follows
+        response = self.client.get(self.following_url)
+        self.assertEqual(self._usernames(response), ['@jimdoe'])
+
+    def test_viewer_follow_state(self):
+        self.jim.toggle_follow(self.jane)
+        self.user.toggle_follow(self.jane)
+        self.user.toggle_follow(self.jim)
+        response = self.client.get(self.followers_url)
+        users = {user.username: user for user in response.context['users']}
+        self.assertTrue(users['@jimdoe'].followed_by_viewer)
+        self.assertContains(response, 'Unfollow!', count=1) # No button for the viewer's own row
+
+    @override_settings(FEED_PAGE_SIZE=2)
+    def test_pages_follow_the_cursor(self):
+        extra = [
+            User.objects.create_user(f'@follower{number}', email=f'follower{number}@test.com', password='Password123')
+            for number in range(3)
+        ]
+        for follower in [self.user, self.jim, *extra]:
+            follower.toggle_follow(self.jane)
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.get(self.followers_url, {'cursor': cursor} if cursor else {})
+            seen += self._usernames(response)
+            cursor = response.context['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, ['@follower2', '@follower1', '@follower0', '@jimdoe', '@johndoe'])
+
+    def test_malformed_cursor_shows_first_page(self):
+        self.jim.toggle_follow(self.jane)
+        response = self.client.get(self.followers_url, {'cursor': 'nonsense'})
+        self.assertEqual(self._usernames(response), ['@jimdoe'])
+        response = self.client.get(self.followers_url, {'cursor': '99999999999999999999999'}) # Too large for the database
+        self.assertEqual(self._usernames(response), ['@jimdoe'])
+
+    @override_settings(QUERY_INSPECTOR=True)
+    def test_queries_do_not_grow_with_the_page(self):
+        for number in range(10):
+            User.objects.create_user(f'@follower{number}', email=f'follower{number}@test.com').toggle_follow(self.jane)
+        self.client.get(self.followers_url) # Loads the session and user into the cache
+        with self.assertNumQueries(3): # The profile's user, the page of follows with their users and the viewer's follows
+            response = self.client.get(self.followers_url)
+        self.assertEqual(len(response.context['users']), 10)
+        self.assertWithinQueryBudget(response)
+
+    def test_invalid_username_redirects_to_feed(self):
+        response = self.client.get(reverse('followers', kwargs={'username': '@wrongone'}))
+        self.assertRedirects(response, reverse('feed'), status_code=302, target_status_code=200)
+
+    def test_profile_links_to_follow_lists(self):
+        response = self.client.get(reverse('profile', kwargs={'username': self.jane.username}))
+        self.assertContains(response, f'href="{self.followers_url}"')
+        self.assertContains(response, f'href="{self.following_url}"')
+
+    def test_redirects_when_not_logged_in(self):
+        self.client.logout()
+        response = self.client.get(self.followers_url)
+        self.assertRedirects(response, reverse('log_in') + f'?next={self.followers_url}', status_code=302, target_status_code=200)
@@ -0,0 +1,91 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import User, Post, TimelineEntry
+from ..helpers import LogInTest
+
+class FollowingFeedViewTestCase(TestCase, LogInTest):
+
+    fixtures = [
+            'posts/tests/fixtures/test_user.json',
+            'posts/tests/fixtures/other_users.json'
+        ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        self.jim = User.objects.get(username='@jimdoe')
+        self.url = reverse('following_feed')
+
+    def test_following_feed_url(self):
+        self.assertEqual(self.url, '/feed/following/')
+
+    def test_get_following_feed_redirects_when_not_logged_in(self):
+        response = self.client.get(self.url)
+        redirect_url = reverse('log_in') + f'?next={self.url}'
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
+
+    def test_following_feed_shows_followed_and_own_posts_only(self):
+        self.user.toggle_follow(self.jane)
+        own_post = Post.objects.create(author=self.user, title='Mine')
+        followed_post = Post.objects.create(author=self.jane, title='Followed')
+        Post.objects.create(author=self.jim, title='Not followed')
+
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'feed.html')
+        self.assertEqual(response.context['posts'], [followed_post, own_post])
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        self.user.toggle_follow(self.jane)
+        self.jim.toggle_follow(self.jane)
+        post = Post.objects.create(author=self.jane, title='Hello')
+        self.assertTrue(TimelineEntry.objects.filter(user=self.user, post=post).exists())
+        self.assertTrue(TimelineEntry.objects.filter(user=self.jim, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(user=self.jane).exists()) # Own posts are pulled on read
+
+    def test_follow_backfills_and_unfollow_removes_posts(self):
+        post = Post.objects.create(author=self.jane, title='Before follow')
+        self.user.toggle_follow(self.jane)
+        self.assertTrue(TimelineEntry.objects.filter(user=self.user, post=post).exists())
+
+        self.user.toggle_follow(self.jane)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    @override_settings(TIMELINE_MAX_ENTRIES=2, TIMELINE_TRIM_EVERY=1)
+    def test_timeline_is_trimmed_to_cap(self):
+        self.user.toggle_follow(self.jane)
+        posts = [Post.objects.create(author=self.jane, title=f'Post {i}') for i in range(4)]
+        entries = TimelineEntry.objects.filter(user=self.user).order_by('-post_id')
+        self.assertEqual([entry.post_id for entry in entries], [posts[3].pk, posts[2].pk])
+
+    @override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=1)
+    def test_high_follower_posts_are_pulled_not_fanned_out(self):
+        self.user.toggle_follow(self.jane)
+        post = Post.objects.create(author=self.jane, title='Popular')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['posts'], [post])
+
+    @override_settings(FEED_PAGE_SIZE=2, TIMELINE_FANOUT_MAX_FOLLOWERS=2)
+    def test_following_feed_pages_merge_timeline_and_pulled_posts(self):
+        self.user.toggle_follow(self.jane)
+        self.user.toggle_follow(self.jim)
+        self.jim.toggle_follow(self.jane) # Jane now has two followers so her posts are pulled
+        posts = []
+        for i in range(5):
+            author = [self.jane, self.jim, self.user][i % 3]
+            posts.append(Post.objects.create(author=author, title=f'Post {i}'))
+
+        self.client.login(username=self.user.username, password='Password123')
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.get(self.url, {'cursor': cursor} if cursor else {})
+            seen.extend(response.context['posts'])
+            cursor = response.context['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, list(reversed(posts)))
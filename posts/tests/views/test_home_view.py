@@ -0,0 +1,57 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts import stats
+from posts.models import User, Post, SiteStat
+
+
+class HomeViewTestCase(TestCase):
+
+    fixtures = [
+            'posts/tests/fixtures/test_user.json',
+            'posts/tests/fixtures/other_users.json'
+        ]
+
+    def setUp(self):
+        self.url = reverse('home')
+        self.user = User.objects.get(username='@johndoe')
+        stats.clear_cache() # The cache lives in the process, so it outlasts each test's transaction
+
+    def test_home_url(self):
+        self.assertEqual(self.url, '/')
+
+    def test_get_home_shows_totals(self):
+        Post.objects.create(author=self.user, title='Test')
+        response = self.client.get(self.url)
+        self.assertTemplateUsed(response, 'home.html')
+        self.assertEqual(response.context['user_count'], User.objects.count())
+        self.assertEqual(response.context['post_count'], 1)
+
+    def test_totals_follow_deletes(self):
+        post = Post.objects.create(author=self.user, title='Test')
+        post.delete()
+        User.objects.get(username='@janedoe').delete()
+        self.assertEqual(stats.totals(), {'users': User.objects.count(), 'posts': 0})
+
+    def test_unchanged_home_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.user, title='Test')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_totals_are_cached(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_other_processes_changes_wait_for_max_age(self):
+        self.client.get(self.url)
+        SiteStat.objects.filter(name='posts').update(value=5) # Written by another process, so this one's cache is not cleared
+        self.assertEqual(self.client.get(self.url).context['post_count'], 0)
+
+    @override_settings(SITE_STATS_MAX_AGE=0)
+    def test_other_processes_changes_show_after_max_age(self):
+        self.client.get(self.url)
+        SiteStat.objects.filter(name='posts').update(value=5)
+        self.assertEqual(self.client.get(self.url).context['post_count'], 5)
@@ -1,4 +1,5 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.files.storage import default_storage
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from posts.models import User, Post
@@ -30,6 +31,9 @@ class NewPostViewTestCase(TestCase, LogInTest):
         for post in Post.objects.all():
             if post.image:
                 os.remove(post.image.path)
+            for variants in post.image_variants.values():
+                for path in variants.values():
+                    default_storage.delete(path)
         super().tearDown()
     
     def test_new_post_authenticated_user(self):
@@ -63,4 +67,30 @@ class NewPostViewTestCase(TestCase, LogInTest):
         self.assertEqual(Post.objects.count(), 0)  # No post created
         self.assertIsInstance(response.context['form'], PostForm)
         self.assertTrue(response.context['form'].errors)
-        
\ No newline at end of file
+
+    @override_settings(IMAGE_VARIANTS_ASYNC=False, IMAGE_VARIANT_WIDTHS=[300, 1200])
+    def test_new_post_generates_image_variants(self):
+        self.client.login(username=self.user.username, password="Password123")
+        with self.captureOnCommitCallbacks(execute=True): # Variants are only generated once the post is committed
+            self.client.post(self.url, data=self.form_data)
+
+        post = Post.objects.get()
+        self.assertEqual(set(post.image_variants), {'webp', 'jpeg'})
+        self.assertEqual(set(post.image_variants['webp']), {'300', '600'}) # Not enlarged past the 600px original
+        for variants in post.image_variants.values():
+            for path in variants.values():
+                self.assertTrue(default_storage.exists(path))
+        self.assertIn(' 300w', post.webp_srcset())
+        self.assertEqual(post.version, 2) # So a row cached before the variants existed is rendered again
+
+        response = self.client.get(reverse('feed'))
+        self.assertContains(response, '<source type="image/webp"')
+
+    def test_feed_shows_original_image_until_variants_are_ready(self):
+        self.client.login(username=self.user.username, password="Password123")
+        self.client.post(self.url, data=self.form_data)
+        post = Post.objects.get()
+        self.assertEqual(post.image_variants, {})
+        response = self.client.get(reverse('feed'))
+        self.assertNotContains(response, '<picture>')
+        self.assertContains(response, post.image.url)
@@ -1,9 +1,10 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from posts.models import User, Post
+from ..helpers import QueryBudgetTest
 
 
-class ProfileViewTestCase(TestCase):
+class ProfileViewTestCase(TestCase, QueryBudgetTest):
 
     fixtures = [
             'posts/tests/fixtures/test_user.json',
@@ -27,6 +28,49 @@ class ProfileViewTestCase(TestCase):
         self.assertEqual(reverse_url, self.url)
 
     
+    @override_settings(QUERY_INSPECTOR=True)
+    def test_get_profile_does_not_query_once_per_post(self):
+        for i in range(4):
+            Post.objects.create(author=self.user, title=f'Post {i}')
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Post 3')
+        self.assertWithinQueryBudget(response)
+
+    def test_unchanged_profile_is_not_modified(self):
+        self.client.login(username=self.user.username, password='Password123')
+        other = reverse('profile', kwargs={'username': '@janedoe'})
+        etag = self.client.get(other)['ETag']
+        with self.assertNumQueries(1): # The profile row, the session and user come from the cache
+            response = self.client.get(other, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_profile_is_modified_by_following(self):
+        self.client.login(username=self.user.username, password='Password123')
+        other = reverse('profile', kwargs={'username': '@janedoe'})
+        etag = self.client.get(other)['ETag']
+        self.user.toggle_follow(User.objects.get(username='@janedoe'))
+        response = self.client.get(other, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['following'])
+
+    def test_profile_is_modified_by_profile_and_post_changes(self):
+        self.client.login(username=self.user.username, password='Password123')
+        etag = self.client.get(self.url)['ETag']
+        post = Post.objects.create(author=self.user, title='New')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(self.url)['ETag']
+        post.title = 'Edited'
+        post.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(self.url)['ETag']
+        user = User.objects.get(pk=self.user.pk)
+        user.bio = 'New bio'
+        user.save()
+        self.assertContains(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag), 'New bio')
+
     def test_get_profile_invalid_username(self):
         self.client.login(username=self.user.username, password='Password123')
         bad_url = reverse('profile', kwargs={'username': "@wrongone"}) # The kwargs dictionary maps parameter names (defined in the URL pattern) to their corresponding values.
@@ -1,9 +1,9 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from posts.models import User, Post
-from ..helpers import LogInTest
+from ..helpers import LogInTest, QueryBudgetTest
 
-class SearchViewTestCase(TestCase, LogInTest):
+class SearchViewTestCase(TestCase, LogInTest, QueryBudgetTest):
 
     fixtures = ['posts/tests/fixtures/test_user.json',
                 'posts/tests/fixtures/test_post.json']
@@ -18,16 +18,85 @@ class SearchViewTestCase(TestCase, LogInTest):
     
     def test_search_valid_query(self):
         self.client.login(username=self.user.username, password="Password123")
-        response = self.client.get(self.url)
+        response = self.client.get(reverse('search') + '?query=do')
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'search_results.html')
         users = response.context['users']
         posts = response.context['posts']
         query = response.context['query']
         self.assertEqual(1, len(users))
-        self.assertEqual(1, len(posts))
-        self.assertEqual("e", query)
-    
+        self.assertEqual(0, len(posts))
+        self.assertEqual("do", query)
+
+        response = self.client.get(reverse('search') + '?query=test po')
+        self.assertEqual(0, len(response.context['users']))
+        self.assertEqual(1, len(response.context['posts']))
+
+    def test_search_matches_word_prefixes_only(self):
+        self.client.login(username=self.user.username, password="Password123")
+        response = self.client.get(self.url) # 'e' is inside words but does not start any
+        self.assertEqual(0, len(response.context['users']))
+        self.assertEqual(0, len(response.context['posts']))
+
+    def test_search_username_with_at_symbol(self):
+        self.client.login(username=self.user.username, password="Password123")
+        response = self.client.get(reverse('search') + '?query=@john')
+        self.assertEqual([self.user], response.context['users'])
+
+    def test_search_shows_follow_state_of_users(self):
+        jane = User.objects.create_user('@janedoe', first_name='Jane', last_name='Doe', email='jane@test.com', password='Password123')
+        self.user.toggle_follow(jane)
+        self.client.login(username=self.user.username, password="Password123")
+        response = self.client.get(reverse('search') + '?query=doe')
+        followed = {user.username: user.followed_by_viewer for user in response.context['users']}
+        self.assertEqual(followed, {'@johndoe': False, '@janedoe': True})
+        self.assertContains(response, 'Unfollow!', count=1)
+
+    def test_search_ignores_fts_syntax(self):
+        self.client.login(username=self.user.username, password="Password123")
+        response = self.client.get(reverse('search') + '?query="test" OR *')
+        self.assertEqual(response.status_code, 200)
+
+    def test_search_index_follows_changes(self):
+        post = Post.objects.get(pk=1)
+        post.title = 'Renamed'
+        post.save()
+        self.client.login(username=self.user.username, password="Password123")
+        response = self.client.get(reverse('search') + '?query=renamed')
+        self.assertEqual([post], response.context['posts'])
+
+        post.delete()
+        response = self.client.get(reverse('search') + '?query=renamed')
+        self.assertEqual(0, len(response.context['posts']))
+
+    @override_settings(SEARCH_PAGE_SIZE=2, QUERY_INSPECTOR=True)
+    def test_search_results_are_ranked_and_paginated(self):
+        for i in range(3):
+            Post.objects.create(author=self.user, title=f'Chatter {i}', body='')
+        best = Post.objects.create(author=self.user, title='Chatter chatter chatter', body='chatter')
+        self.client.login(username=self.user.username, password="Password123")
+
+        response = self.client.get(reverse('search') + '?query=chat')
+        self.assertWithinQueryBudget(response)
+        self.assertEqual(best, response.context['posts'][0])
+        self.assertEqual(2, len(response.context['posts']))
+        self.assertEqual(2, response.context['next_page'])
+
+        response = self.client.get(reverse('search') + '?query=chat&page=2')
+        self.assertEqual(2, len(response.context['posts']))
+        self.assertIsNone(response.context['next_page'])
+        self.assertEqual(1, response.context['previous_page'])
+
+    @override_settings(SEARCH_PAGE_SIZE=2, SEARCH_MAX_PAGE=2)
+    def test_search_page_number_is_limited(self):
+        for i in range(6):
+            Post.objects.create(author=self.user, title=f'Chatter {i}', body='')
+        self.client.login(username=self.user.username, password="Password123")
+        response = self.client.get(reverse('search') + '?query=chat&page=99999999999999999999')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(2, response.context['page'])
+        self.assertIsNone(response.context['next_page']) # No link past the last page served
+
     def test_search_invalid_query(self):
         self.client.login(username=self.user.username, password="Password123")
         bad_query = reverse('search') + '?query=x'
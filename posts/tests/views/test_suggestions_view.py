@@ -0,0 +1,46 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import User
+from posts import recommendations
+from ..helpers import QueryBudgetTest
+
+
+class SuggestionsViewTestCase(TestCase, QueryBudgetTest):
+
+    fixtures = [
+            'posts/tests/fixtures/test_user.json',
+            'posts/tests/fixtures/other_users.json'
+        ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        self.jim = User.objects.get(username='@jimdoe')
+        self.url = reverse('suggestions')
+        self.client.login(username=self.user.username, password='Password123')
+
+    def test_suggestions_url(self):
+        self.assertEqual(self.url, '/suggestions/')
+
+    def test_no_suggestions(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'suggestions.html')
+        self.assertContains(response, 'No suggestions yet')
+
+    @override_settings(QUERY_INSPECTOR=True)
+    def test_shows_precomputed_suggestions(self):
+        self.user.toggle_follow(self.jane)
+        self.jane.toggle_follow(self.jim)
+        list(recommendations.rebuild())
+        self.client.get(self.url) # Loads the session and user into the cache
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['users'], [self.jim])
+        self.assertContains(response, 'Followed by 1 person you follow')
+        self.assertWithinQueryBudget(response)
+
+    def test_redirects_when_not_logged_in(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('log_in') + f'?next={self.url}', status_code=302, target_status_code=200)
@@ -0,0 +1,46 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import User, Post
+from posts import trending
+from ..helpers import QueryBudgetTest
+
+
+class TrendingFeedViewTestCase(TestCase, QueryBudgetTest):
+
+    fixtures = [
+            'posts/tests/fixtures/test_user.json',
+            'posts/tests/fixtures/other_users.json'
+        ]
+
+    def setUp(self):
+        trending.clear_cache()
+        self.user = User.objects.get(username='@johndoe')
+        self.url = reverse('trending_feed')
+
+    def test_trending_feed_url(self):
+        self.assertEqual(self.url, '/feed/trending/')
+
+    def test_get_trending_feed_redirects_when_not_logged_in(self):
+        response = self.client.get(self.url)
+        redirect_url = reverse('log_in') + f'?next={self.url}'
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
+
+    def test_nothing_trending(self):
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'feed.html')
+        self.assertContains(response, 'Nothing is trending yet')
+
+    @override_settings(QUERY_INSPECTOR=True)
+    def test_serves_the_snapshot(self):
+        jane = User.objects.get(username='@janedoe')
+        posts = [Post.objects.create(author=author, title=f'Post {number}') for number, author in enumerate([self.user, jane] * 3)]
+        trending.rank()
+        Post.objects.create(author=self.user, title='Not ranked yet')
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['posts'], posts[::-1]) # Newest first, the authors have no followers
+        self.assertNotContains(response, 'Not ranked yet')
+        self.assertNotContains(response, 'EventSource') # Live updates are for the 'Everyone' feed
+        self.assertWithinQueryBudget(response)
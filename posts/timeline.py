@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from .models import User, Post, Follow, TimelineEntry
+from .pagination import paginate, encode_cursor, get_page_size
+
+# Home timelines are materialized: when a post is created it is copied into the timeline of every follower
+# (fan-out-on-write), so reading a timeline is a single indexed range scan however many users are followed.
+# Authors with a very large number of followers are not fanned out, their posts are pulled in when the
+# timeline is read instead, so a single post never causes millions of inserts.
+
+
+def is_high_follower(user):
+    return user.num_followers >= settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+
+
+def fan_out(post):
+    """Write a new post into the timelines of its author's followers, returns the number of entries written."""
+
+    author = post.author
+    if is_high_follower(author):
+        return 0 # Pulled at read time, see home_timeline()
+
+    trim_after = post.pk % settings.TIMELINE_TRIM_EVERY == 0 # Trimming is amortized over several posts
+    batch_size = settings.TIMELINE_FANOUT_BATCH
+    follower_ids = author.followers.values_list('pk', flat=True).iterator(chunk_size=batch_size)
+    written = 0
+    batch = []
+    for follower_id in follower_ids:
+        batch.append(follower_id)
+        if len(batch) == batch_size:
+            written += _write_entries(post, batch, trim_after)
+            batch = []
+    if batch:
+        written += _write_entries(post, batch, trim_after)
+    return written
+
+
+def _write_entries(post, user_ids, trim_after):
+    entries = [TimelineEntry(user_id=user_id, post=post, posted_at=post.posted_at) for user_id in user_ids]
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    if trim_after:
+        trim(user_ids)
+    return len(entries)
+
+
+def backfill(follower, followee):
+    """Copy the recent posts of a newly followed user into the follower's timeline."""
+
+    if is_high_follower(followee):
+        return # Their posts are pulled at read time already
+    count = min(settings.TIMELINE_BACKFILL, settings.TIMELINE_MAX_ENTRIES)
+    posts = Post.objects.filter(author=followee).order_by('-posted_at', '-id').values_list('pk', 'posted_at')[:count]
+    entries = [TimelineEntry(user=follower, post_id=pk, posted_at=posted_at) for pk, posted_at in posts]
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True) # Posts already in the timeline are skipped
+    trim([follower.pk])
+
+
+def backfill_all():
+    """Fill every timeline from the follows in the table, for rows inserted without signals (see the seed command).
+
+    Done in two statements rather than per follow: an INSERT ... SELECT of the latest TIMELINE_BACKFILL posts of
+    each followed author below TIMELINE_FANOUT_MAX_FOLLOWERS, then a trim of every timeline. Returns the number of
+    entries written.
+    """
+
+    count = min(settings.TIMELINE_BACKFILL, settings.TIMELINE_MAX_ENTRIES)
+    with connection.cursor() as cursor:
+        # In the follower table a row (from_user, to_user) means to_user follows from_user
+        cursor.execute(f'''
+            INSERT INTO {TimelineEntry._meta.db_table} (user_id, post_id, posted_at)
+            SELECT follow.to_user_id, recent.id, recent.posted_at
+            FROM (
+                SELECT id, author_id, posted_at,
+                    ROW_NUMBER() OVER (PARTITION BY author_id ORDER BY posted_at DESC, id DESC) AS position
+                FROM {Post._meta.db_table}
+            ) AS recent
+            JOIN {Follow._meta.db_table} AS follow ON follow.from_user_id = recent.author_id
+            JOIN {User._meta.db_table} AS author ON author.id = recent.author_id
+            WHERE recent.position <= %s AND author.num_followers < %s
+            ON CONFLICT DO NOTHING
+        ''', [count, settings.TIMELINE_FANOUT_MAX_FOLLOWERS])
+        written = cursor.rowcount
+        cursor.execute(f'''
+            DELETE FROM {TimelineEntry._meta.db_table} WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY posted_at DESC, post_id DESC) AS position
+                    FROM {TimelineEntry._meta.db_table}
+                ) AS ranked
+                WHERE ranked.position > %s
+            )
+        ''', [settings.TIMELINE_MAX_ENTRIES])
+        return written - cursor.rowcount
+
+
+def remove(follower, followee):
+    """Take the posts of an unfollowed user out of the follower's timeline."""
+
+    TimelineEntry.objects.filter(user=follower, post__author=followee).delete()
+
+
+def trim(user_ids):
+    """Delete the oldest entries of each timeline so none holds more than TIMELINE_MAX_ENTRIES posts."""
+
+    ranked = TimelineEntry.objects.filter(user_id__in=user_ids).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=F('user_id'),
+            order_by=[F('posted_at').desc(), F('post_id').desc()]
+        )
+    )
+    stale = list(ranked.filter(position__gt=settings.TIMELINE_MAX_ENTRIES).values_list('pk', flat=True))
+    if stale:
+        TimelineEntry.objects.filter(pk__in=stale).delete()
+
+
+def pulled_author_ids(user):
+    """Authors whose posts are read on demand: the user themself and any high-follower user they follow."""
+
+    high_followers = user.following.filter(
+        num_followers__gte=settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+    ).values_list('pk', flat=True)
+    return [user.pk, *high_followers]
+
+
+def home_timeline(user, cursor=None, page_size=None):
+    """Return a page of the posts by the user and the people they follow, and the cursor of the next page.
+
+    The materialized entries and the pulled posts are each read with the same cursor and then merged,
+    which gives the same page as a single query over every followed author would.
+    """
+
+    page_size = get_page_size(page_size)
+    entries, entries_cursor = paginate(
+        TimelineEntry.objects.filter(user=user).select_related('post__author'),
+        cursor=cursor, page_size=page_size, id_field='post_id'
+    )
+    pulled, pulled_cursor = paginate(
+        Post.objects.filter(author_id__in=pulled_author_ids(user)).select_related('author'),
+        cursor=cursor, page_size=page_size
+    )
+
+    # A post can be in both lists if its author passed the follower threshold after it was fanned out
+    posts = {post.pk: post for post in [entry.post for entry in entries] + pulled}
+    posts = sorted(posts.values(), key=lambda post: (post.posted_at, post.pk), reverse=True)
+
+    has_more = entries_cursor is not None or pulled_cursor is not None or len(posts) > page_size
+    posts = posts[:page_size]
+    next_cursor = None
+    if has_more and posts:
+        next_cursor = encode_cursor(posts[-1].posted_at, posts[-1].pk)
+    return posts, next_cursor
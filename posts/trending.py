@@ -0,0 +1,75 @@
+import heapq
+import math
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Post, TrendingPost
+
+# Trending posts. Ranking every recent post on each request would read them all, so the rank_trending command
+# scores the posts of the last TRENDING_WINDOW_HOURS and stores the best TRENDING_SIZE as a snapshot in the
+# TrendingPost table. The trending page reads the snapshot, and each process keeps its list of post ids for
+# TRENDING_REFRESH_SECONDS, so the page costs one primary key lookup of those posts.
+#
+# A post's score halves every TRENDING_HALF_LIFE_HOURS and grows with the log of its author's followers, so
+# popular authors rank higher without drowning out everyone else. Posts have no likes or replies yet, those
+# would be added to the weight in score() as more engagement signals.
+
+_cache = {'post_ids': None, 'expires': 0}
+_lock = threading.Lock()
+
+
+def score(posted_at, num_followers, now):
+    weight = 1 + settings.TRENDING_FOLLOWER_WEIGHT * math.log2(1 + max(0, num_followers))
+    age_hours = max(0, (now - posted_at).total_seconds()) / 3600
+    return weight * 0.5 ** (age_hours / settings.TRENDING_HALF_LIFE_HOURS)
+
+
+def rank(now=None, size=None, using='default'):
+    """Score the recent posts and replace the snapshot with the best ones, returns the new TrendingPost rows."""
+
+    now = now or timezone.now()
+    size = size or settings.TRENDING_SIZE
+    # A range scan of the posted_at index, only the best 'size' posts are held in memory
+    recent = Post.objects.using(using).filter(
+        posted_at__gte=now - timedelta(hours=settings.TRENDING_WINDOW_HOURS), posted_at__lte=now
+    ).values_list('pk', 'posted_at', 'author__num_followers')
+    scored = ((score(posted_at, num_followers, now), pk) for pk, posted_at, num_followers in recent.iterator(chunk_size=2000))
+    best = heapq.nlargest(size, scored) # Ties go to the newer post, which has the higher id
+    snapshot = [
+        TrendingPost(rank=position, post_id=pk, score=post_score, ranked_at=now)
+        for position, (post_score, pk) in enumerate(best, start=1)
+    ]
+    with transaction.atomic(using=using): # Readers see the old snapshot or the new one, never a mix
+        TrendingPost.objects.using(using).all().delete()
+        TrendingPost.objects.using(using).bulk_create(snapshot)
+    clear_cache() # The new snapshot shows straight away in this process
+    return snapshot
+
+
+def post_ids():
+    """Ids of the trending posts in rank order, read from the snapshot at most once every TRENDING_REFRESH_SECONDS."""
+
+    with _lock:
+        if _cache['post_ids'] is not None and time.monotonic() < _cache['expires']:
+            return _cache['post_ids']
+    ids = list(TrendingPost.objects.order_by('rank').values_list('post_id', flat=True))
+    with _lock:
+        _cache['post_ids'] = ids
+        _cache['expires'] = time.monotonic() + settings.TRENDING_REFRESH_SECONDS
+    return ids
+
+
+def trending_posts():
+    """The trending posts with their authors, best first. Posts deleted since the snapshot are left out."""
+
+    ids = post_ids()
+    posts = Post.objects.select_related('author').in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def clear_cache():
+    with _lock:
+        _cache['post_ids'] = None
@@ -1,17 +1,38 @@
-from django.http import HttpResponseForbidden
+from asgiref.sync import iscoroutinefunction
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required # Needs 'LOGIN_URL' param in settings.py
 from django.contrib.auth.hashers import check_password # Need this as passwords are stored as hashes
 from django.core.exceptions import ObjectDoesNotExist
-from .models import User, Post
+from .models import User, Post, Follow, following_status
 from .forms import SignUpForm, LogInForm, PostForm, EditProfileForm, ChangePasswordForm
+from .pagination import paginate, paginate_by_id
+from .timeline import home_timeline
+from .search import search_posts, search_users
+from .queries import query_budget
+from .routers import read_from_replica
+from .stats import totals as site_totals
+from .conditional import conditional_page, home_etag, feed_etag, profile_etag, aload_user
+from .export import SECTIONS, FORMATS, export_lines, filename as export_filename
+from .streaming import streaming_response
+from . import recommendations
+from .trending import trending_posts
+from django.conf import settings
 from django.contrib import messages
 
 # Create your views here.
 
 # Creating a decorator so that views that we should not be logged in for cannot be accessed when logged in
 def login_prohibited(view_function):
+    if iscoroutinefunction(view_function): # Async views (see async_views.py) get an async wrapper
+        async def async_modified_view_function(request):
+            user = await aload_user(request) # request.user can't be loaded lazily in async code
+            if user.is_authenticated:
+                return redirect('feed')
+            return await view_function(request)
+        return async_modified_view_function
+
     # Taking a view function and redirecting to feed if logged in, else execute it as normal
     def modified_view_function(request): # Wrapper function
         if request.user.is_authenticated:
@@ -24,10 +45,13 @@ def login_prohibited(view_function):
 
 
 
+@read_from_replica
+@conditional_page(home_etag)
+@query_budget(3)
 def home(request):
-    user_count = User.objects.count()
-    post_count = Post.objects.count()
-    return render(request, 'home.html', {'user_count': user_count, 'post_count': post_count})
+    # Cached totals rather than counting both tables on every visit, see stats.py
+    totals = site_totals()
+    return render(request, 'home.html', {'user_count': totals['users'], 'post_count': totals['posts']})
 
 @login_prohibited
 def sign_up(request):
@@ -72,25 +96,72 @@ def log_out(request):
     return redirect('home')
 
 @login_required
+@read_from_replica
+@conditional_page(feed_etag) # Refreshing an unchanged feed costs one query
+@query_budget(4)
 def feed(request):
     form = PostForm()
-    posts = Post.objects.all().order_by('-posted_at') # 'order by' orders in ascending by default, '-' makes it descending
-    return render(request, "feed.html", {'form': form, 'posts': posts})
+    # Only one page of posts is loaded, 'cursor' marks where the previous page ended (newest first)
+    # select_related fetches the authors in the same query instead of one query per row of the template
+    posts, next_cursor = paginate(Post.objects.select_related('author'), cursor=request.GET.get('cursor'))
+    return render(request, "feed.html", {'form': form, 'posts': posts, 'next_cursor': next_cursor})
+
+@login_required
+def feed_events(request):
+    # New posts are streamed by the async version in async_views.py, a stream would hold a WSGI thread the whole time.
+    # 204 tells the browser's EventSource not to reconnect.
+    return HttpResponse(status=204)
+
+@login_required
+@query_budget(5)
+def following_feed(request):
+    form = PostForm()
+    # Posts by the user and the people they follow, read from their materialized timeline (see timeline.py)
+    posts, next_cursor = home_timeline(request.user, cursor=request.GET.get('cursor'))
+    return render(request, "feed.html", {'form': form, 'posts': posts, 'next_cursor': next_cursor, 'following_only': True})
+
+@login_required
+@read_from_replica
+@query_budget(3)
+def trending_feed(request):
+    form = PostForm()
+    # Served from the snapshot stored by the rank_trending command (see trending.py), never ranked here
+    return render(request, "feed.html", {'form': form, 'posts': trending_posts(), 'trending': True})
 
 @login_required
+@read_from_replica
+@query_budget(7)
 def search(request):
     query = request.GET.get('query')  # Get the search query from the request parameters
+    page = _page_number(request.GET.get('page'))
     if query: # Only execute if query provided by the user
-        # Retrieve posts and users matching the search query
-        posts = Post.objects.filter(title__icontains=query) | Post.objects.filter(body__icontains=query).order_by('-posted_at') # 'icontains' is a Django field lookup, it is case insensitive
-        users = User.objects.filter(username__icontains=query) | User.objects.filter(first_name__icontains=query) | User.objects.filter(last_name__icontains=query)
-
-        posts.order_by('-posted_at') # 'order by' orders in ascending by default, '-' makes it descending
+        # Retrieve one page of the posts and users matching the search query, best matches first (see search.py)
+        posts, more_posts = search_posts(query, page=page)
+        users, more_users = search_users(query, page=page)
+        followed = following_status(request.user, users) # One query for the whole page of users
+        for user in users:
+            user.followed_by_viewer = followed[user.pk]
     else:
-        posts = []
-        users = []
+        posts, more_posts = [], False
+        users, more_users = [], False
+
+    return render(request, 'search_results.html', {
+        'query': query,
+        'posts': posts,
+        'users': users,
+        'page': page,
+        'next_page': _next_page(page, more_posts or more_users),
+        'previous_page': page - 1 if page > 1 else None
+    })
 
-    return render(request, 'search_results.html', {'query': query, 'posts': posts, 'users': users})
+def _page_number(value):
+    try:
+        return min(max(1, int(value)), settings.SEARCH_MAX_PAGE)
+    except (TypeError, ValueError):
+        return 1
+
+def _next_page(page, more):
+    return page + 1 if more and page < settings.SEARCH_MAX_PAGE else None
 
 
 @login_required
@@ -123,10 +194,13 @@ def new_post(request):
 
 
 @login_required
+@read_from_replica
+@conditional_page(profile_etag)
+@query_budget(6)
 def profile(request, username): # username taken from path in urls.py
     try:
         user = User.objects.get(username=username)
-        posts = Post.objects.filter(author=user).order_by('-posted_at')
+        posts = Post.objects.filter(author=user).select_related('author').order_by('-posted_at', '-id')
         following = request.user.is_following(user) # Check if logged in user is following target user, pass to template
         can_follow = (request.user != user) # Can't follow self
     except ObjectDoesNotExist:
@@ -135,6 +209,54 @@ def profile(request, username): # username taken from path in urls.py
         return render(request, 'profile.html', {'user': user, 'posts': posts, 'following': following, 'can_follow': can_follow}) # Dictionary passed during render is the context
     
 
+# A row of the follows table is (from_user, to_user) with to_user following from_user (see models.py).
+# For each list: the column holding the profile's user, then the column holding the users listed.
+FOLLOW_LISTS = {
+    'followers': ('from_user', 'to_user'),
+    'following': ('to_user', 'from_user'),
+}
+
+@login_required
+@read_from_replica
+@query_budget(5)
+def followers(request, username):
+    return _follow_list(request, username, 'followers')
+
+@login_required
+@read_from_replica
+@query_budget(5)
+def following(request, username):
+    return _follow_list(request, username, 'following')
+
+def _follow_list(request, username, relation):
+    try:
+        user = User.objects.get(username=username)
+    except ObjectDoesNotExist:
+        return redirect('feed')
+    owner_field, listed_field = FOLLOW_LISTS[relation]
+    # Paged on the id of the follows rows, newest follows first. The single column indexes on from_user_id and
+    # to_user_id end with the row id, so any page is one range lookup however many followers the account has
+    follows, next_cursor = paginate_by_id(
+        Follow.objects.filter(**{owner_field: user}).select_related(listed_field), cursor=request.GET.get('cursor')
+    )
+    users = [getattr(follow, listed_field) for follow in follows]
+    followed = following_status(request.user, users) # One query for the whole page of users
+    for listed_user in users:
+        listed_user.followed_by_viewer = followed[listed_user.pk]
+    return render(request, 'follow_list.html', {
+        'user': user, 'users': users, 'relation': relation, 'next_cursor': next_cursor
+    })
+
+
+@login_required
+@read_from_replica
+@query_budget(3)
+def suggestions(request):
+    # Precomputed by the recommend_follows command (see recommendations.py), so this is one read of an index
+    users = recommendations.for_user(request.user)
+    return render(request, 'suggestions.html', {'users': users})
+
+
 @login_required
 def edit_profile(request):
     if request.method == 'POST':
@@ -184,3 +306,16 @@ def follow_toggle(request, username):
         return redirect('profile', username=username) # If we end up following, redirect to same profile
 
 
+
+
+@login_required
+def export(request):
+    # Download of the user's own posts, followers and following, e.g. '?format=csv&include=posts'
+    export_format = request.GET.get('format', 'jsonl')
+    sections = request.GET.get('include', ','.join(SECTIONS)).split(',')
+    if export_format not in FORMATS or not set(sections) <= set(SECTIONS):
+        return HttpResponseBadRequest(f"format must be one of {', '.join(FORMATS)}, include one or more of {', '.join(SECTIONS)}")
+    # The lines are generated while they are sent, so the export is never held in memory as a whole (see export.py)
+    response = streaming_response(request, export_lines(request.user, export_format, sections), content_type=FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(request.user, export_format)}"'
+    return response